@@ -0,0 +1,76 @@
+"""
+Generation throughput of one-prompt-at-a-time `LocalLM.generate_text`
+and `GenerationScheduler` under concurrent callers.
+
+Example
+-------
+python benchmarks/batched_generation.py --model gpt2 --n-prompts 32 --threads 8 --max-batch-size 8
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from basic_chatbot.model_local import LocalLM
+from basic_chatbot.scheduler import GenerationScheduler
+
+PROMPTS = [
+    "User: What is quantum entanglement?\nAssistant:",
+    "User: How does photosynthesis work in plants?\nAssistant:",
+    "User: Why is the sky blue?\nAssistant:",
+    "User: Explain the theory of relativity in simple terms.\nAssistant:",
+]
+
+def count_new_tokens(lm: LocalLM, prompts: list[str], texts: list[str]) -> int:
+    """Number of tokens generated beyond each prompt."""
+    return sum(
+        len(lm.tokenizer(text)["input_ids"]) - len(lm.tokenizer(prompt)["input_ids"])
+        for prompt, text in zip(prompts, texts)
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="gpt2")
+    parser.add_argument("--n-prompts", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    args = parser.parse_args()
+
+    lm = LocalLM(args.model)
+    prompts = [PROMPTS[i % len(PROMPTS)] for i in range(args.n_prompts)]
+    generate = lambda p: lm.generate_text(p, max_new_tokens=args.max_new_tokens)
+    generate(prompts[0])
+
+    start = time.perf_counter()
+    texts = [generate(p) for p in prompts]
+    serial_s = time.perf_counter() - start
+    serial_tokens = count_new_tokens(lm, prompts, texts)
+
+    with ThreadPoolExecutor(args.threads) as pool:
+        start = time.perf_counter()
+        texts = list(pool.map(generate, prompts))
+        threaded_s = time.perf_counter() - start
+    threaded_tokens = count_new_tokens(lm, prompts, texts)
+
+    with GenerationScheduler(lm, args.max_batch_size, args.max_wait_ms) as scheduler:
+        with ThreadPoolExecutor(args.threads) as pool:
+            start = time.perf_counter()
+            texts = list(pool.map(
+                lambda p: scheduler.generate_text(p, max_new_tokens=args.max_new_tokens), 
+                prompts
+            ))
+            scheduler_s = time.perf_counter() - start
+        batch_sizes = scheduler.batch_sizes
+    scheduler_tokens = count_new_tokens(lm, prompts, texts)
+
+    print(f"{'mode':<34}{'tokens/s':>10}{'prompts/s':>11}")
+    for name, seconds, tokens in [
+        ("generate_text (serial)", serial_s, serial_tokens),
+        (f"generate_text ({args.threads} threads)", threaded_s, threaded_tokens),
+        (f"GenerationScheduler ({args.threads} threads)", scheduler_s, scheduler_tokens),
+    ]:
+        print(f"{name:<34}{tokens / seconds:>10.1f}{args.n_prompts / seconds:>11.2f}")
+    print(f"mean batch size: {sum(batch_sizes) / len(batch_sizes):.1f}")
+
+if __name__ == "__main__":
+    main()
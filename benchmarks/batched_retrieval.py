@@ -0,0 +1,61 @@
+"""
+Retrieval throughput of one-query-at-a-time `retrieve`, `retrieve_batch`
+and `QueryBatcher` under concurrent callers.
+
+Example
+-------
+python benchmarks/batched_retrieval.py --docs-dir data/raw/ --n-queries 512 --threads 32
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from rag_chatbot.batching import QueryBatcher
+from rag_chatbot.documents import iter_jsonl_directory
+from rag_chatbot.retriever import DocsRetriever
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs-dir", default="data/raw/")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--n-queries", type=int, default=512)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    retriever = DocsRetriever(iter_jsonl_directory(args.docs_dir), model=args.model)
+    documents = list(retriever.documents.values())
+    queries = [documents[i % len(documents)] for i in range(args.n_queries)]
+
+    start = time.perf_counter()
+    for query in queries:
+        retriever.retrieve(query, args.k)
+    serial_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    retriever.retrieve_batch(queries, args.k)
+    batch_s = time.perf_counter() - start
+
+    with ThreadPoolExecutor(args.threads) as pool:
+        start = time.perf_counter()
+        list(pool.map(lambda q: retriever.retrieve(q, args.k), queries))
+        threaded_s = time.perf_counter() - start
+
+    with QueryBatcher(retriever, args.max_batch_size, args.max_wait_ms) as batcher:
+        with ThreadPoolExecutor(args.threads) as pool:
+            start = time.perf_counter()
+            list(pool.map(lambda q: batcher.retrieve(q, args.k), queries))
+            batcher_s = time.perf_counter() - start
+
+    print(f"{'mode':<30}{'queries/s':>12}")
+    for name, seconds in [
+        ("retrieve (serial)", serial_s),
+        ("retrieve_batch", batch_s),
+        (f"retrieve ({args.threads} threads)", threaded_s),
+        (f"QueryBatcher ({args.threads} threads)", batcher_s),
+    ]:
+        print(f"{name:<30}{args.n_queries / seconds:>12.1f}")
+
+if __name__ == "__main__":
+    main()
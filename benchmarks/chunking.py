@@ -0,0 +1,56 @@
+"""
+Chunk count, chunking time, index size and query latency for each chunking strategy.
+
+Example
+-------
+python benchmarks/chunking.py --docs-dir data/raw/ --k 4
+"""
+import argparse
+import time
+import faiss
+import numpy as np
+from rag_chatbot.documents import iter_chunks
+from rag_chatbot.retriever import DocsRetriever
+
+STRATEGIES = [
+    {"strategy": "fixed", "chunk_size": 80},
+    {"strategy": "fixed", "chunk_size": 400, "overlap": 50},
+    {"strategy": "tokens", "chunk_size": 128, "overlap": 16},
+    {"strategy": "sentence", "chunk_size": 400, "overlap": 1},
+    {"strategy": "paragraph", "chunk_size": 1000},
+]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs-dir", default="data/raw/")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--n-queries", type=int, default=100)
+    args = parser.parse_args()
+
+    retriever = None
+    print(f"{'strategy':<45}{'chunks':>8}{'chunk s':>10}{'index MB':>10}{'query ms':>10}")
+    for chunking in STRATEGIES:
+        params = dict(chunking)
+        if params["strategy"] == "tokens":
+            params["tokenizer"] = retriever.model.tokenizer if retriever else args.model
+
+        start = time.perf_counter()
+        chunks = list(iter_chunks(args.docs_dir, params))
+        chunk_s = time.perf_counter() - start
+
+        retriever = DocsRetriever(chunks, model=args.model)
+        index_mb = faiss.serialize_index(retriever.index).nbytes / 1e6
+
+        queries = [chunks[i % len(chunks)][:60] for i in range(args.n_queries)]
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            retriever.retrieve(query, args.k)
+            latencies.append((time.perf_counter() - start) * 1e3)
+
+        name = ", ".join(f"{key}={value}" for key, value in chunking.items())
+        print(f"{name:<45}{len(chunks):>8}{chunk_s:>10.3f}{index_mb:>10.2f}{np.mean(latencies):>10.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Query latency, corpus throughput and retrieval agreement of the embedding
+model in each encoder precision.
+
+Recall@k is the fraction of the fp32 encoder's exact top-k chunks that the
+same search returns when corpus and queries are encoded in the given
+precision. Cosine is the mean similarity of each chunk's embedding to its
+fp32 embedding.
+
+Example
+-------
+python benchmarks/encoder_precision.py --docs-dir data/raw/ --k 5 --threads 4
+"""
+import argparse
+import json
+import time
+import faiss
+import numpy as np
+import torch as tc
+from rag_chatbot.documents import iter_jsonl_directory
+from rag_chatbot.encoder import ENCODER_PRECISIONS, load_encoder
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs-dir", default="data/raw/")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--precisions", nargs="+", default=list(ENCODER_PRECISIONS))
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--n-queries", type=int, default=100)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Optional path for JSON results.")
+    args = parser.parse_args()
+
+    if args.threads:
+        tc.set_num_threads(args.threads)
+    documents = iter_jsonl_directory(args.docs_dir)
+    rng = np.random.default_rng(args.seed)
+    queries = [documents[i] for i in rng.choice(len(documents), min(args.n_queries, len(documents)), replace=False)]
+    k = min(args.k, len(documents))
+
+    precisions = ["fp32"] + [p for p in args.precisions if p != "fp32"]
+    rows = []
+    for precision in precisions:
+        encoder = load_encoder(args.model, precision)
+        encoder.encode(queries[:1], convert_to_numpy=True)
+
+        start = time.perf_counter()
+        embeddings = encoder.encode(documents, convert_to_numpy=True, batch_size=256)
+        corpus_s = time.perf_counter() - start
+
+        latencies = []
+        query_embs = []
+        for query in queries:
+            start = time.perf_counter()
+            query_embs.append(encoder.encode([query], convert_to_numpy=True)[0])
+            latencies.append((time.perf_counter() - start) * 1e3)
+
+        index = faiss.IndexFlatL2(embeddings.shape[1])
+        index.add(np.ascontiguousarray(embeddings, dtype=np.float32))
+        _, found = index.search(np.stack(query_embs).astype(np.float32), k)
+
+        if precision == "fp32":
+            reference, truth = embeddings, found
+        normed = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+        ref_normed = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+
+        rows.append({
+            "precision": precision,
+            "query_mean_ms": float(np.mean(latencies)),
+            "query_p95_ms": float(np.percentile(latencies, 95)),
+            "chunks_per_s": len(documents) / corpus_s,
+            "recall_at_k": float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])),
+            "cosine": float(np.mean(np.sum(normed * ref_normed, axis=1))),
+        })
+
+    print(f"{'precision':<10}{'query ms':>10}{'p95 ms':>10}{'chunks/s':>10}{'recall@k':>10}{'cosine':>10}")
+    for row in rows:
+        print(
+            f"{row['precision']:<10}{row['query_mean_ms']:>10.2f}{row['query_p95_ms']:>10.2f}"
+            f"{row['chunks_per_s']:>10.0f}{row['recall_at_k']:>10.3f}{row['cosine']:>10.4f}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Recall and per-stage latency of dense, BM25 and hybrid retrieval
+on a labelled query set, optionally followed by cross-encoder reranking.
+
+Example
+-------
+python benchmarks/hybrid_retrieval.py --docs-dir data/raw/ --queries data/eval/queries.jsonl
+python benchmarks/hybrid_retrieval.py --rerank-model cross-encoder/ms-marco-MiniLM-L-6-v2 --budget-ms 50
+"""
+import argparse
+import time
+import numpy as np
+from rag_chatbot.evaluation import evaluate_retriever, load_queries
+from rag_chatbot.hybrid import HybridRetriever
+from rag_chatbot.reranker import Reranker
+from rag_chatbot.retriever import DocsRetriever
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs-dir", default="data/raw/")
+    parser.add_argument("--queries", default="data/eval/queries.jsonl")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--ks", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--rerank-model", default=None)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    retriever = DocsRetriever.from_directory(args.docs_dir, model=args.model)
+    queries = load_queries(args.queries)
+    sources = retriever.chunk_sources()
+
+    rrf = HybridRetriever(retriever, fusion="rrf", candidates=args.candidates)
+    weighted = HybridRetriever(retriever, fusion="weighted", candidates=args.candidates)
+    bm25 = lambda qs, k: [rrf.bm25.search(q, k)[0].tolist() for q in qs]
+
+    retrievers = [
+        ("dense", retriever.retrieve_ids_batch),
+        ("bm25", bm25),
+        ("rrf", rrf.retrieve_ids_batch),
+        ("weighted", weighted.retrieve_ids_batch),
+    ]
+    reranker = None
+    if args.rerank_model:
+        reranker = Reranker(
+            rrf, model=args.rerank_model, 
+            candidates=args.candidates, budget_ms=args.budget_ms
+        )
+        retrievers.append(("rrf+rerank", reranker.retrieve_ids_batch))
+
+    print(f"{'retriever':<12}" + "".join(f"{f'recall@{k}':>11}" for k in args.ks))
+    for name, fn in retrievers:
+        recall = evaluate_retriever(fn, queries, sources, tuple(args.ks), args.candidates, warmup=0)
+        print(f"{name:<12}" + "".join(f"{recall[f'recall@{k}']:>11.3f}" for k in args.ks))
+
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        if reranker is None:
+            rrf.retrieve_ids(query["query"], max(args.ks))
+            timings.append({**rrf.timings, "total_ms": (time.perf_counter() - start) * 1e3})
+        else:
+            reranker.cache.clear()
+            reranker.retrieve_ids(query["query"], max(args.ks))
+            timings.append({
+                **rrf.timings, "rerank_ms": reranker.timings["rerank_ms"],
+                "total_ms": (time.perf_counter() - start) * 1e3
+            })
+
+    print(f"\n{'stage':<12}{'mean ms':>11}{'p95 ms':>11}")
+    for stage in timings[0]:
+        values = [t[stage] for t in timings]
+        print(f"{stage:<12}{np.mean(values):>11.3f}{np.percentile(values, 95):>11.3f}")
+    if reranker is not None:
+        print(reranker.stats())
+
+if __name__ == "__main__":
+    main()
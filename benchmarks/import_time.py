@@ -0,0 +1,103 @@
+"""
+Import time and startup latency of the chatbot modules.
+
+Each module is imported in a fresh interpreter with `python -X importtime`,
+and the self time of every imported module is summed per top-level package.
+With `--startup`, a `RAGChat` with background loading is also constructed in a
+fresh interpreter to time how long it takes to come up and to become ready.
+With `--max-ms`, exits with status 1 if a module takes longer to import,
+so the script can guard against import-time regressions.
+
+Example
+-------
+python benchmarks/import_time.py --top 10
+python benchmarks/import_time.py --modules rag_chatbot.rag_chat basic_chatbot.chatbot --max-ms 500
+python benchmarks/import_time.py --startup --model gpt2 --docs-dir data/raw/
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+
+MODULES = [
+    "rag_chatbot.rag_chat",
+    "basic_chatbot.chatbot",
+    "rag_chatbot.retriever",
+    "basic_chatbot.model_local",
+    "basic_chatbot.model_openai",
+]
+
+STARTUP = """
+import json, sys, time
+start = time.perf_counter()
+from rag_chatbot.rag_chat import RAGChat
+bot = RAGChat(sys.argv[1], 3, sys.argv[2], sys.argv[3], sys.argv[3], background_load=True)
+up_s = time.perf_counter() - start
+bot.wait_ready()
+print(json.dumps({"up_s": up_s, "ready_s": time.perf_counter() - start, **bot.load_seconds}))
+"""
+
+def import_times(module: str) -> dict[str, float]:
+    """Imports a module in a fresh interpreter and returns self time in ms per top-level package."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=os.environ, check=True
+    )
+    packages = defaultdict(float)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us) / 1e3
+    return dict(packages)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--modules", nargs="+", default=MODULES)
+    parser.add_argument("--top", type=int, default=8)
+    parser.add_argument("--max-ms", type=float, default=None)
+    parser.add_argument("--startup", action="store_true")
+    parser.add_argument("--model", default="gpt2")
+    parser.add_argument("--docs-dir", default="data/raw/")
+    parser.add_argument("--output", default=None, help="Optional path for JSON results.")
+    args = parser.parse_args()
+
+    results = {"imports": {}}
+    slow = []
+    for module in args.modules:
+        packages = import_times(module)
+        total = sum(packages.values())
+        results["imports"][module] = {"total_ms": total, "packages_ms": packages}
+        if args.max_ms is not None and total > args.max_ms:
+            slow.append(module)
+
+        heaviest = sorted(packages.items(), key=lambda item: -item[1])[:args.top]
+        print(f"{module}: {total:.0f} ms")
+        for name, ms in heaviest:
+            print(f"    {name:<28}{ms:>10.1f} ms")
+
+    if args.startup:
+        with tempfile.TemporaryDirectory() as state_dir:
+            result = subprocess.run(
+                [sys.executable, "-c", STARTUP, args.model, args.docs_dir, state_dir + "/"],
+                capture_output=True, text=True, env=os.environ, check=True
+            )
+        startup = json.loads(result.stdout.strip().splitlines()[-1])
+        results["startup"] = startup
+        print(
+            f"startup: up in {startup['up_s']:.2f} s, ready in {startup['ready_s']:.2f} s "
+            f"(model {startup.get('model', 0):.2f} s, retriever {startup.get('retriever', 0):.2f} s)"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if slow:
+        print(f"Slower than {args.max_ms} ms: {', '.join(slow)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
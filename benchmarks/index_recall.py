@@ -0,0 +1,73 @@
+"""
+Recall-vs-latency report of the approximate index types against the exact flat index.
+
+Compressed indexes are also run with float32 rescoring of `--rescore` times k
+candidates. Memory is reported as the in-RAM index size per million chunks.
+
+Example
+-------
+python benchmarks/index_recall.py --docs-dir data/raw/ --k 10 --nlist 256
+"""
+import argparse
+import json
+import numpy as np
+from sentence_transformers import SentenceTransformer
+from rag_chatbot.documents import iter_jsonl_directory
+from rag_chatbot.index_factory import recall_report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs-dir", default="data/raw/")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--n-queries", type=int, default=200)
+    parser.add_argument("--nlist", type=int, default=256)
+    parser.add_argument("--pq-m", type=int, default=16)
+    parser.add_argument("--rescore", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Optional path for JSON results.")
+    args = parser.parse_args()
+
+    documents = iter_jsonl_directory(args.docs_dir)
+    model = SentenceTransformer(args.model)
+    embeddings = model.encode(documents, convert_to_numpy=True, batch_size=256)
+
+    # Queries are corpus chunks with a little noise so they are not exact duplicates.
+    rng = np.random.default_rng(args.seed)
+    sample = rng.choice(len(embeddings), min(args.n_queries, len(embeddings)), replace=False)
+    queries = embeddings[sample] + rng.normal(0, 0.01, (len(sample), embeddings.shape[1]))
+
+    nlist = min(args.nlist, len(embeddings))
+    configs = [
+        {"index_type": "ivf_flat", "nlist": nlist, "nprobe": nprobe}
+        for nprobe in (1, 4, 16, 64) if nprobe <= nlist
+    ] + [
+        {"index_type": "ivf_pq", "nlist": nlist, "nprobe": 16, "pq_m": args.pq_m},
+        {"index_type": "hnsw", "ef_search": 16},
+        {"index_type": "hnsw", "ef_search": 64},
+        {"index_type": "sq", "sq_type": "8"},
+        {"index_type": "sq", "sq_type": "8", "rescore": args.rescore},
+        {"index_type": "sq", "sq_type": "fp16"},
+        {"index_type": "sq", "sq_type": "fp16", "rescore": args.rescore},
+        {"index_type": "ivf_pq", "nlist": nlist, "nprobe": 16, "pq_m": args.pq_m, "rescore": args.rescore},
+    ]
+    rows = recall_report(embeddings, queries, configs, k=args.k)
+
+    print(
+        f"{'index':<20}{'nprobe/ef':>10}{'rescore':>8}{'recall@k':>10}"
+        f"{'mean ms':>10}{'p95 ms':>10}{'MB':>10}{'MB/1M':>10}"
+    )
+    for row in rows:
+        knob = row.get("nprobe", row.get("ef_search", "-"))
+        print(
+            f"{row['factory']:<20}{knob:>10}{row.get('rescore') or '-':>8}{row['recall_at_k']:>10.3f}"
+            f"{row['mean_ms']:>10.3f}{row['p95_ms']:>10.3f}{row['index_bytes'] / 1e6:>10.2f}"
+            f"{row['bytes_per_vector']:>10.0f}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+if __name__ == "__main__":
+    main()
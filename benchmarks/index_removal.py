@@ -0,0 +1,93 @@
+"""
+Checks that every index type still returns the right vector IDs after
+`DocsRetriever.refresh` removes records, and times the removal.
+
+For each index type, a synthetic corpus (see `suite.py`) is indexed with
+`from_directory`, `--n-removed` records are deleted from the corpus file and
+the retriever is refreshed. Every remaining chunk's exact text is then
+searched for, both in the refreshed retriever and after reloading it from
+`cache_dir`, and must come back as its own top hit. The script exits with
+status 1 if any index type fails.
+
+Unless `--encoder` names a real model, the tiny seeded encoder of `suite.py`
+is used, so nothing is downloaded.
+
+Example
+-------
+python benchmarks/index_removal.py --records 500 --n-removed 50
+"""
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from suite import build_tiny_models, make_corpus
+from rag_chatbot.retriever import DocsRetriever
+
+def misses(retriever: DocsRetriever) -> int:
+    """
+    Number of chunks whose exact text does not come back as the top hit.
+    A hit counts if it is a live chunk with the same embedding, since
+    short chunks can encode identically with the tiny encoder.
+    """
+    ids = list(retriever.documents)
+    texts = [retriever.documents[i] for i in ids]
+    embeddings = dict(zip(ids, retriever.model.encode(texts, convert_to_numpy=True)))
+    found = retriever.retrieve_ids_batch(texts, 1)
+    return sum(
+        not f or f[0] not in embeddings or not np.allclose(embeddings[f[0]], embeddings[i], atol=1e-5)
+        for i, f in zip(ids, found)
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=500)
+    parser.add_argument("--n-removed", type=int, default=50)
+    parser.add_argument("--nlist", type=int, default=16)
+    parser.add_argument("--encoder", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    configs = {
+        "flat": {"index_type": "flat"},
+        "ivf_flat": {"index_type": "ivf_flat", "nlist": args.nlist, "nprobe": args.nlist},
+        "ivf_pq": {"index_type": "ivf_pq", "nlist": args.nlist, "nprobe": args.nlist, "pq_m": 8, "rescore": 4},
+        "hnsw": {"index_type": "hnsw", "ef_search": 64},
+        "sq": {"index_type": "sq", "sq_type": "8", "rescore": 4},
+    }
+
+    failed = False
+    with tempfile.TemporaryDirectory() as tmp:
+        encoder = args.encoder or build_tiny_models(Path(tmp) / "models", args.seed)[0]
+        print(f"{'index':<10}{'remove ms':>11}{'misses':>8}{'after reload':>14}")
+        for name, params in configs.items():
+            docs_dir = Path(tmp) / name / "docs"
+            cache_dir = str(Path(tmp) / name / "cache") + "/"
+            corpus = docs_dir / "corpus.jsonl"
+            make_corpus(corpus, args.records, seed=args.seed)
+            retriever = DocsRetriever.from_directory(
+                str(docs_dir), model=encoder, cache_dir=cache_dir, index_params=params
+            )
+
+            lines = corpus.read_text(encoding="utf-8").splitlines()
+            kept = lines[args.n_removed:]
+            corpus.write_text("\n".join(kept) + "\n", encoding="utf-8")
+            start = time.perf_counter()
+            retriever.refresh()
+            seconds = time.perf_counter() - start
+
+            removed = len(lines) - len(kept)
+            missed = misses(retriever)
+            reloaded = misses(DocsRetriever.from_directory(
+                str(docs_dir), model=encoder, cache_dir=cache_dir, index_params=params
+            ))
+            failed = failed or missed > 0 or reloaded > 0
+            print(f"{name:<10}{seconds * 1e3:>11.1f}{missed:>8}{reloaded:>14}  ({removed} records removed)")
+
+    if failed:
+        print("Some index types returned the wrong IDs after removal.")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Latency and throughput of `RAGChat.arespond` against the number of
+concurrent chat sessions.
+
+Each session asks `--turns` questions one after the other; all sessions run
+at the same time. `--stub-latency-ms` replaces the language model with one that
+sleeps for that long, to measure the serving overhead without generation.
+
+Example
+-------
+python benchmarks/load_test.py --docs-dir data/raw/ --sessions 1 4 16 64 --stub-latency-ms 200
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+import numpy as np
+from rag_chatbot.rag_chat import RAGChat
+
+QUESTIONS = [
+    "What is quantum entanglement?",
+    "How does photosynthesis work?",
+    "What causes the seasons?",
+    "Who wrote the theory of relativity?",
+    "What is machine learning?",
+]
+
+class SleepLM:
+    """Stand-in language model that waits a fixed time before replying."""
+    def __init__(self, latency_ms: float):
+        self.latency_s = latency_ms / 1e3
+
+    def generate_text(self, prompt: str, **kwargs) -> str:
+        time.sleep(self.latency_s)
+        return prompt + " A stub reply."
+
+async def run_session(bot: RAGChat, level: int, session: int, turns: int, latencies: list[float]):
+    session_id = f"load-{level}-{session}"
+    history = []
+    for turn in range(turns):
+        question = QUESTIONS[(session + turn) % len(QUESTIONS)]
+        start = time.perf_counter()
+        history = await bot.arespond(question, history, session_id=session_id)
+        latencies.append((time.perf_counter() - start) * 1e3)
+    bot.end_session(session_id)
+
+async def run_load(bot: RAGChat, n_sessions: int, turns: int) -> dict:
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        run_session(bot, n_sessions, i, turns, latencies)
+        for i in range(n_sessions)
+    ))
+    elapsed = time.perf_counter() - start
+    return {
+        "sessions": n_sessions,
+        "requests": len(latencies),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "requests_per_s": len(latencies) / elapsed,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="gpt2")
+    parser.add_argument("--docs-dir", default="data/raw/")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--max-concurrency", type=int, default=8)
+    parser.add_argument("--retrieval-workers", type=int, default=4)
+    parser.add_argument("--generation-workers", type=int, default=2)
+    parser.add_argument("--stub-latency-ms", type=float, default=None)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bot = RAGChat(
+            args.model, 6, args.docs_dir, f"{tmp}/state/", f"{tmp}/logs/",
+            max_concurrency=args.max_concurrency,
+            retrieval_workers=args.retrieval_workers,
+            generation_workers=args.generation_workers,
+        )
+        if args.stub_latency_ms is not None:
+            bot.lm = SleepLM(args.stub_latency_ms)
+
+        rows = [asyncio.run(run_load(bot, n_sessions, args.turns)) for n_sessions in args.sessions]
+        bot.close()
+
+    print(f"{'sessions':>10}{'requests':>10}{'p50 ms':>10}{'p95 ms':>10}{'req/s':>10}")
+    for row in rows:
+        print(
+            f"{row['sessions']:>10}{row['requests']:>10}{row['p50_ms']:>10.1f}"
+            f"{row['p95_ms']:>10.1f}{row['requests_per_s']:>10.2f}"
+        )
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,89 @@
+"""
+Load time, peak resident memory, tokens/s and output divergence from fp32
+of `LocalLM` in each precision.
+
+Every precision is loaded in a fresh process so memory figures do not mix.
+Divergence is measured on greedy decoding: the fraction of generated tokens
+that match fp32 and the mean KL divergence of the next-token distribution
+over the prompt positions.
+
+Example
+-------
+python benchmarks/local_quantization.py --model gpt2 --precisions fp32 bf16 int8 --threads 4
+"""
+import argparse
+import multiprocessing as mp
+import resource
+import time
+import numpy as np
+
+PROMPT = (
+    "System prompt: You are a helpful assistant.\n\n"
+    "User: Explain how quantum entanglement differs from classical correlation.\n"
+    "Assistant:"
+)
+
+def measure(model: str, precision: str, threads: int | None, max_new_tokens: int, repeats: int) -> dict:
+    """Loads the model in one precision and measures it. Runs in a child process."""
+    import torch as tc
+    from basic_chatbot.model_local import LocalLM
+
+    start = time.perf_counter()
+    lm = LocalLM(model, precision=precision, num_threads=threads)
+    load_s = time.perf_counter() - start
+
+    inputs = lm.tokenize_text(PROMPT)
+    with tc.no_grad():
+        logits = lm.model(**inputs).logits[0].float()
+    log_probs = tc.log_softmax(logits, dim=-1).numpy()
+
+    lm.generate_text(PROMPT, max_new_tokens=4, do_sample=False)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        with tc.no_grad():
+            outputs = lm.model.generate(
+                **inputs, max_new_tokens=max_new_tokens, min_new_tokens=max_new_tokens,
+                do_sample=False, pad_token_id=lm.tokenizer.pad_token_id
+            )
+    gen_s = (time.perf_counter() - start) / repeats
+
+    return {
+        "precision": precision,
+        "load_s": load_s,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "tokens_per_s": max_new_tokens / gen_s,
+        "tokens": outputs[0, inputs["input_ids"].shape[1]:].tolist(),
+        "log_probs": log_probs,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="gpt2")
+    parser.add_argument("--precisions", nargs="+", default=["fp32", "bf16", "int8"])
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--max-new-tokens", type=int, default=64)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    precisions = ["fp32"] + [p for p in args.precisions if p != "fp32"]
+    ctx = mp.get_context("spawn")
+    rows = []
+    for precision in precisions:
+        with ctx.Pool(1) as pool:
+            rows.append(pool.apply(
+                measure, (args.model, precision, args.threads, args.max_new_tokens, args.repeats)
+            ))
+
+    reference = rows[0]
+    print(f"{'precision':<10}{'load s':>9}{'peak MiB':>10}{'tokens/s':>10}{'token match':>13}{'mean KL':>10}")
+    for row in rows:
+        match = np.mean([a == b for a, b in zip(row["tokens"], reference["tokens"])])
+        p = np.exp(reference["log_probs"])
+        kl = np.mean(np.sum(p * (reference["log_probs"] - row["log_probs"]), axis=-1))
+        print(
+            f"{row['precision']:<10}{row['load_s']:>9.2f}{row['peak_rss_mb']:>10.0f}"
+            f"{row['tokens_per_s']:>10.1f}{match:>13.3f}{kl:>10.4f}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Per-request cost of writing the chat log synchronously with `log_output`
+versus queueing it on a background `LogWriter`.
+
+Both write the same records, which are the size of a typical reply, from
+`--threads` concurrent callers. The time each call blocks its request is
+the overhead `respond` pays. The time `LogWriter.close` takes to drain the
+queue is reported separately, because it is paid once at shutdown and not
+per request. Use `--dir` to run against the file system the logs will live on.
+
+Example
+-------
+python benchmarks/log_writer.py
+python benchmarks/log_writer.py --records 20000 --threads 8 --max-bytes 1048576 --compress
+"""
+import argparse
+import gzip
+import json
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+from basic_chatbot.logging import LogWriter, log_output
+
+def run(
+    name: str,
+    log,
+    records: int,
+    threads: int,
+    reply_chars: int
+) -> np.ndarray:
+    """Calls `log` `records` times from `threads` threads and returns each call's latency in ms."""
+    reply = "a" * reply_chars
+    stats = {"ttft_s": 0.1, "total_s": 1.0, "tokens": 50, "tokens_per_s": 50.0}
+
+    def call(n: int) -> float:
+        start = time.perf_counter()
+        log(f"question {n}", reply, stats)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(threads) as pool:
+        return np.array(list(pool.map(call, range(records)))) * 1e3
+
+def count_records(path: Path) -> int:
+    """Counts the records in a log and its rotated files."""
+    total = 0
+    for file in path.parent.glob(path.name + "*"):
+        opener = gzip.open if file.suffix == ".gz" else open
+        with opener(file, "rt", encoding="utf-8") as f:
+            total += sum(1 for _ in f)
+    return total
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--records", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--reply-chars", type=int, default=400)
+    parser.add_argument("--flush-interval", type=float, default=1.0)
+    parser.add_argument("--max-bytes", type=int, default=None)
+    parser.add_argument("--compress", action="store_true")
+    parser.add_argument("--dir", default=None, help="Directory for the logs (default: a temporary one).")
+    parser.add_argument("--output", default=None, help="Optional path for JSON results.")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory(dir=args.dir) as log_dir:
+        sync_path = Path(log_dir) / "sync" / "chat_logs.jsonl"
+        latencies = run(
+            "sync", lambda *a: log_output(str(sync_path), *a),
+            args.records, args.threads, args.reply_chars
+        )
+        results["sync"] = {"latencies": latencies, "close_ms": 0.0, "records": count_records(sync_path)}
+
+        writer_path = Path(log_dir) / "writer" / "chat_logs.jsonl"
+        writer = LogWriter(
+            str(writer_path), max_queue=args.records, flush_interval=args.flush_interval,
+            max_bytes=args.max_bytes, backups=1000, compress=args.compress
+        )
+        latencies = run("writer", writer.log, args.records, args.threads, args.reply_chars)
+        start = time.perf_counter()
+        writer.close()
+        results["writer"] = {
+            "latencies": latencies,
+            "close_ms": (time.perf_counter() - start) * 1e3,
+            "records": count_records(writer_path),
+            **writer.stats(),
+        }
+
+    print(f"{'mode':<8}{'mean us':>10}{'p50 us':>10}{'p99 us':>10}{'max us':>10}{'close ms':>10}{'records':>9}")
+    summary = {}
+    for name, result in results.items():
+        latencies = result.pop("latencies") * 1e3
+        summary[name] = {
+            "mean_us": float(latencies.mean()),
+            "p50_us": float(np.percentile(latencies, 50)),
+            "p99_us": float(np.percentile(latencies, 99)),
+            "max_us": float(latencies.max()),
+            **result,
+        }
+        row = summary[name]
+        print(
+            f"{name:<8}{row['mean_us']:>10.1f}{row['p50_us']:>10.1f}{row['p99_us']:>10.1f}"
+            f"{row['max_us']:>10.1f}{row['close_ms']:>10.1f}{row['records']:>9}"
+        )
+    writer = summary["writer"]
+    print(f"writer: {writer['batches']} batches, {writer['rotations']} rotations, {writer['dropped']} dropped")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+if __name__ == "__main__":
+    main()
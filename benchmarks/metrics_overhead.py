@@ -0,0 +1,111 @@
+"""
+Cost of the built-in latency instrumentation, and a per-stage latency
+breakdown of real requests.
+
+The cost of `Metrics.timer` and `Metrics.span` is measured with recording
+enabled and disabled, from `--threads` threads at once. With `--model`, a
+`RAGChat` then answers `--requests` questions, and the p50/p95/p99 of every
+stage (query encoding, index search, prompt building, tokenization,
+generation, decoding, log and state I/O) are printed from the same
+histograms that are exported to Prometheus.
+
+Example
+-------
+python benchmarks/metrics_overhead.py
+python benchmarks/metrics_overhead.py --model gpt2 --docs-dir data/raw/ --requests 20
+"""
+import argparse
+import json
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from basic_chatbot.metrics import METRICS, Metrics
+
+def timer_cost(
+    metrics: Metrics,
+    n: int,
+    threads: int
+) -> float:
+    """Wall-clock nanoseconds per timed stage inside a span, with `threads` threads timing at once."""
+    def work(_):
+        with metrics.span("bench"):
+            for _ in range(n):
+                with metrics.timer("bench", "stage"):
+                    pass
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(work, range(threads)))
+    return (time.perf_counter() - start) / (n * threads) * 1e9
+
+def span_cost(metrics: Metrics, n: int) -> float:
+    """Nanoseconds per request span without stages."""
+    start = time.perf_counter()
+    for _ in range(n):
+        with metrics.span("bench"):
+            pass
+    return (time.perf_counter() - start) / n * 1e9
+
+def stage_breakdown(
+    model: str,
+    docs_dir: str,
+    requests: int
+) -> dict[str, dict]:
+    """Answers `requests` questions with a `RAGChat` and returns the stage summaries."""
+    from rag_chatbot.rag_chat import RAGChat
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bot = RAGChat(model, 3, docs_dir, tmp_dir + "/", tmp_dir + "/", top_k=2)
+        METRICS.reset()
+        for n in range(requests):
+            bot.respond(f"What is document {n} about?", [])
+        bot.close()
+    return {
+        series: summary for series, summary in METRICS.summary().items()
+        if series.startswith(("chatbot_stage_seconds", "chatbot_request_seconds"))
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--docs-dir", default="data/raw/")
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument("--output", default=None, help="Optional path for JSON results.")
+    args = parser.parse_args()
+
+    results = {"overhead_ns": {}}
+    for enabled in (True, False):
+        metrics = Metrics(enabled)
+        name = "enabled" if enabled else "disabled"
+        results["overhead_ns"][name] = {
+            "timer": timer_cost(metrics, args.iterations // args.threads, args.threads),
+            "span": span_cost(metrics, args.iterations // 10),
+        }
+        row = results["overhead_ns"][name]
+        print(f"{name:<9} timer {row['timer']:>7.0f} ns   span {row['span']:>7.0f} ns")
+
+    if args.model:
+        results["stages"] = stage_breakdown(args.model, args.docs_dir, args.requests)
+        print(f"\n{'series':<64}{'count':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for series, summary in results["stages"].items():
+            print(
+                f"{series:<64}{summary['count']:>6}{summary['p50'] * 1e3:>10.2f}"
+                f"{summary['p95'] * 1e3:>10.2f}{summary['p99'] * 1e3:>10.2f}"
+            )
+
+        stages = [s for s in results["stages"] if s.startswith("chatbot_stage_seconds")]
+        requests = [v for s, v in results["stages"].items() if s.startswith("chatbot_request_seconds")]
+        if requests:
+            cost_s = (len(stages) * results["overhead_ns"]["enabled"]["timer"]
+                      + results["overhead_ns"]["enabled"]["span"]) * 1e-9
+            share = cost_s / requests[0]["p50"] * 100
+            print(f"\ninstrumentation: ~{cost_s * 1e6:.0f} us per request ({share:.3f}% of p50)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Latency percentiles of `OpenAIChat` against a local stub of the chat
+completions endpoint with a slow tail and transient server errors.
+
+The stub answers after a random delay: `--latency-ms` most of the time and
+`--slow-ms` with probability `--slow-rate`. With probability `--error-rate`
+it returns HTTP 500 instead. Runs compared:
+
+- sync: the blocking client on `--concurrency` threads (the SDK retries errors)
+- async: `agenerate_text` with pooled connections, deadline and jittered retries
+- hedged: the same with a duplicate request after `--hedge-ms`
+
+Example
+-------
+python benchmarks/openai_client.py --requests 400 --concurrency 16 --hedge-ms 150
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import numpy as np
+from basic_chatbot.model_openai import OpenAIChat
+
+def make_handler(latency_s: float, slow_s: float, slow_rate: float, error_rate: float, seed: int):
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            with lock:
+                slow, error = rng.random() < slow_rate, rng.random() < error_rate
+            time.sleep(slow_s if slow else latency_s * rng.uniform(0.5, 1.5))
+
+            if error:
+                status, payload = 500, {"error": {"message": "stub error", "type": "server_error"}}
+            else:
+                status, payload = 200, {
+                    "id": "stub", "object": "chat.completion", "created": int(time.time()),
+                    "model": body["model"],
+                    "choices": [{
+                        "index": 0, "finish_reason": "stop",
+                        "message": {"role": "assistant", "content": "Assistant: stub reply"},
+                    }],
+                    "usage": {"prompt_tokens": 1, "completion_tokens": 3, "total_tokens": 4},
+                }
+            data = json.dumps(payload).encode()
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up on this request, e.g. a cancelled hedge.
+                self.close_connection = True
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+def percentiles(latencies: list[float]) -> dict[str, float]:
+    """Returns p50, p95, p99 and max latency in milliseconds."""
+    ms = np.asarray(latencies) * 1e3
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max()),
+    }
+
+def run_sync(lm: OpenAIChat, n_requests: int, concurrency: int) -> tuple[list[float], int]:
+    """Sends requests through the blocking client on a thread pool."""
+    def call(n):
+        start = time.perf_counter()
+        try:
+            lm.generate_text(f"Question {n}")
+            return time.perf_counter() - start, False
+        except Exception:
+            return time.perf_counter() - start, True
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(call, range(n_requests)))
+    return [t for t, _ in results], sum(e for _, e in results)
+
+async def run_async(lm: OpenAIChat, n_requests: int, concurrency: int) -> tuple[list[float], int]:
+    """Sends requests through `agenerate_text` from `concurrency` concurrent callers."""
+    queue = list(range(n_requests))
+    latencies, errors = [], 0
+
+    async def caller():
+        nonlocal errors
+        while queue:
+            n = queue.pop()
+            start = time.perf_counter()
+            try:
+                await lm.agenerate_text(f"Question {n}")
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(caller() for _ in range(concurrency)))
+    await lm.aclose()
+    return latencies, errors
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--slow-ms", type=float, default=1000)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.02)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--max-retries", type=int, default=2)
+    parser.add_argument("--hedge-ms", type=float, default=150)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Optional path for JSON results.")
+    args = parser.parse_args()
+
+    handler = make_handler(
+        args.latency_ms / 1e3, args.slow_ms / 1e3, args.slow_rate, args.error_rate, args.seed
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    def client(hedge_after=None):
+        return OpenAIChat(
+            "stub", api_key="stub", base_url=base_url, timeout=args.timeout,
+            max_retries=args.max_retries, backoff=0.05, max_concurrency=args.concurrency * 2,
+            hedge_after=hedge_after
+        )
+
+    rows = []
+    for name in ("sync", "async", "hedged"):
+        lm = client(args.hedge_ms / 1e3 if name == "hedged" else None)
+        start = time.perf_counter()
+        if name == "sync":
+            latencies, errors = run_sync(lm, args.requests, args.concurrency)
+        else:
+            latencies, errors = asyncio.run(run_async(lm, args.requests, args.concurrency))
+        elapsed = time.perf_counter() - start
+        rows.append({
+            "client": name,
+            **percentiles(latencies),
+            "requests_per_s": args.requests / elapsed,
+            "errors": errors,
+            **({} if name == "sync" else lm.counters),
+        })
+    server.shutdown()
+
+    print(
+        f"{'client':<8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+        f"{'req/s':>9}{'errors':>8}{'retries':>9}{'hedges':>8}{'won':>6}"
+    )
+    for row in rows:
+        print(
+            f"{row['client']:<8}{row['p50_ms']:>9.1f}{row['p95_ms']:>9.1f}{row['p99_ms']:>9.1f}"
+            f"{row['max_ms']:>9.1f}{row['requests_per_s']:>9.1f}{row['errors']:>8}"
+            f"{row.get('retries', '-'):>9}{row.get('hedges', '-'):>8}{row.get('hedge_wins', '-'):>6}"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Index build time of the serial and multi-process encoders against core count,
+checking that every parallel build matches the serial one.
+
+Example
+-------
+python benchmarks/parallel_embedding.py --docs-dir data/raw/ --workers 1 2 4 8
+"""
+import argparse
+import os
+import time
+import faiss
+import numpy as np
+from rag_chatbot.documents import iter_chunks
+from rag_chatbot.retriever import DocsRetriever
+
+def flat_vectors(retriever: DocsRetriever) -> tuple[np.ndarray, np.ndarray]:
+    """Returns the vector IDs and stored vectors of a flat ID-mapped index."""
+    index = retriever.index
+    ids = faiss.vector_to_array(index.id_map)
+    return ids, index.index.reconstruct_n(0, index.ntotal)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs-dir", default="data/raw/")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, nargs="+", default=None)
+    args = parser.parse_args()
+
+    cores = os.cpu_count() or 1
+    workers = args.workers or sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1)))
+
+    results = []
+    for n_workers in workers:
+        start = time.perf_counter()
+        retriever = DocsRetriever(
+            iter_chunks(args.docs_dir), model=args.model,
+            batch_size=args.batch_size, n_workers=n_workers
+        )
+        results.append((n_workers, time.perf_counter() - start, retriever))
+
+    base_ids, base_vectors = flat_vectors(results[0][2])
+    base_s = results[0][1]
+
+    print(f"{cores} cores, {len(base_ids)} chunks")
+    print(f"{'workers':>8}{'seconds':>10}{'speedup':>10}{'same ids':>10}{'max |diff|':>12}")
+    for n_workers, seconds, retriever in results:
+        ids, vectors = flat_vectors(retriever)
+        same_ids = np.array_equal(ids, base_ids)
+        diff = float(np.abs(vectors - base_vectors).max()) if same_ids else float("nan")
+        print(f"{n_workers:>8}{seconds:>10.2f}{base_s / seconds:>10.2f}{str(same_ids):>10}{diff:>12.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Per-turn prompt and prefill token counts of `RAGChat.chat` with and without
+the prompt prefix cache, over a conversation longer than `--n-turns`.
+
+Prompts are built by `RAGChat` itself, with the last `--n-turns` turns of
+history (6 in `config.yaml`) before the retrieved context. While the history
+grows, the cache only runs the tokens after the previous prompt's history.
+Once the window starts sliding, the oldest turn drops out of the prompt on
+every turn, so the history no longer forms a shared prefix and only the
+system prompt is reused. Trimming old turns to fit `prompt_budget` has the
+same effect. The table shows both phases.
+
+Example
+-------
+python benchmarks/prefix_cache.py --model gpt2 --turns 12
+"""
+import argparse
+import tempfile
+from basic_chatbot.kv_cache import PrefixCache
+from basic_chatbot.metrics import METRICS
+from rag_chatbot.rag_chat import RAGChat
+from utils import set_seed
+
+QUESTIONS = [
+    "What is quantum entanglement?",
+    "How does photosynthesis work in plants?",
+    "Why is the sky blue during the day?",
+    "Explain the theory of relativity in simple terms.",
+]
+
+def run(bot: RAGChat, session_id: str, turns: int, seed: int) -> list[tuple[int, int, float]]:
+    """Returns the prompt tokens, prefilled tokens and generation time of every turn."""
+    set_seed(seed)
+    rows = []
+    for turn in range(turns):
+        with METRICS.span("turn") as span:
+            bot.chat(QUESTIONS[turn % len(QUESTIONS)], session_id=session_id)
+        rows.append((
+            span.attrs["prompt_tokens"], span.attrs["prefill_tokens"],
+            span.stages["local_lm.generate"] * 1e3
+        ))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="gpt2")
+    parser.add_argument("--embedding-model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--docs-dir", default="data/raw/")
+    parser.add_argument("--n-turns", type=int, default=6, help="History window, as `n_turns` in config.yaml.")
+    parser.add_argument("--turns", type=int, default=12)
+    parser.add_argument("--prefix-cache-mb", type=float, default=512)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bot = RAGChat(
+            args.model, args.n_turns, args.docs_dir, f"{tmp}/state/", f"{tmp}/logs/",
+            embedding_model=args.embedding_model
+        )
+        baseline = run(bot, "no-cache", args.turns, args.seed)
+        bot.lm.prefix_cache = PrefixCache(int(args.prefix_cache_mb * 2**20))
+        cached = run(bot, "cache", args.turns, args.seed)
+        bot.close()
+
+    print(f"{'turn':>5}{'prompt':>8}{'prefill (no cache)':>20}{'ms':>9}{'prompt':>8}{'prefill (cache)':>17}{'ms':>9}")
+    for turn, ((p0, n0, ms0), (p1, n1, ms1)) in enumerate(zip(baseline, cached), 1):
+        print(f"{turn:>5}{p0:>8}{n0:>20}{ms0:>9.1f}{p1:>8}{n1:>17}{ms1:>9.1f}")
+    print(bot.lm.prefix_cache.stats())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Retrieval quality against latency and memory for several `DocsRetriever`
+configurations, on a labelled query set.
+
+Every configuration sets any of `"model"`, `"encoder_precision"`, `"chunking"`
+and `"index_params"` (see `DocsRetriever.from_directory`); the index is built
+from scratch for each one. For each configuration the table reports
+recall@k, nDCG@k and MRR over records, query latency percentiles, build time
+and index memory (FAISS index plus the float32 vectors kept for rescoring).
+Rows marked with `*` are on the Pareto front of `--quality` against p95
+latency and memory: no other configuration is at least as good on all three.
+
+`--configs` takes a JSON list of configurations, e.g.
+`[{"name": "hnsw", "index_params": {"index_type": "hnsw", "ef_search": 32}}]`.
+Without it, a default grid of index types and chunk sizes is evaluated.
+Configurations that cannot be built (e.g. more IVF lists than chunks)
+are reported and skipped.
+
+Example
+-------
+python benchmarks/retrieval_eval.py --docs-dir data/raw/ --queries data/eval/queries.jsonl
+python benchmarks/retrieval_eval.py --configs configs.json --quality recall@5 --output results.json
+"""
+import argparse
+import json
+import time
+from rag_chatbot.evaluation import evaluate_retriever, index_memory, load_queries, pareto_front
+from rag_chatbot.retriever import DocsRetriever
+
+def default_configs(nlist: int, rescore: int) -> list[dict]:
+    """Index types and chunk sizes compared when no `--configs` file is given."""
+    return [
+        {"name": "flat"},
+        {"name": "flat chunk=200", "chunking": {"strategy": "sentence", "chunk_size": 200, "overlap": 1}},
+        {"name": "flat chunk=400", "chunking": {"strategy": "sentence", "chunk_size": 400, "overlap": 1}},
+        {"name": "flat bf16", "encoder_precision": "bf16"},
+        {"name": "hnsw ef=16", "index_params": {"index_type": "hnsw", "ef_search": 16}},
+        {"name": "hnsw ef=64", "index_params": {"index_type": "hnsw", "ef_search": 64}},
+        {"name": "ivf nprobe=4", "index_params": {"index_type": "ivf_flat", "nlist": nlist, "nprobe": 4}},
+        {"name": "ivf nprobe=16", "index_params": {"index_type": "ivf_flat", "nlist": nlist, "nprobe": 16}},
+        {"name": "sq8", "index_params": {"index_type": "sq", "sq_type": "8"}},
+        {"name": f"sq8 rescore={rescore}", "index_params": {"index_type": "sq", "sq_type": "8", "rescore": rescore}},
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--docs-dir", default="data/raw/")
+    parser.add_argument("--queries", default="data/eval/queries.jsonl")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--configs", default=None, help="JSON file with a list of configurations.")
+    parser.add_argument("--ks", type=int, nargs="+", default=[1, 3, 5])
+    parser.add_argument("--n-chunks", type=int, default=20)
+    parser.add_argument("--quality", default=None, help="Metric of the Pareto front (default: ndcg@max k).")
+    parser.add_argument("--nlist", type=int, default=64)
+    parser.add_argument("--rescore", type=int, default=4)
+    parser.add_argument("--output", default=None, help="Optional path for JSON results.")
+    args = parser.parse_args()
+
+    if args.configs:
+        with open(args.configs, encoding="utf-8") as f:
+            configs = json.load(f)
+    else:
+        configs = default_configs(args.nlist, args.rescore)
+    quality = args.quality or f"ndcg@{max(args.ks)}"
+    queries = load_queries(args.queries)
+
+    rows = []
+    for n, config in enumerate(configs):
+        name = config.get("name", f"config {n}")
+        start = time.perf_counter()
+        try:
+            retriever = DocsRetriever.from_directory(
+                args.docs_dir,
+                model=config.get("model", args.model),
+                chunking=config.get("chunking"),
+                index_params=config.get("index_params"),
+                encoder_precision=config.get("encoder_precision", "fp32"),
+            )
+        except (ValueError, RuntimeError) as e:
+            print(f"{name}: skipped ({e})")
+            continue
+        build_s = time.perf_counter() - start
+
+        memory = index_memory(retriever)
+        results = evaluate_retriever(
+            retriever.retrieve_ids_batch, queries, retriever.chunk_sources(),
+            tuple(args.ks), args.n_chunks
+        )
+        rows.append({
+            "name": name,
+            **config,
+            **results,
+            **memory,
+            "memory_bytes": memory["index_bytes"] + memory["vector_bytes"],
+            "build_s": build_s,
+        })
+
+    if not rows:
+        return
+    for row, optimal in zip(rows, pareto_front(rows, quality)):
+        row["pareto"] = optimal
+
+    metrics = [f"recall@{k}" for k in args.ks] + [f"ndcg@{k}" for k in args.ks] + ["mrr"]
+    print(
+        f"\n{'configuration':<24}" + "".join(f"{m:>10}" for m in metrics)
+        + f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'MB':>9}{'chunks':>9}{'build s':>9}"
+    )
+    for row in sorted(rows, key=lambda r: -r[quality]):
+        print(
+            f"{('* ' if row['pareto'] else '  ') + row['name']:<24}"
+            + "".join(f"{row[m]:>10.3f}" for m in metrics)
+            + f"{row['p50_ms']:>10.3f}{row['p95_ms']:>10.3f}{row['p99_ms']:>10.3f}"
+            f"{row['memory_bytes'] / 1e6:>9.2f}{row['n_chunks']:>9}{row['build_s']:>9.1f}"
+        )
+    print(f"\n* Pareto front of {quality} against p95 latency and memory.")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+if __name__ == "__main__":
+    main()
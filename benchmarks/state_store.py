@@ -0,0 +1,143 @@
+"""
+Turn-persist latency, fsync count and bytes written per turn of the
+conversation state backends as a conversation's history grows.
+
+`json` rewrites the whole conversation file on every turn (the state file
+used when `state_store` is null); `jsonl` and `sqlite` append the new turns
+to an append-only store (see `basic_chatbot.store`). For every history
+length in `--lengths`, the conversation is grown to that length and the
+next `--window` turns are timed. With `--threads`, that many conversations
+persist at once, so `jsonl` appends share fsyncs (group commit).
+Bytes written are read from `/proc/self/io` where available. Only fsyncs
+made from Python are counted; in WAL mode with `synchronous=NORMAL`, SQLite
+syncs only when it checkpoints the log.
+
+Example
+-------
+python benchmarks/state_store.py
+python benchmarks/state_store.py --lengths 100 1000 10000 --threads 8 --output results.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+from basic_chatbot.memory import ChatMemory
+from basic_chatbot.store import open_store
+
+BACKENDS = ["json", "jsonl", "sqlite"]
+
+class FsyncCounter:
+    """Counts calls to `os.fsync` while active."""
+    def __enter__(self):
+        self.count = 0
+        self._fsync = os.fsync
+
+        def fsync(fd):
+            self.count += 1
+            return self._fsync(fd)
+
+        os.fsync = fsync
+        return self
+
+    def __exit__(self, *exc):
+        os.fsync = self._fsync
+
+def written_bytes() -> int | None:
+    """Bytes this process has passed to `write` so far, or None if unknown."""
+    try:
+        with open("/proc/self/io", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("wchar:"):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+def add_turn(memory: ChatMemory, n: int, turn_chars: int):
+    """Adds one question and reply of `turn_chars` characters each."""
+    memory.add_user(f"question {n} " + "q" * turn_chars)
+    memory.add_assistant(f"answer {n} " + "a" * turn_chars)
+
+def run(
+    backend: str,
+    lengths: list[int],
+    window: int,
+    threads: int,
+    turn_chars: int
+) -> list[dict]:
+    """Times `window` persisted turns at each history length for one backend."""
+    with tempfile.TemporaryDirectory() as state_dir:
+        state_path = str(Path(state_dir) / "conversation_state.json")
+        store = None
+        if backend != "json":
+            store = open_store(state_path, backend, max_turns=None, compact_every=10**9)
+        memories = [ChatMemory(store=store, session=f"s{i}") for i in range(threads)]
+        paths = [str(Path(state_dir) / f"conversation_state_s{i}.json") for i in range(threads)]
+
+        def persist(i: int, n: int) -> float:
+            add_turn(memories[i], n, turn_chars)
+            start = time.perf_counter()
+            memories[i].save(paths[i])
+            return time.perf_counter() - start
+
+        rows = []
+        n = 0
+        with ThreadPoolExecutor(threads) as pool:
+            for length in lengths:
+                while len(memories[0].turns) < length:
+                    list(pool.map(persist, range(threads), [n] * threads))
+                    n += 1
+
+                before = written_bytes()
+                with FsyncCounter() as fsyncs:
+                    latencies = []
+                    for _ in range(window):
+                        latencies.extend(pool.map(persist, range(threads), [n] * threads))
+                        n += 1
+                after = written_bytes()
+
+                latencies = np.array(latencies) * 1e3
+                turns = window * threads
+                rows.append({
+                    "backend": backend,
+                    "history": length,
+                    "mean_ms": float(latencies.mean()),
+                    "p95_ms": float(np.percentile(latencies, 95)),
+                    "fsyncs_per_turn": fsyncs.count / turns,
+                    "kb_per_turn": (after - before) / turns / 1024 if before is not None else None,
+                })
+        if store is not None:
+            store.close()
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--backends", nargs="+", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--lengths", nargs="+", type=int, default=[10, 100, 1000, 5000])
+    parser.add_argument("--window", type=int, default=50)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--turn-chars", type=int, default=200)
+    parser.add_argument("--output", default=None, help="Optional path for JSON results.")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'backend':<8}{'history':>9}{'mean ms':>10}{'p95 ms':>10}{'fsync/turn':>12}{'KB/turn':>10}")
+    for backend in args.backends:
+        for row in run(backend, sorted(args.lengths), args.window, args.threads, args.turn_chars):
+            results.append(row)
+            kb = f"{row['kb_per_turn']:.1f}" if row["kb_per_turn"] is not None else "-"
+            print(
+                f"{backend:<8}{row['history']:>9}{row['mean_ms']:>10.3f}{row['p95_ms']:>10.3f}"
+                f"{row['fsyncs_per_turn']:>12.2f}{kb:>10}"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
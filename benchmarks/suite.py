@@ -0,0 +1,369 @@
+"""
+End-to-end benchmark suite that runs offline on CPU.
+
+For every corpus size in `--sizes`, a synthetic corpus in the
+`data/raw/corpus.jsonl` format is generated from `--seed`, and a fresh
+process measures:
+
+- ingestion: `iter_jsonl_directory` throughput,
+- index build: `DocsRetriever` build time, chunks/s, index size and peak RSS,
+- retrieval: `retrieve` latency for every k in `--ks`,
+- prompt building: `build_prompt_with_history` and `build_budgeted_prompt`,
+- chat: full `RAGChat.chat` latency.
+
+Unless `--encoder` and `--llm` name real models, a tiny sentence-transformers
+encoder and a tiny GPT-2 are built from the corpus vocabulary with seeded
+random weights, so nothing is downloaded. With `--llm stub`, generation is
+replaced by a fixed reply to time the pipeline around the model.
+
+Results are written as JSON with the commit and library versions. With
+`--compare`, latencies and throughputs are compared against an earlier
+results file, and the script exits with status 1 if any of them regressed by
+more than `--max-regression`.
+
+Example
+-------
+python benchmarks/suite.py --output results.json
+python benchmarks/suite.py --sizes 1000 10000 --ks 1 5 20 --llm stub --output new.json --compare results.json
+"""
+import argparse
+import json
+import multiprocessing as mp
+import platform
+import random
+import resource
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+
+TOPICS = {
+    "physics": "quantum particle energy field wave mass boson entanglement photon spin gravity relativity",
+    "biology": "cell protein gene enzyme photosynthesis membrane organism evolution species tissue",
+    "ml": "model training gradient attention transformer embedding token loss dataset inference",
+    "history": "empire war treaty dynasty revolution kingdom trade century colony republic",
+    "geography": "river mountain climate ocean desert continent glacier valley island season",
+}
+FILLER = "the a of and in to is that which by with for from describes explains".split()
+
+def make_corpus(
+    path: Path,
+    n_records: int,
+    words_per_record: int = 40,
+    seed: int = 0
+) -> list[str]:
+    """
+    Writes a synthetic corpus with the fields of `data/raw/corpus.jsonl`
+    and returns one query per record (a few words taken from the record).
+    """
+    rng = random.Random(seed)
+    topics = list(TOPICS)
+    queries = []
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("w", encoding="utf-8") as f:
+        for n in range(n_records):
+            topic = topics[n % len(topics)]
+            vocab = TOPICS[topic].split()
+            words = [
+                rng.choice(vocab) if rng.random() < 0.6 else rng.choice(FILLER)
+                for _ in range(words_per_record)
+            ]
+            words += [f"item{n}"]
+            text = " ".join(words).capitalize() + "."
+            record = {"id": f"doc_{n:06d}", "text": text, "topic": topic}
+            f.write(json.dumps(record) + "\n")
+
+            start = rng.randrange(max(1, words_per_record - 6))
+            queries.append(" ".join(words[start:start + 6]))
+    return queries
+
+def build_tiny_models(directory: Path, seed: int = 0) -> tuple[str, str]:
+    """
+    Builds a tiny sentence-transformers encoder and a tiny GPT-2 from the
+    synthetic vocabulary with seeded random weights. Returns their paths.
+    """
+    import torch as tc
+    from sentence_transformers import SentenceTransformer, models
+    from tokenizers import Tokenizer, decoders, pre_tokenizers, trainers
+    from tokenizers import models as tokenizer_models
+    from transformers import (
+        BertConfig, BertModel, BertTokenizerFast,
+        GPT2Config, GPT2LMHeadModel, GPT2TokenizerFast
+    )
+
+    tc.manual_seed(seed)
+    words = sorted({w for text in TOPICS.values() for w in text.split()} | set(FILLER))
+    text = " ".join(words * 20 + ["User:", "Assistant:", "Context:", "Question:"] * 20)
+
+    bert_dir = directory / "tiny-bert"
+    bert_dir.mkdir(parents=True, exist_ok=True)
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + list("abcdefghijklmnopqrstuvwxyz0123456789.:") + words
+    (bert_dir / "vocab.txt").write_text("\n".join(dict.fromkeys(vocab)), encoding="utf-8")
+    bert_tokenizer = BertTokenizerFast(str(bert_dir / "vocab.txt"))
+    bert_tokenizer.save_pretrained(bert_dir)
+    BertModel(BertConfig(
+        vocab_size=len(bert_tokenizer), hidden_size=64, num_hidden_layers=2,
+        num_attention_heads=2, intermediate_size=128, max_position_embeddings=256
+    )).save_pretrained(bert_dir)
+    transformer = models.Transformer(str(bert_dir), max_seq_length=128)
+    encoder_dir = directory / "tiny-encoder"
+    SentenceTransformer(modules=[
+        transformer, models.Pooling(transformer.get_word_embedding_dimension())
+    ]).save(str(encoder_dir))
+
+    bpe = Tokenizer(tokenizer_models.BPE())
+    bpe.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    bpe.decoder = decoders.ByteLevel()
+    bpe.train_from_iterator([text], trainers.BpeTrainer(
+        vocab_size=1000, special_tokens=["<|endoftext|>"],
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet()
+    ))
+    gpt_tokenizer = GPT2TokenizerFast(
+        tokenizer_object=bpe, eos_token="<|endoftext|>",
+        bos_token="<|endoftext|>", unk_token="<|endoftext|>"
+    )
+    gpt_tokenizer.model_max_length = 1024
+    llm_dir = directory / "tiny-gpt2"
+    gpt_tokenizer.save_pretrained(llm_dir)
+    GPT2LMHeadModel(GPT2Config(
+        vocab_size=len(gpt_tokenizer), n_positions=1024, n_embd=64, n_layer=2, n_head=2,
+        bos_token_id=gpt_tokenizer.eos_token_id, eos_token_id=gpt_tokenizer.eos_token_id
+    )).save_pretrained(llm_dir)
+    return str(encoder_dir), str(llm_dir)
+
+class StubLM:
+    """Stand-in language model returning a fixed reply at once."""
+    def generate_text(self, prompt: str, **kwargs) -> str:
+        return prompt + " The answer is in the context above."
+
+def percentiles(latencies: list[float]) -> dict[str, float]:
+    """p50/p95/p99 and mean of latencies in milliseconds."""
+    latencies = np.asarray(latencies) * 1e3
+    return {
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "mean_ms": float(latencies.mean()),
+    }
+
+def run_size(
+    n_records: int,
+    encoder: str,
+    llm: str,
+    stub: bool,
+    ks: list[int],
+    n_queries: int,
+    n_chats: int,
+    seed: int
+) -> dict:
+    """
+    Generates a corpus of `n_records` records and runs every measurement on it.
+    The chat reuses the index cache written by the build. With `stub`, the
+    loaded model only serves token counting and `StubLM` generates.
+    """
+    import faiss
+    from rag_chatbot.documents import iter_jsonl_directory
+    from rag_chatbot.prompt_utils import TokenCounter, build_budgeted_prompt, build_prompt_with_history
+    from rag_chatbot.rag_chat import RAGChat
+    from rag_chatbot.retriever import DocsRetriever
+    from utils import set_seed
+
+    set_seed(seed)
+    result = {"records": n_records}
+    with tempfile.TemporaryDirectory() as tmp:
+        docs_dir = Path(tmp) / "docs"
+        queries = make_corpus(docs_dir / "corpus.jsonl", n_records, seed=seed)
+        rng = random.Random(seed)
+        queries = [rng.choice(queries) for _ in range(n_queries)]
+        corpus_mb = (docs_dir / "corpus.jsonl").stat().st_size / 2**20
+
+        start = time.perf_counter()
+        chunks = iter_jsonl_directory(str(docs_dir))
+        seconds = time.perf_counter() - start
+        result["ingest"] = {
+            "chunks": len(chunks),
+            "seconds": seconds,
+            "records_per_s": n_records / seconds,
+            "mb_per_s": corpus_mb / seconds,
+        }
+
+        rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        start = time.perf_counter()
+        cache_dir = Path(tmp) / "cache"
+        retriever = DocsRetriever.from_directory(str(docs_dir), model=encoder, cache_dir=str(cache_dir) + "/")
+        seconds = time.perf_counter() - start
+        result["build"] = {
+            "seconds": seconds,
+            "chunks_per_s": len(retriever.documents) / seconds,
+            "index_mb": len(faiss.serialize_index(retriever.index)) / 2**20,
+            "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "peak_rss_growth_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 - rss_before,
+        }
+
+        result["retrieve"] = {}
+        retriever.retrieve(queries[0], max(ks))
+        for k in ks:
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                retriever.retrieve(query, k)
+                latencies.append(time.perf_counter() - start)
+            result["retrieve"][f"k={k}"] = percentiles(latencies)
+
+        docs = retriever.retrieve(queries[0], max(ks))
+        history = [f"User: {q}" if n % 2 == 0 else f"Assistant: {q}" for n, q in enumerate(queries[:6])]
+        counter = TokenCounter()
+        result["prompt"] = {}
+        for name, build in (
+            ("plain", lambda q: build_prompt_with_history(history, docs, q)),
+            ("budgeted", lambda q: build_budgeted_prompt(history, docs, q, counter, 512)),
+        ):
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                build(query)
+                latencies.append(time.perf_counter() - start)
+            result["prompt"][name] = percentiles(latencies)
+
+        with tempfile.TemporaryDirectory() as state_dir:
+            bot = RAGChat(
+                llm, 6, str(docs_dir) + "/", state_dir + "/", state_dir + "/",
+                cache_dir=str(cache_dir) + "/", top_k=3, embedding_model=encoder
+            )
+            if stub:
+                bot.lm = StubLM()
+            latencies = []
+            for question in queries[:n_chats]:
+                start = time.perf_counter()
+                bot.chat(question)
+                latencies.append(time.perf_counter() - start)
+            bot.close()
+        result["chat"] = percentiles(latencies)
+    return result
+
+def metadata(args: argparse.Namespace) -> dict:
+    """Commit, library versions and machine the results were measured with."""
+    import faiss
+    import sentence_transformers
+    import torch
+    import transformers
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "time": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": mp.cpu_count(),
+        "versions": {
+            "torch": torch.__version__,
+            "transformers": transformers.__version__,
+            "sentence_transformers": sentence_transformers.__version__,
+            "faiss": faiss.__version__,
+        },
+        "args": vars(args),
+    }
+
+def flatten(result: dict, prefix: str = "") -> dict[str, float]:
+    """Flattens nested results into `"a/b/c"` keys."""
+    flat = {}
+    for key, value in result.items():
+        name = f"{prefix}/{key}" if prefix else str(key)
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+def compare(
+    old: dict,
+    new: dict,
+    max_regression: float
+) -> list[str]:
+    """
+    Prints the change of every latency (`_ms`, `seconds`) and throughput
+    (`_per_s`) metric present in both results and returns those that got
+    worse by more than `max_regression` (a fraction).
+    """
+    old_runs = {run["records"]: flatten(run) for run in old["results"]}
+    regressions = []
+    print(f"\ncompared with {old['meta'].get('commit')}:")
+    print(f"{'metric':<44}{'old':>12}{'new':>12}{'change':>10}")
+    for run in new["results"]:
+        before = old_runs.get(run["records"])
+        if before is None:
+            continue
+        for name, value in flatten(run).items():
+            lower_is_better = name.endswith("_ms") or name.endswith("seconds")
+            if not (lower_is_better or name.endswith("_per_s")) or not before.get(name):
+                continue
+            change = value / before[name] - 1
+            worse = change if lower_is_better else -change
+            metric = f"{run['records']}/{name}"
+            flag = " !" if worse > max_regression else ""
+            print(f"{metric:<44}{before[name]:>12.3f}{value:>12.3f}{change:>+10.1%}{flag}")
+            if worse > max_regression:
+                regressions.append(metric)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--ks", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--encoder", default=None, help="Embedding model (default: a tiny seeded one).")
+    parser.add_argument("--llm", default="tiny", help='"tiny", "stub" or a model name or path.')
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Optional path for JSON results.")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against.")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    results = {"meta": metadata(args), "results": []}
+    with tempfile.TemporaryDirectory() as model_dir:
+        encoder, llm = args.encoder, args.llm
+        if encoder is None or llm in ("tiny", "stub"):
+            tiny_encoder, tiny_llm = build_tiny_models(Path(model_dir), args.seed)
+            encoder = encoder or tiny_encoder
+            llm = tiny_llm if llm in ("tiny", "stub") else llm
+
+        ctx = mp.get_context("spawn")
+        for size in args.sizes:
+            with ctx.Pool(1) as pool:
+                result = pool.apply(run_size, (
+                    size, encoder, llm, args.llm == "stub",
+                    args.ks, args.queries, args.chats, args.seed
+                ))
+            results["results"].append(result)
+
+            build, chat = result["build"], result["chat"]
+            retrieve = ", ".join(f"{k} {v['p50_ms']:.2f}" for k, v in result["retrieve"].items())
+            print(
+                f"{size} records: ingest {result['ingest']['records_per_s']:.0f} rec/s, "
+                f"build {build['seconds']:.1f} s ({build['chunks_per_s']:.0f} chunks/s, "
+                f"index {build['index_mb']:.1f} MB, peak RSS {build['peak_rss_mb']:.0f} MB), "
+                f"retrieve p50 ms [{retrieve}], "
+                f"prompt p50 {result['prompt']['budgeted']['p50_ms']:.3f} ms, "
+                f"chat p50 {chat['p50_ms']:.1f} ms p95 {chat['p95_ms']:.1f} ms"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), results, args.max_regression)
+        if regressions:
+            print(f"\n{len(regressions)} metrics regressed by more than {args.max_regression:.0%}.")
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,8 @@
-from basic_chatbot.model_local import LocalLM
-from basic_chatbot.model_openai import OpenAIChat
+from typing import Iterator
 from basic_chatbot.memory import ChatMemory
-from basic_chatbot.gradio_ui import chat_interface
-from basic_chatbot.logging import log_output
+from basic_chatbot.logging import LogWriter, log_output
 from basic_chatbot.prompt_utils import build_prompt_with_history, extract_assistant_reply
+from basic_chatbot.streaming import StreamStats
 
 def MyAssistant(
     model: str, 
@@ -11,6 +10,7 @@ def MyAssistant(
     state_dir: str, 
     log_dir: str, 
     api_key: str | None = None,
+    log_writer: dict | None = None,
     share: bool = False, 
     inline: bool = False
 ):
@@ -30,13 +30,18 @@ def MyAssistant(
         Directory where the conversation log is saved.
     api_key : str or None, optional (default=None)
         API key for OpenAI model.
+    log_writer : dict or None, optional (default=None)
+        Arguments of `basic_chatbot.logging.LogWriter`, e.g. `{"flush_interval": 1.0}`.
+        If None, each log record is written before the reply is returned.
     share : bool, optional (default=False)
         Creates a shareable link if set to True.
     inline : bool, optional (default=False)
         Opens Gradio UI inline if set to True.
         Otherwise, opens a new window for UI.
     """
-    bot = MyChat(model, n_turns, state_dir, log_dir, api_key=api_key)
+    from basic_chatbot.gradio_ui import chat_interface
+
+    bot = MyChat(model, n_turns, state_dir, log_dir, api_key=api_key, log_writer=log_writer)
     demo = chat_interface(bot)
     demo.launch(share=share, inline=inline)
 
@@ -56,6 +61,12 @@ class MyChat():
         Path to directory where the conversation state is saved.
     log_path : str
         Path to directory where the log state is saved.
+    log_writer : LogWriter or None
+        Background writer of the chat log. If None, records are written
+        synchronously.
+    last_stream_stats : dict or None
+        Time to first token, total time, number of tokens and tokens/s
+        of the last streamed reply.
 
     Parameters
     ----------
@@ -73,6 +84,9 @@ class MyChat():
         Name of conversation log JSON file.
     api_key : str or None, optional (default=None)
         API key for OpenAI model.
+    log_writer : dict or None, optional (default=None)
+        Arguments of `basic_chatbot.logging.LogWriter`, e.g. `{"flush_interval": 1.0}`.
+        If None, each log record is written before the reply is returned.
     """
     def __init__(
         self, 
@@ -82,11 +96,16 @@ class MyChat():
         log_dir: str,
         state_fname: str = "conversation_state.json",
         log_fname: str = "chat_logs.jsonl",
-        api_key: str | None = None
+        api_key: str | None = None,
+        log_writer: dict | None = None
     ):
         if api_key:
+            from basic_chatbot.model_openai import OpenAIChat
+
             self.lm = OpenAIChat(model_name, api_key=api_key)
         else:
+            from basic_chatbot.model_local import LocalLM
+
             self.lm = LocalLM(model_name)
 
         state_path = state_dir + state_fname
@@ -98,6 +117,8 @@ class MyChat():
         self.n_turns = n_turns
         self.state_path = state_path
         self.log_path = log_path
+        self.log_writer = LogWriter(log_path, **log_writer) if log_writer else None
+        self.last_stream_stats = None
 
     def chat(
         self, 
@@ -128,6 +149,43 @@ class MyChat():
         self.memory.add_assistant(reply)
         return reply
     
+    def chat_stream(
+        self, 
+        user_message: str
+    ) -> Iterator[str]:
+        """
+        Streaming version of `chat`.
+        Yields the reply generated so far each time new text arrives.
+        The user message and full reply are passed into the memory class
+        once generation finishes.
+
+        Parameters
+        ----------
+        user_message : str
+            The message from the user.
+
+        Yields
+        ------
+        str
+            Reply generated so far.
+        """
+        prompt = build_prompt_with_history(
+            self.memory.last_n_turns(self.n_turns), 
+            user_message
+        )
+
+        text = ""
+        reply = ""
+        stats = StreamStats()
+        for delta in self.lm.stream_text(prompt, stats=stats):
+            text += delta
+            reply = extract_assistant_reply(text)
+            yield reply
+        self.last_stream_stats = stats.as_dict()
+
+        self.memory.add_user(user_message)
+        self.memory.add_assistant(reply)
+
     def respond(
         self,
         user_message: str, 
@@ -160,13 +218,67 @@ class MyChat():
         except Exception as e:
             reply = f"[ERROR] {type(e).__name__}: {e}"
 
-        log_output(self.log_path, user_message, reply)
+        self._log(user_message, reply)
         self.memory.save(self.state_path)
         chat_history.append({"role": "assistant", "content": reply})
         return chat_history
     
+    def respond_stream(
+        self,
+        user_message: str, 
+        chat_history: list | None
+    ) -> Iterator[list]:
+        """
+        Streaming version of `respond`.
+        Yields the chat history with the partial reply as the last message,
+        so a UI can render tokens as they arrive. The log entry includes the
+        time to first token and tokens/s of the reply.
+
+        Parameters
+        ----------
+        user_message : str
+            The message from the user.
+        chat_history : list or None
+            History of chat.
+
+        Yields
+        ------
+        list
+            Chat history.
+        """
+        if chat_history is None:
+            chat_history = []
+
+        chat_history.append({"role": "user", "content": user_message})
+        message = {"role": "assistant", "content": ""}
+        chat_history.append(message)
+
+        self.last_stream_stats = None
+        try:
+            for reply in self.chat_stream(user_message):
+                message["content"] = reply
+                yield chat_history
+        except Exception as e:
+            message["content"] = f"[ERROR] {type(e).__name__}: {e}"
+
+        self._log(user_message, message["content"], self.last_stream_stats)
+        self.memory.save(self.state_path)
+        yield chat_history
+    
     def clear_chat(self) -> list:
         """Clears chat memory and returns empty list."""
         self.memory.clear_memory(self.state_path)
-        log_output(self.log_path, "Memory cleared", "")
-        return []
\ No newline at end of file
+        self._log("Memory cleared", "")
+        return []
+
+    def _log(
+        self,
+        user_text: str,
+        assistant_text: str,
+        stats: dict | None = None
+    ):
+        """Logs a record through `log_writer`, or directly if there is none."""
+        if self.log_writer is not None:
+            self.log_writer.log(user_text, assistant_text, stats)
+        else:
+            log_output(self.log_path, user_text, assistant_text, stats)
\ No newline at end of file
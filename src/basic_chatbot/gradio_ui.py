@@ -1,22 +1,67 @@
 import gradio as gr
-    
-def chat_interface(bot) -> gr.Blocks: 
-    """Creates a UI for the chatbot using Gradio."""
-    def clear_chat():
+
+def chat_interface(bot, stream: bool = True) -> gr.Blocks:
+    """
+    Creates a UI for the chatbot using Gradio.
+    If `stream` is True and the bot has a `respond_stream` method,
+    replies are rendered token by token as they are generated.
+    If the bot has an `arespond` method, each browser session gets its own
+    conversation memory and non-streamed replies are handled asynchronously.
+    If the bot has a `health` method, it is exposed as the `/health` API
+    endpoint and its status is shown until the bot is ready. A `metrics`
+    method is exposed as the `/metrics` API endpoint.
+    """
+    sessions = hasattr(bot, "arespond")
+
+    def session(request: gr.Request | None) -> dict:
+        if sessions and request is not None:
+            return {"session_id": request.session_hash}
+        return {}
+
+    def clear_chat(request: gr.Request):
         if hasattr(bot, "clear_chat"):
-            bot.clear_chat()
+            bot.clear_chat(**session(request))
         return [], ""
 
-    def get_reponse(m, h):
-        return bot.respond(m, h), ""
+    def get_reponse(m, h, request: gr.Request):
+        return bot.respond(m, h, **session(request)), ""
+
+    async def aget_response(m, h, request: gr.Request):
+        return await bot.arespond(m, h, **session(request)), ""
+
+    def stream_response(m, h, request: gr.Request):
+        for history in bot.respond_stream(m, h, **session(request)):
+            yield history, ""
+
+    if stream and hasattr(bot, "respond_stream"):
+        handler = stream_response
+    elif sessions:
+        handler = aget_response
+    else:
+        handler = get_reponse
+
+    def status():
+        health = bot.health()
+        text = "" if health["status"] == "ready" else f"Status: {health['status']}"
+        if health["error"]:
+            text += f" ({health['error']})"
+        return text, gr.Timer(active=health["status"] == "loading")
 
     with gr.Blocks() as demo:
         gr.Markdown("MyAssistant")
+        if hasattr(bot, "health"):
+            status_box = gr.Markdown()
+            timer = gr.Timer(1.0)
+            timer.tick(status, outputs=[status_box, timer])
+            demo.load(status, outputs=[status_box, timer])
+            gr.api(bot.health, api_name="health")
+        if hasattr(bot, "metrics"):
+            gr.api(bot.metrics, api_name="metrics")
         chatbot = gr.Chatbot(type="messages")
         msg = gr.Textbox(label="Message")
 
         msg.submit(
-            get_reponse,
+            handler,
             inputs=[msg, chatbot],
             outputs=[chatbot, msg],
         )
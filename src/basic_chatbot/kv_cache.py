@@ -0,0 +1,157 @@
+from collections import OrderedDict
+from typing import Hashable
+import threading
+import torch as tc
+from transformers import DynamicCache
+
+class PrefixCache:
+    """
+    Keeps the past key/values of each conversation's last prompt so the next
+    turn only has to run the tokens after the longest shared prefix.
+
+    Entries are evicted least recently used first once their total size
+    exceeds `max_bytes`.
+
+    Attributes
+    ----------
+    max_bytes : int
+        Maximum total size of the cached key/value tensors.
+    hits : int
+        Number of prompts that reused a cached prefix.
+    misses : int
+        Number of prompts that shared no prefix with the cache.
+    evictions : int
+        Number of entries dropped to stay under `max_bytes`.
+    reused_tokens : int
+        Total number of prompt tokens served from the cache.
+    nbytes : int
+        Current total size of the cached key/value tensors.
+
+    Parameters
+    ----------
+    max_bytes : int, optional (default=512 * 2**20)
+        Maximum total size of the cached key/value tensors.
+    """
+    def __init__(self, max_bytes: int = 512 * 2**20):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.reused_tokens = 0
+        self.nbytes = 0
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def prefix(
+        self,
+        session_id: Hashable,
+        input_ids: tc.Tensor
+    ) -> tuple[DynamicCache, int]:
+        """
+        Takes a session's cache out and crops it to the longest prefix it
+        shares with `input_ids`. At least one prompt token is always left
+        uncached so the model has something to run.
+
+        Parameters
+        ----------
+        session_id : Hashable
+            Conversation the prompt belongs to.
+        input_ids : tc.Tensor
+            Token IDs of the new prompt, shape (seq_len,).
+
+        Returns
+        -------
+        tuple[DynamicCache, int]
+            Cache to pass to `generate` (empty on a miss) and the number
+            of prompt tokens it already covers.
+        """
+        with self._lock:
+            entry = self._entries.pop(session_id, None)
+            if entry is not None:
+                self.nbytes -= entry[2]
+
+        n_cached = 0
+        if entry is not None:
+            cached_ids, cache, _ = entry
+            n_cached = _common_prefix(cached_ids, input_ids, len(input_ids) - 1)
+            if 0 < n_cached < cache.get_seq_length():
+                cache.crop(n_cached - cache.get_seq_length())
+
+        with self._lock:
+            if n_cached:
+                self.hits += 1
+                self.reused_tokens += n_cached
+            else:
+                self.misses += 1
+
+        return (cache if n_cached else DynamicCache()), n_cached
+
+    def put(
+        self,
+        session_id: Hashable,
+        output_ids: tc.Tensor,
+        cache: DynamicCache
+    ):
+        """
+        Stores a session's cache after generation.
+
+        Parameters
+        ----------
+        session_id : Hashable
+            Conversation the prompt belongs to.
+        output_ids : tc.Tensor
+            Prompt and generated token IDs, shape (seq_len,).
+        cache : DynamicCache
+            Cache filled by `generate`.
+        """
+        size = cache_nbytes(cache)
+        if size > self.max_bytes:
+            return
+        ids = output_ids[:cache.get_seq_length()]
+
+        with self._lock:
+            old = self._entries.pop(session_id, None)
+            if old is not None:
+                self.nbytes -= old[2]
+            self._entries[session_id] = (ids, cache, size)
+            self.nbytes += size
+            while self.nbytes > self.max_bytes:
+                _, (_, _, dropped) = self._entries.popitem(last=False)
+                self.nbytes -= dropped
+                self.evictions += 1
+
+    def clear(self):
+        """Drops every entry. Counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def stats(self) -> dict[str, int | float]:
+        """Returns the size, hit/miss/eviction counters and reused token count."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "bytes": self.nbytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "reused_tokens": self.reused_tokens,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+def cache_nbytes(cache: DynamicCache) -> int:
+    """Total size of the key and value tensors in a cache."""
+    if hasattr(cache, "layers"):
+        tensors = [t for layer in cache.layers for t in (layer.keys, layer.values)]
+    else:
+        tensors = [*cache.key_cache, *cache.value_cache]
+    return sum(t.nelement() * t.element_size() for t in tensors if t is not None)
+
+def _common_prefix(a: tc.Tensor, b: tc.Tensor, limit: int) -> int:
+    """Length of the longest common prefix of two 1-D tensors, at most `limit`."""
+    n = min(len(a), len(b), limit)
+    if n <= 0:
+        return 0
+    diff = (a[:n].to(b.device) != b[:n]).nonzero()
+    return int(diff[0]) if len(diff) else n
\ No newline at end of file
@@ -1,17 +1,282 @@
 from pathlib import Path
+import atexit
+import gzip
 import json
+import os
+import queue
+import shutil
+import threading
 import time
 
-def log_output(path: str, user_text: str, assistant_text: str):
-    """Logs the time, user's input, and chatbot's output to a JSON file."""
+def log_output(
+    path: str, 
+    user_text: str, 
+    assistant_text: str, 
+    stats: dict | None = None
+):
+    """
+    Logs the time, user's input, and chatbot's output to a JSON file,
+    plus the streaming statistics of the reply if given.
+    """
     path = Path(path)
     path.parent.mkdir(parents=True, exist_ok=True)
 
+    with path.open("a", encoding="utf-8") as file:
+        file.write(json.dumps(_event(user_text, assistant_text, stats), ensure_ascii=False) + "\n")
+
+def _event(
+    user_text: str,
+    assistant_text: str,
+    stats: dict | None = None
+) -> dict:
+    """Builds one log record."""
     event = {
         "time": time.time(),
         "user": user_text,
         "assistant": assistant_text,
     }
+    if stats is not None:
+        event["stats"] = stats
+    return event
 
-    with path.open("a", encoding="utf-8") as file:
-        file.write(json.dumps(event, ensure_ascii=False) + "\n")
\ No newline at end of file
+class LogWriter:
+    """
+    Writes chat logs from a background thread so requests do not wait on
+    the file system.
+
+    `log` only puts the record on a bounded queue. The writer thread keeps
+    the file open, writes the queued records in batches and flushes them
+    at least every `flush_interval` seconds. When the file would grow past
+    `max_bytes`, it is renamed to `<name>.1` (older files shift up to
+    `backups`), optionally gzipped, and a new file is started. Records
+    still queued are written when `close` is called, which also happens
+    at interpreter exit.
+
+    Attributes
+    ----------
+    path : Path
+        Location of the log.
+    flush_interval : float
+        Maximum number of seconds a written record stays in the file buffer.
+    batch_size : int
+        Maximum number of records per write.
+    max_bytes : int or None
+        Size at which the log is rotated. If None, it is never rotated.
+    backups : int
+        Number of rotated files kept.
+    compress : bool
+        If True, rotated files are gzipped.
+    block : bool
+        If True, `log` waits for room when the queue is full; otherwise
+        the record is dropped.
+    written : int
+        Number of records written.
+    dropped : int
+        Number of records dropped because the queue was full.
+    batches : int
+        Number of batched writes.
+    rotations : int
+        Number of times the log was rotated.
+    errors : int
+        Number of records lost to file system or serialization errors.
+        Values `json` cannot encode are written as strings.
+
+    Parameters
+    ----------
+    path : str
+        Location of the log.
+    max_queue : int, optional (default=10000)
+        Maximum number of records waiting to be written.
+    flush_interval : float, optional (default=1.0)
+        Maximum number of seconds a written record stays in the file buffer.
+    batch_size : int, optional (default=256)
+        Maximum number of records per write.
+    max_bytes : int or None, optional (default=None)
+        Size at which the log is rotated. If None, it is never rotated.
+    backups : int, optional (default=5)
+        Number of rotated files kept.
+    compress : bool, optional (default=False)
+        If True, rotated files are gzipped.
+    block : bool, optional (default=False)
+        If True, `log` waits for room when the queue is full; otherwise
+        the record is dropped.
+    """
+    _STOP = object()
+    _FLUSH = object()
+
+    def __init__(
+        self,
+        path: str,
+        max_queue: int = 10000,
+        flush_interval: float = 1.0,
+        batch_size: int = 256,
+        max_bytes: int | None = None,
+        backups: int = 5,
+        compress: bool = False,
+        block: bool = False
+    ):
+        self.path = Path(path)
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compress = compress
+        self.block = block
+
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.rotations = 0
+        self.errors = 0
+
+        self._queue = queue.Queue(max_queue)
+        self._closed = False
+        self._file = None
+        self._size = 0
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def log(
+        self,
+        user_text: str,
+        assistant_text: str,
+        stats: dict | None = None
+    ):
+        """Same as `log_output`, without waiting for the record to be written."""
+        self.write(_event(user_text, assistant_text, stats))
+
+    def write(self, event: dict):
+        """Queues one record."""
+        if self._closed:
+            raise RuntimeError("LogWriter is closed.")
+        try:
+            self._queue.put(event, block=self.block)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Waits until every queued record has been written and flushed."""
+        if not self._closed:
+            self._queue.put(self._FLUSH)
+            self._queue.join()
+
+    def close(self):
+        """Writes the queued records, closes the file and stops the writer thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._STOP)
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    def _run(self):
+        """Drains the queue in batches until `close` is called."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = self.path.open("a", encoding="utf-8")
+        self._size = self.path.stat().st_size
+        last_flush = time.monotonic()
+        stop = False
+
+        while not stop:
+            timeout = max(self.flush_interval - (time.monotonic() - last_flush), 0.0)
+            try:
+                batch = [self._queue.get(timeout=timeout)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(event is self._STOP for event in batch)
+            flush = stop or any(event is self._FLUSH for event in batch)
+            events = [event for event in batch if event is not self._STOP and event is not self._FLUSH]
+
+            try:
+                if events:
+                    self._write(events)
+                if flush or time.monotonic() - last_flush >= self.flush_interval:
+                    self._file.flush()
+                    last_flush = time.monotonic()
+            except Exception:
+                self.errors += len(events)
+                self._reopen()
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+        self._file.close()
+
+    def _reopen(self):
+        """Reopens the log after a failed write or rotation left it closed."""
+        if not self._file.closed:
+            return
+        try:
+            self._file = self.path.open("a", encoding="utf-8")
+            self._size = self.path.stat().st_size
+        except OSError:
+            pass
+
+    def _write(self, events: list[dict]):
+        """
+        Writes a batch of records, rotating the log whenever it would grow past `max_bytes`.
+        Records that cannot be serialized are skipped and counted in `errors`.
+        """
+        lines = []
+        written = 0
+        for event in events:
+            try:
+                line = json.dumps(event, ensure_ascii=False, default=str) + "\n"
+            except (TypeError, ValueError):
+                self.errors += 1
+                continue
+            size = len(line.encode("utf-8"))
+            if self.max_bytes is not None and self._size > 0 and self._size + size > self.max_bytes:
+                self._file.write("".join(lines))
+                lines = []
+                self._rotate()
+            lines.append(line)
+            self._size += size
+            written += 1
+        self._file.write("".join(lines))
+        self.written += written
+        self.batches += 1
+
+    def _rotate(self):
+        """Renames the log to `<name>.1`, shifting older files, and starts a new one."""
+        self._file.close()
+        suffix = ".gz" if self.compress else ""
+
+        def backup(n: int) -> Path:
+            return self.path.with_name(f"{self.path.name}.{n}{suffix}")
+
+        if self.backups > 0:
+            last = 1
+            while last < self.backups and backup(last).exists():
+                last += 1
+            for n in range(last - 1, 0, -1):
+                os.replace(backup(n), backup(n + 1))
+            if self.compress:
+                with self.path.open("rb") as src, gzip.open(backup(1), "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+                self.path.unlink()
+            else:
+                os.replace(self.path, backup(1))
+        else:
+            self.path.unlink()
+
+        self._file = self.path.open("a", encoding="utf-8")
+        self._size = 0
+        self.rotations += 1
+
+    def stats(self) -> dict[str, int]:
+        """Returns the number of queued, written, dropped and lost records, batches and rotations."""
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "rotations": self.rotations,
+            "errors": self.errors,
+        }
@@ -1,52 +1,107 @@
+from collections import deque
+from itertools import islice
 from pathlib import Path
 import json
+import os
 
 class ChatMemory:
     """
     A class for managing the memory of the chatbot.
+
+    Turns are kept in a ring buffer of at most `max_turns` entries, so
+    `last_n_turns` only touches the turns it returns. With a `store`, `save`
+    appends the turns added since the last save to the store instead of
+    rewriting the whole history, and `load` and `clear_memory` go through
+    the store under `session`; the `path` arguments are then ignored.
         
     Attributes
     ----------
-    turns : list[str]
+    turns : collections.deque[str]
         Keeps track of the chat context by saving the different instances
         of conversation with the chatbot.
+    store : JSONLStore or SQLiteStore or None
+        Append-only store the turns are persisted to. If None, the turns
+        are saved to a JSON file.
+    session : str
+        Key of the conversation in `store`.
+
+    Parameters
+    ----------
+    max_turns : int or None, optional (default=None)
+        Number of most recent turns kept. If None, all are kept.
+    store : JSONLStore or SQLiteStore or None, optional (default=None)
+        Append-only store the turns are persisted to.
+    session : str, optional (default="default")
+        Key of the conversation in `store`.
     """
-    def __init__(self):
-        self.turns = []
+    def __init__(
+        self,
+        max_turns: int | None = None,
+        store=None,
+        session: str = "default"
+    ):
+        self.turns = deque(maxlen=max_turns)
+        self.store = store
+        self.session = session
+        self._unsaved = []
 
     def add_user(self, text: str):
         "Adds the user's text to turns list."
-        self.turns.append(f"User: {text}")
+        self._add(f"User: {text}")
 
     def add_assistant(self, text: str):
         "Adds the Assistant's text to turns list."
-        self.turns.append(f"Assistant: {text}")
+        self._add(f"Assistant: {text}")
+
+    def _add(self, turn: str):
+        self.turns.append(turn)
+        self._unsaved.append(turn)
 
     def last_n_turns(self, n: int = 6) -> list[str]:
         "Grabs the last n turns in the list."
-        return self.turns[-n:]
+        if n <= 0:
+            return []
+        return list(islice(reversed(self.turns), n))[::-1]
     
     def clear_memory(self, path: str = "conversation_state.json"):
         """Clears the stored conversation (memory) in turns."""
-        self.turns = []
-        self.save(path)
+        self.turns.clear()
+        self._unsaved = []
+        if self.store is not None:
+            self.store.clear(self.session)
+        else:
+            self.save(path)
 
     def save(self, path: str = "conversation_state.json"):
-        """Saves the conversation state to a JSON file."""
+        """
+        Saves the conversation state: appends the new turns to `store`,
+        or atomically rewrites a JSON file.
+        """
+        unsaved, self._unsaved = self._unsaved, []
+        if self.store is not None:
+            self.store.append(self.session, unsaved)
+            return
+
         path = Path(path)
         path.parent.mkdir(parents=True, exist_ok=True)
 
-        with path.open("w", encoding="utf-8") as f:
-            json.dump({"turns": self.turns}, f, ensure_ascii=False, indent=2)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with tmp_path.open("w", encoding="utf-8") as f:
+            json.dump({"turns": list(self.turns)}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
 
     def load(self, path: str = "conversation_state.json"):
-        """Loads the conversation state from a JSON file and adds it to turns."""
-        path = Path(path)
+        """Loads the conversation state from `store` or a JSON file and adds it to turns."""
+        self.turns.clear()
+        self._unsaved = []
+        if self.store is not None:
+            self.turns.extend(self.store.load(self.session))
+            return
 
+        path = Path(path)
         if not path.exists():
-            self.turns = []
             return
 
         with path.open("r", encoding="utf-8") as f:
             data = json.load(f)
-        self.turns = data.get("turns", [])
\ No newline at end of file
+        self.turns.extend(data.get("turns", []))
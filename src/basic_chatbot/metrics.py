@@ -0,0 +1,434 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import random
+import threading
+import time
+from basic_chatbot.logging import LogWriter
+
+LATENCY_BUCKETS = tuple(1e-4 * 2**(i / 2) for i in range(41))
+RATE_BUCKETS = tuple(2.0**i for i in range(-2, 13))
+TOKEN_BUCKETS = tuple(2**i for i in range(15))
+
+_current_span = ContextVar("current_span", default=None)
+
+class Histogram:
+    """
+    Cumulative histogram with fixed bucket bounds, as exported to Prometheus.
+
+    Quantiles are estimated by linear interpolation inside the bucket that
+    holds them, so their error is bounded by the bucket width.
+
+    Attributes
+    ----------
+    bounds : tuple[float, ...]
+        Upper bound of each bucket, ascending. Values above the last bound
+        fall in an overflow bucket.
+    counts : list[int]
+        Number of observations per bucket (not cumulative).
+    count : int
+        Number of observations.
+    sum : float
+        Sum of the observations.
+
+    Parameters
+    ----------
+    bounds : tuple[float, ...], optional (default=LATENCY_BUCKETS)
+        Upper bound of each bucket, ascending.
+    """
+    def __init__(self, bounds: tuple[float, ...] = LATENCY_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        """Records one observation."""
+        bucket = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.sum += value
+
+    def quantile(self, q: float) -> float | None:
+        """Estimates the q-quantile (0 <= q <= 1), or None without observations."""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if count == 0:
+            return None
+
+        rank = q * count
+        seen = 0
+        for bucket, n in enumerate(counts):
+            if n and seen + n >= rank:
+                if bucket == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[bucket - 1] if bucket > 0 else 0.0
+                return lower + (self.bounds[bucket] - lower) * (rank - seen) / n
+            seen += n
+        return self.bounds[-1]
+
+    def summary(self) -> dict[str, float | int | None]:
+        """Returns the count, mean and p50/p95/p99 estimates."""
+        return {
+            "count": self.count,
+            "mean": self.sum / self.count if self.count else None,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+class Span:
+    """
+    Timings of one request, written as a JSONL record when it ends.
+
+    Stages timed with `Metrics.timer` while the span is current add their
+    duration to `stages`, including stages timed inside the retriever and
+    the model. Other values, such as token counts, go into `attrs`.
+
+    Attributes
+    ----------
+    name : str
+        Operation, e.g. `"respond"`.
+    trace_id : str
+        Random ID of the request.
+    start : float
+        Wall-clock time the span started.
+    stages : dict[str, float]
+        Seconds spent in each stage, summed over repeats.
+    attrs : dict
+        Attributes of the request.
+    """
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.trace_id = f"{random.getrandbits(64):016x}"
+        self.start = time.time()
+        self.stages = {}
+        self.attrs = attrs
+        self._t0 = time.perf_counter()
+
+    def add(self, stage: str, seconds: float):
+        """Adds time spent in a stage."""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def set(self, **attrs):
+        """Sets attributes of the request."""
+        self.attrs.update(attrs)
+
+    def elapsed(self) -> float:
+        """Seconds since the span started."""
+        return time.perf_counter() - self._t0
+
+    def as_dict(self, seconds: float) -> dict:
+        """Returns the span as a JSON-serializable record."""
+        return {
+            "time": self.start,
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "duration_ms": seconds * 1e3,
+            "stages_ms": {stage: s * 1e3 for stage, s in self.stages.items()},
+            **self.attrs,
+        }
+
+class _Timer:
+    """Context manager recording the time spent in a block."""
+    __slots__ = ("histogram", "stage", "span", "start")
+
+    def __init__(self, histogram: Histogram, stage: str, span: Span | None):
+        self.histogram = histogram
+        self.stage = stage
+        self.span = span
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        seconds = time.perf_counter() - self.start
+        self.histogram.observe(seconds)
+        span = self.span if self.span is not None else _current_span.get()
+        if span is not None:
+            span.add(self.stage, seconds)
+
+class _SpanScope:
+    """Context manager making a span current and ending it when the block ends."""
+    __slots__ = ("metrics", "span", "token")
+
+    def __init__(self, metrics, span: Span):
+        self.metrics = metrics
+        self.span = span
+
+    def __enter__(self) -> Span:
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_span.reset(self.token)
+        if exc_type is not None:
+            self.span.set(error=exc_type.__name__)
+        self.metrics.end_span(self.span)
+
+class _Noop:
+    """Context manager doing nothing, used when metrics are disabled or a span is nested."""
+    __slots__ = ("span",)
+
+    def __init__(self, span: Span | None = None):
+        self.span = span
+
+    def __enter__(self):
+        return self.span
+
+    def __exit__(self, *exc):
+        pass
+
+class Metrics:
+    """
+    Process-wide latency histograms, counters and request spans.
+
+    Stages are timed with `timer`, which feeds the
+    `chatbot_stage_seconds{component, stage}` histogram and the current span.
+    `span` wraps a whole request; nested spans are folded into the outer one.
+    The registry is exported in the Prometheus text format by `prometheus`
+    (or over HTTP with `serve`), summarized as p50/p95/p99 by `summary`,
+    and finished spans are written as JSONL by a background `LogWriter`.
+    A timed stage costs about a microsecond, and nothing when disabled.
+
+    Attributes
+    ----------
+    enabled : bool
+        If False, `timer`, `span`, `observe` and `inc` do nothing.
+    span_writer : LogWriter or None
+        Background writer of finished spans. If None, spans are not written.
+
+    Parameters
+    ----------
+    enabled : bool, optional (default=True)
+        If False, nothing is recorded.
+    """
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.span_writer = None
+        self._histograms = {}
+        self._counters = {}
+        self._stages = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def configure(
+        self,
+        enabled: bool = True,
+        spans_path: str | None = None,
+        span_writer: dict | None = None,
+        port: int | None = None
+    ):
+        """
+        Turns recording on or off, starts writing spans and optionally
+        serves the Prometheus endpoint.
+
+        Parameters
+        ----------
+        enabled : bool, optional (default=True)
+            If False, nothing is recorded.
+        spans_path : str or None, optional (default=None)
+            JSONL file finished spans are written to. If None, spans are
+            only used for the histograms.
+        span_writer : dict or None, optional (default=None)
+            Arguments of the `LogWriter` writing the spans.
+        port : int or None, optional (default=None)
+            Port to serve `/metrics` on. If None, no server is started.
+        """
+        self.enabled = enabled
+        if spans_path is not None and (self.span_writer is None or str(self.span_writer.path) != str(spans_path)):
+            if self.span_writer is not None:
+                self.span_writer.close()
+            self.span_writer = LogWriter(spans_path, **(span_writer or {}))
+        if port is not None and self._server is None:
+            self.serve(port)
+
+    def _histogram(
+        self,
+        name: str,
+        labels: tuple,
+        bounds: tuple[float, ...]
+    ) -> Histogram:
+        key = (name, labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, Histogram(bounds))
+        return histogram
+
+    def timer(
+        self,
+        component: str,
+        stage: str,
+        span: Span | None = None
+    ):
+        """
+        Times a block as one stage of a component, e.g. `timer("retriever", "search")`.
+        The duration also goes into `span` (by default the current span)
+        as `"<component>.<stage>"`.
+        """
+        if not self.enabled:
+            return _Noop()
+        stage_key = (component, stage)
+        entry = self._stages.get(stage_key)
+        if entry is None:
+            histogram = self._histogram(
+                "chatbot_stage_seconds", (("component", component), ("stage", stage)), LATENCY_BUCKETS
+            )
+            entry = self._stages[stage_key] = (histogram, f"{component}.{stage}")
+        return _Timer(*entry, span)
+
+    def span(self, name: str, **attrs):
+        """
+        Times a whole request and makes its `Span` current for the block.
+        Inside another span, returns the outer span and times nothing extra.
+        Generators, which may be resumed in other threads, should use
+        `start_span` and `end_span` instead.
+        """
+        if not self.enabled:
+            return _Noop()
+        current = _current_span.get()
+        if current is not None:
+            return _Noop(current)
+        return _SpanScope(self, Span(name, **attrs))
+
+    def start_span(self, name: str, **attrs) -> Span | None:
+        """Starts a span without making it current; pass it to `timer` and `end_span`."""
+        return Span(name, **attrs) if self.enabled else None
+
+    def end_span(self, span: Span | None):
+        """Records a span's duration and writes it to `span_writer`."""
+        if span is None:
+            return
+        seconds = span.elapsed()
+        self._histogram(
+            "chatbot_request_seconds", (("operation", span.name),), LATENCY_BUCKETS
+        ).observe(seconds)
+        if self.span_writer is not None:
+            self.span_writer.write(span.as_dict(seconds))
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        bounds: tuple[float, ...] = LATENCY_BUCKETS,
+        **labels
+    ):
+        """Records a value in the histogram `name` with the given labels."""
+        if self.enabled:
+            self._histogram(name, tuple(sorted(labels.items())), bounds).observe(value)
+
+    def inc(
+        self,
+        name: str,
+        value: float = 1,
+        **labels
+    ):
+        """Adds `value` to the counter `name` with the given labels."""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_span(self, **attrs):
+        """Sets attributes of the current span, if any."""
+        span = _current_span.get()
+        if span is not None:
+            span.set(**attrs)
+
+    def current_span(self) -> Span | None:
+        """Returns the current span, if any."""
+        return _current_span.get()
+
+    def summary(self) -> dict[str, dict]:
+        """Returns p50/p95/p99 of every histogram and the value of every counter, keyed by series."""
+        with self._lock:
+            histograms = list(self._histograms.items())
+            counters = list(self._counters.items())
+        return {
+            **{_series(name, labels): h.summary() for (name, labels), h in histograms},
+            **{_series(name, labels): {"value": v} for (name, labels), v in counters},
+        }
+
+    def prometheus(self) -> str:
+        """Returns every histogram and counter in the Prometheus text exposition format."""
+        with self._lock:
+            histograms = sorted(self._histograms.items())
+            counters = sorted(self._counters.items())
+
+        lines = []
+        family = None
+        for (name, labels), h in histograms:
+            if name != family:
+                lines.append(f"# TYPE {name} histogram")
+                family = name
+            with h._lock:
+                counts, count, total = list(h.counts), h.count, h.sum
+            cumulative = 0
+            for bound, n in zip((*h.bounds, float("inf")), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else f"{bound:.6g}"
+                lines.append(f"{_series(name + '_bucket', (*labels, ('le', le)))} {cumulative}")
+            lines.append(f"{_series(name + '_sum', labels)} {total:.9g}")
+            lines.append(f"{_series(name + '_count', labels)} {count}")
+        for (name, labels), value in counters:
+            if name != family:
+                lines.append(f"# TYPE {name} counter")
+                family = name
+            lines.append(f"{_series(name, labels)} {value:.9g}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port: int = 9100, host: str = "127.0.0.1"):
+        """Serves `prometheus()` at `http://host:port/metrics` from a daemon thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+
+    def reset(self):
+        """Drops every histogram and counter."""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+            self._stages.clear()
+
+    def close(self):
+        """Stops the HTTP server and flushes the span writer."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self.span_writer is not None:
+            self.span_writer.close()
+            self.span_writer = None
+
+def _series(name: str, labels: tuple) -> str:
+    """Formats a series name with its labels, e.g. `name{stage="search"}`."""
+    if not labels:
+        return name
+    escaped = (
+        str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        for _, value in labels
+    )
+    return name + "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+METRICS = Metrics()
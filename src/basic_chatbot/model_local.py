@@ -1,11 +1,49 @@
+from threading import Thread
+from typing import Hashable, Iterator
+import time
 import torch as tc
+from torch.ao.quantization import quantize_dynamic
 from transformers import (
     AutoModelForCausalLM, AutoTokenizer, 
-    PreTrainedTokenizerBase, PreTrainedModel
+    PreTrainedTokenizerBase, PreTrainedModel,
+    TextIteratorStreamer
 )
 from transformers.generation.utils import GenerateOutput
+from transformers.pytorch_utils import Conv1D
+from basic_chatbot.kv_cache import PrefixCache
+from basic_chatbot.metrics import METRICS, RATE_BUCKETS, TOKEN_BUCKETS, Span
+from basic_chatbot.streaming import StreamStats
 from utils import get_device, to_device
 
+PRECISIONS = ("fp32", "bf16", "int8")
+
+class _CountingStreamer(TextIteratorStreamer):
+    """`TextIteratorStreamer` that records generated tokens in a `StreamStats`."""
+    def __init__(self, tokenizer, stats: StreamStats, **kwargs):
+        super().__init__(tokenizer, **kwargs)
+        self.stats = stats
+
+    def put(self, value):
+        if not (self.skip_prompt and self.next_tokens_are_prompt):
+            self.stats.add(value.numel())
+        super().put(value)
+
+def conv1d_to_linear(model: tc.nn.Module) -> tc.nn.Module:
+    """
+    Replaces the `Conv1D` layers used by GPT-2 style models with equivalent
+    `nn.Linear` layers, so `quantize_dynamic` can quantize them.
+    """
+    for name, module in model.named_children():
+        if isinstance(module, Conv1D):
+            in_features, out_features = module.weight.shape
+            linear = tc.nn.Linear(in_features, out_features)
+            linear.weight.data = module.weight.data.T.contiguous()
+            linear.bias.data = module.bias.data
+            setattr(model, name, linear)
+        else:
+            conv1d_to_linear(module)
+    return model
+
 class LocalLM():
     """
     A class for loading and managing a tokenizer and decoder model.
@@ -22,21 +60,69 @@ class LocalLM():
         Device that tensors will be moved to.
     tokenizer : PreTrainedTokenizerBase
         The tokenizer instance loaded from the pretrained model.
+        Pads and truncates on the left, so an over-long prompt keeps its end.
+    context_length : int
+        Maximum number of tokens the model can attend to.
+    last_stream_stats : dict or None
+        Time to first token, total time, number of tokens and tokens/s
+        of the last `stream_text` call. With concurrent streams, pass a
+        `StreamStats` to `stream_text` instead.
+    prefix_cache : PrefixCache or None
+        Past key/values of each session's last prompt, reused by the next turn.
+    last_prefill_tokens : int or None
+        Number of prompt tokens the model had to run in the last call
+        (the rest came from `prefix_cache`). Per-call counts are recorded
+        in the request span.
+
+    precision : str
+        Precision the model weights are loaded in.
 
     Parameters
     ----------
     model_name : str
         Name of model that will be loaded.
+    prefix_cache_mb : float or None, optional (default=None)
+        Memory budget in MiB of the per-session prompt prefix cache.
+        If None, every prompt is run from scratch.
+    precision : str, optional (default="fp32")
+        `"fp32"`, `"bf16"` (bfloat16 weights and activations) or `"int8"`
+        (dynamic int8 quantization of the linear layers, CPU only).
+    num_threads : int or None, optional (default=None)
+        Number of threads PyTorch uses for CPU inference.
+        This is process-wide. If None, PyTorch's default is kept.
+
+    Raises
+    ------
+    ValueError
+        If `precision` is not supported.
     """
     def __init__(
         self, 
-        model_name: str
+        model_name: str,
+        prefix_cache_mb: float | None = None,
+        precision: str = "fp32",
+        num_threads: int | None = None
     ):
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {precision!r}; expected one of {PRECISIONS}.")
+        if num_threads:
+            tc.set_num_threads(num_threads)
+
         self.model_name = model_name
-        self.device = get_device()
+        self.precision = precision
+        self.device = get_device(mps=precision != "int8")
         self.tokenizer: PreTrainedTokenizerBase = AutoTokenizer.from_pretrained(model_name)
         self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.tokenizer.padding_side = "left"
+        self.tokenizer.truncation_side = "left"
         self.model = self.load_model()
+        self.context_length = min(
+            self.tokenizer.model_max_length,
+            getattr(self.model.config, "max_position_embeddings", None) or self.tokenizer.model_max_length
+        )
+        self.last_stream_stats = None
+        self.prefix_cache = PrefixCache(int(prefix_cache_mb * 2**20)) if prefix_cache_mb else None
+        self.last_prefill_tokens = None
 
     def tokenize_text(
         self, 
@@ -79,7 +165,7 @@ class LocalLM():
         self,
     ) -> PreTrainedModel:
         """
-        Loads a pretrained sequence classification model and 
+        Loads a pretrained sequence classification model in `precision` and 
         moves it to the target device.
     
         Returns
@@ -89,7 +175,15 @@ class LocalLM():
         """
         model = AutoModelForCausalLM.from_pretrained(
             self.model_name,
-        ).to(self.device)
+        )
+        model.eval()
+        if self.precision == "bf16":
+            model = model.to(tc.bfloat16)
+        elif self.precision == "int8":
+            model = quantize_dynamic(
+                conv1d_to_linear(model), {tc.nn.Linear}, dtype=tc.qint8
+            )
+        model = model.to(self.device)
         model.config.pad_token_id = self.tokenizer.pad_token_id
         return model
     
@@ -102,7 +196,9 @@ class LocalLM():
         top_p: float = 0.95,
         temperature: float = 0.8,
         repetition_penalty: int | float = 1.1,
-        skip_special_tokens: bool = True
+        skip_special_tokens: bool = True,
+        session_id: Hashable | None = None,
+        span: Span | None = None
     ) -> tc.Tensor | GenerateOutput:
         """
         Tokenizes an input prompt, puts the model in evaluation model, and generates 
@@ -135,6 +231,13 @@ class LocalLM():
             If True, skips special tokens such as classification and padding tokens 
             in the output text.
             If False, includes special tokens in the output text.
+        session_id : Hashable or None, optional (default=None)
+            Conversation the prompt belongs to. If `prefix_cache` is set, the
+            tokens the prompt shares with this session's previous prompt are
+            not run through the model again.
+        span : Span or None, optional (default=None)
+            Request span the stage timings and token counts are recorded in.
+            If None, the current span is used.
 
         Returns
         -------
@@ -142,10 +245,78 @@ class LocalLM():
             Text generated by the model.
         """
         model = self.model
-        inputs = self.tokenize_text(prompt)
+        with METRICS.timer("local_lm", "tokenize", span):
+            inputs = self.tokenize_text(prompt)
+        n_prompt = inputs["input_ids"].shape[1]
+        cached, n_prefill = (
+            self._cached_prefix(inputs, session_id) if isinstance(prompt, str) else ({}, n_prompt)
+        )
+
+        model.eval()
+        start = time.perf_counter()
+        with METRICS.timer("local_lm", "generate", span), tc.no_grad():
+            outputs = model.generate(
+                **inputs, 
+                **cached,
+                max_new_tokens=max_new_tokens,
+                do_sample=do_sample,
+                top_k=top_k,
+                top_p=top_p,
+                temperature=temperature,
+                repetition_penalty=repetition_penalty,
+                pad_token_id=self.tokenizer.pad_token_id
+            )
+        self._record_tokens(n_prompt, n_prefill, outputs.shape[1] - n_prompt, time.perf_counter() - start, span)
+        self._store_prefix(session_id, outputs[0], cached)
+        with METRICS.timer("local_lm", "decode", span):
+            return self.decode_tokens(outputs[0], skip_special_tokens)
+
+    def generate_batch(
+        self,
+        prompts: list[str],
+        max_new_tokens: int = 100,
+        do_sample: bool = True,
+        top_k: int = 25,
+        top_p: float = 0.95,
+        temperature: float = 0.8,
+        repetition_penalty: int | float = 1.1,
+        skip_special_tokens: bool = True,
+        spans: list[Span | None] | None = None
+    ) -> list[str]:
+        """
+        Generates text for several prompts with a single `generate` call.
+        Prompts are left-padded so every sequence continues from its last
+        real token, and the padding is dropped from the outputs.
+
+        Parameters
+        ----------
+        prompts : list[str]
+            Prompts generated for together.
+        max_new_tokens, do_sample, top_k, top_p, temperature, repetition_penalty
+            Sampling parameters, see `generate_text`.
+        skip_special_tokens : bool, optional (default=True)
+            If True, skips special tokens in the output text.
+        spans : list[Span or None] or None, optional (default=None)
+            Request span of each prompt. Each one gets the batch's stage
+            timings and the token counts of its own prompt. If None, the
+            batch is recorded in the current span.
+
+        Returns
+        -------
+        list[str]
+            Text generated for each prompt, including the prompt as in `generate_text`.
+        """
+        model = self.model
+        spans = spans if spans is not None else [METRICS.current_span()] * len(prompts)
+        start = time.perf_counter()
+        with METRICS.timer("local_lm", "tokenize", spans[0]):
+            inputs = self.tokenize_text(prompts)
+        n_pad = (inputs["attention_mask"] == 0).sum(dim=1).tolist()
+        self._share_stage(spans, "tokenize", time.perf_counter() - start)
 
         model.eval()
-        with tc.no_grad():
+        start = time.perf_counter()
+        with METRICS.timer("local_lm", "generate", spans[0]), tc.no_grad():
             outputs = model.generate(
                 **inputs, 
                 max_new_tokens=max_new_tokens,
@@ -156,7 +327,192 @@ class LocalLM():
                 repetition_penalty=repetition_penalty,
                 pad_token_id=self.tokenizer.pad_token_id
             )
-        return self.decode_tokens(outputs[0], skip_special_tokens)
+        seconds = time.perf_counter() - start
+        self._share_stage(spans, "generate", seconds)
+        n_prompt = inputs["attention_mask"].sum(dim=1).tolist()
+        n_new = self._generated_lengths(outputs[:, inputs["input_ids"].shape[1]:]).tolist()
+        for row_prompt, row_new, span in zip(n_prompt, n_new, spans):
+            self._record_tokens(row_prompt, row_prompt, row_new, seconds, span)
+
+        start = time.perf_counter()
+        with METRICS.timer("local_lm", "decode", spans[0]):
+            texts = [
+                self.decode_tokens(output[pad:], skip_special_tokens)
+                for output, pad in zip(outputs, n_pad)
+            ]
+        self._share_stage(spans, "decode", time.perf_counter() - start)
+        return texts
+
+    def stream_text(
+        self,
+        prompt: str,
+        max_new_tokens: int = 100,
+        do_sample: bool = True,
+        top_k: int = 25,
+        top_p: float = 0.95,
+        temperature: float = 0.8,
+        repetition_penalty: int | float = 1.1,
+        skip_special_tokens: bool = True,
+        session_id: Hashable | None = None,
+        stats: StreamStats | None = None,
+        span: Span | None = None
+    ) -> Iterator[str]:
+        """
+        Generates text like `generate_text`, but yields the new text as it is
+        decoded instead of returning it at the end. Generation runs on a
+        background thread. Unlike `generate_text`, the prompt is not included
+        in the output. Timing statistics are recorded in `stats` and stored
+        in `last_stream_stats` once the stream is exhausted.
+
+        Parameters
+        ----------
+        prompt : str
+            A single prompt.
+        max_new_tokens, do_sample, top_k, top_p, temperature, repetition_penalty
+            Sampling parameters, see `generate_text`.
+        skip_special_tokens : bool, optional (default=True)
+            If True, skips special tokens in the output text.
+        session_id : Hashable or None, optional (default=None)
+            Conversation the prompt belongs to, see `generate_text`.
+        stats : StreamStats or None, optional (default=None)
+            Timing statistics of this call, for callers running several
+            streams at once. If None, a new one is used.
+        span : Span or None, optional (default=None)
+            Request span the token counts are recorded in. Pass it when the
+            stream is consumed outside the request's context, e.g. from
+            another thread. If None, the current span is used.
+
+        Yields
+        ------
+        str
+            Newly generated text.
+        """
+        stats = stats if stats is not None else StreamStats()
+        streamer = _CountingStreamer(
+            self.tokenizer, stats, 
+            skip_prompt=True, 
+            skip_special_tokens=skip_special_tokens
+        )
+        with METRICS.timer("local_lm", "tokenize", span):
+            inputs = self.tokenize_text(prompt)
+        cached, n_prefill = self._cached_prefix(inputs, session_id)
+        outputs = []
+        errors = []
+
+        def generate():
+            try:
+                with tc.no_grad():
+                    outputs.append(self.model.generate(
+                        **inputs,
+                        **cached,
+                        streamer=streamer,
+                        max_new_tokens=max_new_tokens,
+                        do_sample=do_sample,
+                        top_k=top_k,
+                        top_p=top_p,
+                        temperature=temperature,
+                        repetition_penalty=repetition_penalty,
+                        pad_token_id=self.tokenizer.pad_token_id
+                    ))
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        self.model.eval()
+        thread = Thread(target=generate, daemon=True)
+        thread.start()
+        for text in streamer:
+            if text:
+                yield text
+        thread.join()
+
+        stats.finish()
+        result = stats.as_dict()
+        self.last_stream_stats = result
+        if errors:
+            raise errors[0]
+        METRICS.observe("chatbot_time_to_first_token_seconds", result["ttft_s"])
+        self._record_tokens(inputs["input_ids"].shape[1], n_prefill, stats.n_tokens, result["total_s"], span)
+        self._store_prefix(session_id, outputs[0][0], cached)
+
+    def _record_tokens(
+        self,
+        n_prompt: int,
+        n_prefill: int,
+        n_new: int,
+        seconds: float,
+        span: Span | None = None
+    ):
+        """
+        Records prompt, prefill and generated token counts and the generation
+        rate, in the metrics and in `span` (by default the current span).
+        """
+        METRICS.inc("chatbot_prompt_tokens_total", n_prompt)
+        METRICS.inc("chatbot_generated_tokens_total", n_new)
+        METRICS.observe("chatbot_generated_tokens", n_new, TOKEN_BUCKETS)
+        if seconds > 0:
+            METRICS.observe("chatbot_tokens_per_second", n_new / seconds, RATE_BUCKETS)
+        attrs = dict(
+            prompt_tokens=n_prompt,
+            prefill_tokens=n_prefill,
+            new_tokens=n_new,
+            tokens_per_s=n_new / seconds if seconds > 0 else None,
+        )
+        if span is not None:
+            span.set(**attrs)
+        else:
+            METRICS.set_span(**attrs)
+
+    def _generated_lengths(self, generated: tc.Tensor) -> tc.Tensor:
+        """
+        Number of tokens generated for each row of a batch, up to and including
+        its first end-of-sequence token. Rows that finish early are padded
+        to the longest one, and the padding is not counted.
+        """
+        eos = self.tokenizer.eos_token_id
+        if eos is None:
+            return (generated != self.tokenizer.pad_token_id).sum(dim=1)
+        is_eos = (generated == eos).int()
+        return ((is_eos.cumsum(dim=1) - is_eos) == 0).sum(dim=1)
+
+    @staticmethod
+    def _share_stage(spans: list[Span | None], stage: str, seconds: float):
+        """
+        Adds a batch stage to the spans after the first one, which the
+        stage timer already recorded it in.
+        """
+        seen = {id(spans[0])}
+        for span in spans[1:]:
+            if span is not None and id(span) not in seen:
+                seen.add(id(span))
+                span.add(f"local_lm.{stage}", seconds)
+
+    def _cached_prefix(
+        self, 
+        inputs: dict[str, tc.Tensor], 
+        session_id: Hashable | None
+    ) -> tuple[dict, int]:
+        """
+        Returns the `generate` arguments that reuse the session's cached prefix
+        and the number of prompt tokens left to run.
+        """
+        n_tokens = inputs["input_ids"].shape[1]
+        if self.prefix_cache is None:
+            self.last_prefill_tokens = n_tokens
+            return {}, n_tokens
+        cache, n_cached = self.prefix_cache.prefix(session_id, inputs["input_ids"][0])
+        self.last_prefill_tokens = n_tokens - n_cached
+        return {"past_key_values": cache}, n_tokens - n_cached
+
+    def _store_prefix(
+        self, 
+        session_id: Hashable | None, 
+        output_ids: tc.Tensor, 
+        cached: dict
+    ):
+        """Puts the cache filled by `generate` back into `prefix_cache`."""
+        if "past_key_values" in cached:
+            self.prefix_cache.put(session_id, output_ids, cached["past_key_values"])
     
     def decode_tokens(
         self, 
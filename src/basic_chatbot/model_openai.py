@@ -1,9 +1,26 @@
-from typing import Union, List
-from openai import OpenAI
+from typing import Iterator, Union, List
+import asyncio
+import random
+import threading
+import httpx
+from openai import (
+    APIConnectionError, APITimeoutError, AsyncOpenAI, InternalServerError,
+    OpenAI, RateLimitError
+)
+from basic_chatbot.streaming import StreamStats
+
+RETRYABLE_ERRORS = (APIConnectionError, InternalServerError, RateLimitError)
 
 class OpenAIChat:
     """
     Loads and generates text using an OpenAI client.
+
+    `generate_text` and `stream_text` block on a synchronous client.
+    `agenerate_text` uses an asynchronous client with a pooled HTTP
+    connection per event loop, at most `max_concurrency` requests in flight,
+    a deadline of `timeout` seconds covering every attempt, retries with
+    full-jitter exponential backoff and, optionally, a hedged second request
+    when the first is slower than `hedge_after`.
         
     Attributes
     ----------
@@ -11,6 +28,20 @@ class OpenAIChat:
         Name of model that will be used.
     client : OpenAI
         OpenAI client that is initialized.
+    timeout : float
+        Seconds allowed per `agenerate_text` call, retries included.
+    max_retries : int
+        Number of retries after a failed attempt.
+    max_concurrency : int
+        Maximum number of `agenerate_text` requests in flight per event loop.
+    hedge_after : float or None
+        Seconds after which a slow request is duplicated.
+    counters : dict[str, int]
+        Number of requests, retries, hedges, hedges that answered first
+        and calls that ran out of time.
+    last_stream_stats : dict or None
+        Time to first token, total time, number of tokens and tokens/s
+        of the last `stream_text` call.
         
     Parameters
     ----------
@@ -18,6 +49,27 @@ class OpenAIChat:
         Name of model that will be used.
     api_key : str, optional (default=None)
         OpenAI API key. If None, raises error.
+    base_url : str or None, optional (default=None)
+        URL of an OpenAI-compatible endpoint. If None, uses the OpenAI API.
+    timeout : float, optional (default=30.0)
+        Seconds allowed per `agenerate_text` call, retries included.
+        The synchronous methods apply it to each attempt.
+    max_retries : int, optional (default=2)
+        Number of retries after a connection error, timeout,
+        rate limit or server error.
+    backoff : float, optional (default=0.5)
+        Base delay in seconds; retry n waits a random time up to
+        `backoff * 2**n`, capped at `max_backoff`.
+    max_backoff : float, optional (default=8.0)
+        Longest delay between retries.
+    max_concurrency : int, optional (default=16)
+        Maximum number of `agenerate_text` requests in flight per event loop.
+    max_connections : int or None, optional (default=None)
+        Size of the HTTP connection pool. If None, `max_concurrency`.
+    hedge_after : float or None, optional (default=None)
+        Seconds after which a second, identical request is sent if the
+        first has not answered; the first reply wins. Hedges are only sent
+        when a concurrency slot is free. If None, requests are not hedged.
 
     Raises
     ------
@@ -27,15 +79,39 @@ class OpenAIChat:
     def __init__(
         self, 
         model: str,
-        api_key: str = None
+        api_key: str = None,
+        base_url: str | None = None,
+        timeout: float = 30.0,
+        max_retries: int = 2,
+        backoff: float = 0.5,
+        max_backoff: float = 8.0,
+        max_concurrency: int = 16,
+        max_connections: int | None = None,
+        hedge_after: float | None = None
     ):
         if api_key is None:
             raise RuntimeError("OPENAI_API_KEY is not set.")
         if not api_key:
             raise RuntimeError("OPENAI_API_KEY is not set.")
         
-        self.client = OpenAI(api_key=api_key)
+        self.client = OpenAI(
+            api_key=api_key, base_url=base_url, timeout=timeout, max_retries=max_retries
+        )
         self.model = model
+        self.api_key = api_key
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections or max_concurrency
+        self.hedge_after = hedge_after
+        self.counters = {"requests": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "timeouts": 0}
+        self.last_stream_stats = None
+
+        self._loops = {}
+        self._lock = threading.Lock()
 
     def generate_text(
         self,
@@ -72,4 +148,208 @@ class OpenAIChat:
             top_p=top_p,
             max_tokens=max_tokens,
         )
-        return resp.choices[0].message.content
\ No newline at end of file
+        return resp.choices[0].message.content
+
+    def _async_client(self) -> tuple[AsyncOpenAI, asyncio.Semaphore]:
+        """
+        Returns the async client and concurrency limit of the running event loop,
+        creating them on first use (both are bound to the loop they run on).
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            entry = self._loops.get(loop)
+            if entry is None:
+                limits = httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+                client = AsyncOpenAI(
+                    api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                    http_client=httpx.AsyncClient(limits=limits, timeout=self.timeout)
+                )
+                entry = (client, asyncio.Semaphore(self.max_concurrency))
+                self._loops = {
+                    other: value for other, value in self._loops.items() if not other.is_closed()
+                }
+                self._loops[loop] = entry
+            return entry
+
+    def _count(self, name: str):
+        with self._lock:
+            self.counters[name] += 1
+
+    async def aclose(self):
+        """Closes the pooled connections of the running event loop."""
+        with self._lock:
+            entry = self._loops.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[0].close()
+
+    async def agenerate_text(
+        self,
+        prompt: Union[List[str], str],
+        max_tokens: int = 100,
+        top_p: float = 0.95,
+        temperature: float = 0.8
+    ) -> str:
+        """
+        Asynchronous version of `generate_text` with a deadline, retries
+        with jittered backoff and optional hedging.
+
+        Parameters
+        ----------
+        prompt : Union[list[str], str]
+            Can be a list of prompts or a single prompt.
+        max_tokens, top_p, temperature
+            Sampling parameters, see `generate_text`.
+
+        Returns
+        -------
+        str
+            Text generated by the model.
+
+        Raises
+        ------
+        TimeoutError
+            If no attempt succeeded within `timeout` seconds.
+            Timeouts are not retried since they use up the deadline.
+        openai.APIError
+            If the request failed with an error that is not retried, or
+            every retry failed.
+        """
+        client, semaphore = self._async_client()
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        kwargs = {
+            "model": self.model,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": temperature,
+            "top_p": top_p,
+            "max_tokens": max_tokens,
+        }
+
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                return await asyncio.wait_for(
+                    self._hedged(client, semaphore, kwargs, deadline), remaining
+                )
+            except (asyncio.TimeoutError, APITimeoutError):
+                break
+            except RETRYABLE_ERRORS:
+                if attempt == self.max_retries:
+                    raise
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+            if loop.time() + delay >= deadline:
+                break
+            self._count("retries")
+            await asyncio.sleep(delay)
+
+        self._count("timeouts")
+        raise TimeoutError(f"No reply from {self.model} within {self.timeout} s.")
+
+    async def _hedged(
+        self,
+        client: AsyncOpenAI,
+        semaphore: asyncio.Semaphore,
+        kwargs: dict,
+        deadline: float
+    ) -> str:
+        """
+        Sends one request and, if it is still running after `hedge_after`
+        and a concurrency slot is free, a duplicate. Returns the first reply
+        and cancels the other request. Requests still running when this
+        coroutine exits, e.g. because the deadline cancelled it, are cancelled.
+        """
+        first = asyncio.ensure_future(self._request(client, semaphore, kwargs, deadline))
+        if self.hedge_after is None:
+            return await first
+
+        tasks = [first]
+        try:
+            done, _ = await asyncio.wait({first}, timeout=self.hedge_after)
+            if done or semaphore.locked():
+                return await first
+
+            self._count("hedges")
+            second = asyncio.ensure_future(self._request(client, semaphore, kwargs, deadline))
+            tasks.append(second)
+            pending = {first, second}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self._count("hedge_wins")
+                        return task.result()
+            return await first
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _request(
+        self,
+        client: AsyncOpenAI,
+        semaphore: asyncio.Semaphore,
+        kwargs: dict,
+        deadline: float
+    ) -> str:
+        """Sends one completion request once a concurrency slot is free."""
+        async with semaphore:
+            self._count("requests")
+            timeout = max(deadline - asyncio.get_running_loop().time(), 0.001)
+            resp = await client.chat.completions.create(**kwargs, timeout=timeout)
+        return resp.choices[0].message.content
+
+    def stream_text(
+        self,
+        prompt: Union[List[str], str],
+        max_tokens: int = 100,
+        top_p: float = 0.95,
+        temperature: float = 0.8,
+        stats: StreamStats | None = None
+    ) -> Iterator[str]:
+        """
+        Generates text like `generate_text`, but yields the text deltas as the
+        API streams them. Timing statistics are recorded in `stats` and stored
+        in `last_stream_stats` once the stream is exhausted.
+
+        Parameters
+        ----------
+        prompt : Union[list[str], str]
+            Can be a list of prompts or a single prompt.
+        max_tokens, top_p, temperature
+            Sampling parameters, see `generate_text`.
+        stats : StreamStats or None, optional (default=None)
+            Timing statistics of this call, for callers running several
+            streams at once. If None, a new one is used.
+
+        Yields
+        ------
+        str
+            Newly generated text.
+        """
+        stats = stats if stats is not None else StreamStats()
+        stream = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            top_p=top_p,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+
+        usage = None
+        for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage.completion_tokens
+            if chunk.choices and chunk.choices[0].delta.content:
+                stats.add()
+                yield chunk.choices[0].delta.content
+
+        stats.finish(usage)
+        self.last_stream_stats = stats.as_dict()
\ No newline at end of file
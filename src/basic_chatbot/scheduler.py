@@ -0,0 +1,190 @@
+from collections import deque
+from concurrent.futures import Future
+from typing import Hashable
+import queue
+import threading
+import time
+from basic_chatbot.metrics import METRICS
+
+class GenerationScheduler:
+    """
+    Batches concurrent generation requests for a `LocalLM`.
+
+    Prompts arriving within `max_wait_ms` of each other are gathered by a
+    background thread, left-padded and generated with one `generate` call,
+    so concurrent chats share each decoding step instead of running one
+    forward pass per prompt. Only requests with the same sampling parameters
+    are batched together; the others wait for the next batch.
+
+    Batching takes priority over the model's per-session prefix cache:
+    batched prompts are run from scratch, while a request that is alone in
+    its batch is generated with `generate_text` and reuses its session's
+    cached prompt prefix.
+
+    Attributes
+    ----------
+    lm : LocalLM
+        Model whose `generate_batch` and `generate_text` methods serve the requests.
+    max_batch_size : int
+        Largest number of prompts generated by one `generate` call.
+    max_wait_ms : float
+        Longest time the first request of a batch waits for others to arrive.
+    batch_sizes : collections.deque[int]
+        Sizes of the last 1024 batches generated, oldest first.
+
+    Parameters
+    ----------
+    lm : LocalLM
+        Model whose `generate_batch` method serves the requests.
+    max_batch_size : int, optional (default=8)
+        Largest number of prompts generated by one `generate` call.
+    max_wait_ms : float, optional (default=10.0)
+        Longest time the first request of a batch waits for others to arrive.
+    """
+    def __init__(
+        self,
+        lm,
+        max_batch_size: int = 8,
+        max_wait_ms: float = 10.0
+    ):
+        self.lm = lm
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batch_sizes = deque(maxlen=1024)
+
+        self._queue = queue.Queue()
+        self._held = []
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        prompt: str,
+        session_id: Hashable | None = None,
+        **kwargs
+    ) -> Future:
+        """
+        Queues a prompt without waiting for the result.
+
+        Parameters
+        ----------
+        prompt : str
+            A single prompt.
+        session_id : Hashable or None, optional (default=None)
+            Conversation the prompt belongs to. Its cached prompt prefix is
+            reused if the prompt ends up alone in its batch.
+        **kwargs
+            Sampling parameters of `LocalLM.generate_text`.
+
+        Returns
+        -------
+        Future
+            Resolves to the generated text. Token counts and stage timings
+            are recorded in the caller's current span.
+
+        Raises
+        ------
+        RuntimeError
+            If the scheduler is closed.
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("GenerationScheduler is closed.")
+            self._queue.put((prompt, tuple(sorted(kwargs.items())), future, session_id, METRICS.current_span()))
+        return future
+
+    def generate_text(
+        self,
+        prompt: str,
+        session_id: Hashable | None = None,
+        **kwargs
+    ) -> str:
+        """Same as `LocalLM.generate_text`, but served from a shared batch."""
+        return self.submit(prompt, session_id, **kwargs).result()
+
+    def close(self):
+        """Serves the queued requests and stops the background thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _next(self, timeout: float | None = None) -> tuple | None:
+        """Takes the oldest request, preferring ones held back from earlier batches."""
+        if self._held:
+            return self._held.pop(0)
+        return self._queue.get(timeout=timeout)
+
+    def _collect(self, first: tuple) -> tuple[list[tuple], bool]:
+        """
+        Gathers requests with the same sampling parameters as `first`
+        until the batch is full or the wait time is over.
+        """
+        batch = [first]
+        held = []
+        for item in self._held:
+            if item[1] == first[1] and len(batch) < self.max_batch_size:
+                batch.append(item)
+            else:
+                held.append(item)
+
+        closed = False
+        deadline = time.monotonic() + self.max_wait_ms / 1e3
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                closed = True
+                break
+            if item[1] == first[1]:
+                batch.append(item)
+            else:
+                held.append(item)
+
+        self._held = held
+        return batch, closed
+
+    def _run(self):
+        """Background loop that serves the queued requests in batches."""
+        closed = False
+        while True:
+            if closed and not self._held:
+                break
+            first = self._next()
+            if first is None:
+                closed = True
+                continue
+            batch, stop = self._collect(first)
+            closed = closed or stop
+
+            self.batch_sizes.append(len(batch))
+            try:
+                if len(batch) == 1:
+                    texts = [self.lm.generate_text(first[0], session_id=first[3], span=first[4], **dict(first[1]))]
+                else:
+                    texts = self.lm.generate_batch(
+                        [item[0] for item in batch], spans=[item[4] for item in batch], **dict(first[1])
+                    )
+            except Exception as e:
+                for item in batch:
+                    item[2].set_exception(e)
+                continue
+
+            for item, text in zip(batch, texts):
+                item[2].set_result(text)
\ No newline at end of file
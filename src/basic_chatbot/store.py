@@ -0,0 +1,336 @@
+from collections import deque
+from pathlib import Path
+import json
+import os
+import sqlite3
+import threading
+
+STORE_BACKENDS = ("jsonl", "sqlite")
+
+class JSONLStore:
+    """
+    Conversation turns of every session in one append-only JSONL log.
+
+    Each `append` writes a single line with the session key and the new
+    turns, so persisting a turn costs the same however long the history is.
+    Concurrent appends are group-committed: one `fsync` covers every line
+    written before it. After `compact_every` appends, the log is rewritten
+    to one line per session through a temporary file and an atomic rename.
+    A torn last line left by a crash is skipped when the log is replayed.
+    The log is meant for a single process; use `SQLiteStore` to share
+    state between processes.
+
+    Attributes
+    ----------
+    path : Path
+        Location of the log.
+    max_turns : int or None
+        Number of most recent turns kept per session. If None, all are kept.
+    compact_every : int
+        Number of appends between compactions.
+    fsync : bool
+        If True, appends are flushed to disk before they return.
+    appends : int
+        Number of `append` calls.
+    fsyncs : int
+        Number of `fsync` calls.
+    compactions : int
+        Number of times the log was rewritten.
+
+    Parameters
+    ----------
+    path : str
+        Location of the log.
+    max_turns : int or None, optional (default=1000)
+        Number of most recent turns kept per session. If None, all are kept.
+    compact_every : int, optional (default=1000)
+        Number of appends between compactions.
+    fsync : bool, optional (default=True)
+        If True, appends are flushed to disk before they return.
+    """
+    def __init__(
+        self,
+        path: str,
+        max_turns: int | None = 1000,
+        compact_every: int = 1000,
+        fsync: bool = True
+    ):
+        self.path = Path(path)
+        self.max_turns = max_turns
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self.appends = 0
+        self.fsyncs = 0
+        self.compactions = 0
+
+        self._sessions = {}
+        self._since_compaction = 0
+        self._written = 0
+        self._synced = 0
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._replay()
+        self._file = self.path.open("a", encoding="utf-8")
+
+    def _replay(self):
+        """Rebuilds the per-session turns from the log and cuts off a torn last line."""
+        if not self.path.exists():
+            return
+        with self.path.open("rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+        with self.path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if record.get("clear"):
+                    self._sessions.pop(record["session"], None)
+                else:
+                    self._turns(record["session"]).extend(record["turns"])
+                self._since_compaction += 1
+
+    def _turns(self, session: str) -> deque:
+        turns = self._sessions.get(session)
+        if turns is None:
+            turns = self._sessions[session] = deque(maxlen=self.max_turns)
+        return turns
+
+    def load(self, session: str) -> list[str]:
+        """Returns the stored turns of a session, oldest first."""
+        with self._lock:
+            return list(self._sessions.get(session, ()))
+
+    def append(self, session: str, turns: list[str]):
+        """Appends turns to a session's history."""
+        if turns:
+            self._write({"session": session, "turns": list(turns)})
+            with self._lock:
+                self._turns(session).extend(turns)
+
+    def clear(self, session: str):
+        """Drops a session's history."""
+        self._write({"session": session, "clear": True})
+        with self._lock:
+            self._sessions.pop(session, None)
+
+    def _write(self, record: dict):
+        """Appends one line to the log, syncs it and compacts the log when due."""
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._written += 1
+            seq = self._written
+            self.appends += 1
+            self._since_compaction += 1
+
+        if self.fsync:
+            with self._sync_lock:
+                if self._synced < seq:
+                    with self._lock:
+                        target = self._written
+                        self._file.flush()
+                    os.fsync(self._file.fileno())
+                    self._synced = target
+                    self.fsyncs += 1
+        else:
+            with self._lock:
+                self._file.flush()
+
+        if self._since_compaction >= self.compact_every:
+            self.compact()
+
+    def compact(self):
+        """Rewrites the log as one line per session and atomically replaces it."""
+        with self._sync_lock, self._lock:
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with tmp_path.open("w", encoding="utf-8") as f:
+                for session, turns in self._sessions.items():
+                    if turns:
+                        f.write(json.dumps({"session": session, "turns": list(turns)}, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            self._file = self.path.open("a", encoding="utf-8")
+            self._synced = self._written
+            self._since_compaction = len(self._sessions)
+            self.compactions += 1
+
+    def close(self):
+        """Flushes and closes the log."""
+        with self._lock:
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._file.close()
+
+    def stats(self) -> dict[str, int]:
+        """Returns the number of sessions, appends, fsyncs and compactions and the log size."""
+        return {
+            "sessions": len(self._sessions),
+            "appends": self.appends,
+            "fsyncs": self.fsyncs,
+            "compactions": self.compactions,
+            "bytes": self.path.stat().st_size if self.path.exists() else 0,
+        }
+
+class SQLiteStore:
+    """
+    Conversation turns of every session in an SQLite database in WAL mode.
+
+    Each `append` inserts the new turns in one transaction. With
+    `synchronous=NORMAL`, WAL commits are not synced individually; the
+    log is synced when SQLite checkpoints it. Several processes can share
+    the database. After `compact_every` appends, turns beyond `max_turns`
+    per session are deleted and the WAL is checkpointed and truncated.
+
+    Attributes
+    ----------
+    path : Path
+        Location of the database.
+    max_turns : int or None
+        Number of most recent turns kept per session. If None, all are kept.
+    compact_every : int
+        Number of appends between compactions.
+    appends : int
+        Number of `append` calls.
+    compactions : int
+        Number of compactions.
+
+    Parameters
+    ----------
+    path : str
+        Location of the database.
+    max_turns : int or None, optional (default=1000)
+        Number of most recent turns kept per session. If None, all are kept.
+    compact_every : int, optional (default=1000)
+        Number of appends between compactions.
+    fsync : bool, optional (default=True)
+        If True, uses `synchronous=NORMAL`; otherwise `synchronous=OFF`.
+    """
+    def __init__(
+        self,
+        path: str,
+        max_turns: int | None = 1000,
+        compact_every: int = 1000,
+        fsync: bool = True
+    ):
+        self.path = Path(path)
+        self.max_turns = max_turns
+        self.compact_every = compact_every
+        self.appends = 0
+        self.compactions = 0
+        self._since_compaction = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"PRAGMA synchronous={'NORMAL' if fsync else 'OFF'}")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS turns ("
+                "seq INTEGER PRIMARY KEY AUTOINCREMENT, session TEXT NOT NULL, text TEXT NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS turns_session ON turns (session, seq)")
+
+    def load(self, session: str) -> list[str]:
+        """Returns the stored turns of a session, oldest first."""
+        limit = -1 if self.max_turns is None else self.max_turns
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT text FROM (SELECT seq, text FROM turns WHERE session = ? "
+                "ORDER BY seq DESC LIMIT ?) ORDER BY seq",
+                (session, limit)
+            ).fetchall()
+        return [text for (text,) in rows]
+
+    def append(self, session: str, turns: list[str]):
+        """Appends turns to a session's history."""
+        if not turns:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO turns (session, text) VALUES (?, ?)",
+                [(session, text) for text in turns]
+            )
+            self.appends += 1
+            self._since_compaction += 1
+        if self._since_compaction >= self.compact_every:
+            self.compact()
+
+    def clear(self, session: str):
+        """Drops a session's history."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM turns WHERE session = ?", (session,))
+
+    def compact(self):
+        """Deletes turns beyond `max_turns` per session and truncates the WAL."""
+        with self._lock:
+            if self.max_turns is not None:
+                with self._conn:
+                    self._conn.execute(
+                        "DELETE FROM turns WHERE seq IN (SELECT seq FROM ("
+                        "SELECT seq, ROW_NUMBER() OVER (PARTITION BY session ORDER BY seq DESC) AS n "
+                        "FROM turns) WHERE n > ?)",
+                        (self.max_turns,)
+                    )
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._since_compaction = 0
+            self.compactions += 1
+
+    def close(self):
+        """Checkpoints the WAL and closes the database."""
+        with self._lock:
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._conn.close()
+
+    def stats(self) -> dict[str, int]:
+        """Returns the number of sessions, appends and compactions and the database size."""
+        with self._lock:
+            (sessions,) = self._conn.execute("SELECT COUNT(DISTINCT session) FROM turns").fetchone()
+        wal = self.path.with_name(self.path.name + "-wal")
+        return {
+            "sessions": sessions,
+            "appends": self.appends,
+            "compactions": self.compactions,
+            "bytes": self.path.stat().st_size + (wal.stat().st_size if wal.exists() else 0),
+        }
+
+def open_store(
+    path: str,
+    backend: str = "sqlite",
+    **kwargs
+) -> JSONLStore | SQLiteStore:
+    """
+    Opens a conversation store.
+
+    Parameters
+    ----------
+    path : str
+        Location of the store, without extension; `.jsonl` or `.db` is added.
+    backend : str, optional (default="sqlite")
+        `"jsonl"` (single process) or `"sqlite"` (WAL mode, multi-process).
+    **kwargs
+        `max_turns`, `compact_every` and `fsync`, see `JSONLStore` and `SQLiteStore`.
+
+    Returns
+    -------
+    JSONLStore or SQLiteStore
+        The opened store.
+
+    Raises
+    ------
+    ValueError
+        If `backend` is not supported.
+    """
+    if backend == "jsonl":
+        return JSONLStore(str(Path(path).with_suffix(".jsonl")), **kwargs)
+    if backend == "sqlite":
+        return SQLiteStore(str(Path(path).with_suffix(".db")), **kwargs)
+    raise ValueError(f"Unknown store backend {backend!r}; expected one of {STORE_BACKENDS}.")
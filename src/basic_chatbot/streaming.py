@@ -0,0 +1,49 @@
+import time
+
+class StreamStats:
+    """
+    Times a streamed generation.
+
+    Attributes
+    ----------
+    start : float
+        `time.perf_counter()` value when the request was made.
+    first_token : float or None
+        `time.perf_counter()` value when the first token arrived.
+    end : float or None
+        `time.perf_counter()` value when the stream finished.
+    n_tokens : int
+        Number of generated tokens.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_token = None
+        self.end = None
+        self.n_tokens = 0
+
+    def add(self, n_tokens: int = 1):
+        """Records `n_tokens` newly generated tokens."""
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+        self.n_tokens += n_tokens
+
+    def finish(self, n_tokens: int | None = None):
+        """Marks the end of the stream, optionally overriding the token count."""
+        self.end = time.perf_counter()
+        if n_tokens is not None:
+            self.n_tokens = n_tokens
+
+    def as_dict(self) -> dict[str, float | int]:
+        """
+        Returns the time to first token and total time in seconds,
+        the number of tokens and the generation rate in tokens/s.
+        """
+        end = self.end if self.end is not None else time.perf_counter()
+        first = self.first_token if self.first_token is not None else end
+        total_s = end - self.start
+        return {
+            "ttft_s": first - self.start,
+            "total_s": total_s,
+            "n_tokens": self.n_tokens,
+            "tokens_per_s": self.n_tokens / total_s if total_s > 0 else 0.0,
+        }
\ No newline at end of file
@@ -0,0 +1,172 @@
+from collections import deque
+from concurrent.futures import Future
+import queue
+import threading
+import time
+import numpy as np
+
+class QueryBatcher:
+    """
+    Micro-batches concurrent retrieval requests.
+
+    Requests arriving within `max_wait_ms` of each other are gathered by a
+    background thread and served with one `retrieve_ids_batch` call, so
+    concurrent users share a single encoder forward pass and a single index
+    search. Queries submitted with their embedding are not encoded again.
+
+    Attributes
+    ----------
+    retriever : DocsRetriever, HybridRetriever or Reranker
+        Retriever whose `retrieve_ids_batch` method serves the requests.
+    max_batch_size : int
+        Largest number of queries served by one `retrieve_ids_batch` call.
+    max_wait_ms : float
+        Longest time the first request of a batch waits for others to arrive.
+    batch_sizes : collections.deque[int]
+        Sizes of the last 1024 batches served, oldest first.
+
+    Parameters
+    ----------
+    retriever : DocsRetriever, HybridRetriever or Reranker
+        Retriever whose `retrieve_ids_batch` method serves the requests.
+    max_batch_size : int, optional (default=32)
+        Largest number of queries served by one `retrieve_ids_batch` call.
+    max_wait_ms : float, optional (default=5.0)
+        Longest time the first request of a batch waits for others to arrive.
+    """
+    def __init__(
+        self,
+        retriever,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0
+    ):
+        self.retriever = retriever
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.batch_sizes = deque(maxlen=1024)
+
+        self._queue = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        query: str,
+        k: int = 1,
+        query_emb: np.ndarray | None = None
+    ) -> Future:
+        """
+        Queues a query without waiting for the result.
+
+        Parameters
+        ----------
+        query : str
+            Natural language query to embed and search against the index.
+        k : int, optional (default=1)
+            Number of nearest documents to return. Must be >= 1.
+        query_emb : np.ndarray or None, optional (default=None)
+            Embedding of `query` from `embed_queries`. If None, it is encoded
+            together with the rest of the batch.
+
+        Returns
+        -------
+        Future
+            Resolves to the retrieved vector IDs, most similar first.
+
+        Raises
+        ------
+        RuntimeError
+            If the batcher is closed.
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("QueryBatcher is closed.")
+            self._queue.put((query, k, future, query_emb))
+        return future
+
+    def retrieve_ids(
+        self,
+        query: str,
+        k: int = 1,
+        query_emb: np.ndarray | None = None
+    ) -> list[int]:
+        """Same as `DocsRetriever.retrieve_ids`, but served from a shared batch."""
+        return self.submit(query, k, query_emb).result()
+
+    def retrieve(
+        self,
+        query: str,
+        k: int = 1
+    ) -> list[str]:
+        """Same as `DocsRetriever.retrieve`, but served from a shared batch."""
+        return self.retriever.get_documents(self.retrieve_ids(query, k))
+
+    def close(self):
+        """Serves the queued requests and stops the background thread."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _collect(self, first: tuple) -> tuple[list[tuple], bool]:
+        """Gathers requests until the batch is full or the wait time is over."""
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait_ms / 1e3
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        """Background loop that serves the queued requests in batches."""
+        closed = False
+        while not closed:
+            first = self._queue.get()
+            if first is None:
+                break
+            batch, closed = self._collect(first)
+
+            k = max(item[1] for item in batch)
+            self.batch_sizes.append(len(batch))
+            try:
+                results = self.retriever.retrieve_ids_batch(
+                    [item[0] for item in batch], k, self._embeddings(batch)
+                )
+            except Exception as e:
+                for item in batch:
+                    item[2].set_exception(e)
+                continue
+
+            for item, ids in zip(batch, results):
+                item[2].set_result(ids[:item[1]])
+
+    def _embeddings(self, batch: list[tuple]) -> np.ndarray | None:
+        """Stacks the submitted embeddings, encoding the missing ones, or returns None if none were given."""
+        if all(item[3] is None for item in batch):
+            return None
+        missing = [n for n, item in enumerate(batch) if item[3] is None]
+        embs = [item[3] for item in batch]
+        if missing:
+            encoded = self.retriever.embed_queries([batch[n][0] for n in missing])
+            for n, emb in zip(missing, encoded):
+                embs[n] = emb
+        return np.stack(embs)
@@ -0,0 +1,184 @@
+from collections import Counter
+import re
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text: str) -> list[str]:
+    """Lower-cases a text and splits it into word tokens."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+class BM25Index:
+    """
+    An in-memory inverted index scored with Okapi BM25.
+
+    Postings are stored in compressed sparse row layout: the postings of
+    term `t` are `doc_idx[indptr[t]:indptr[t + 1]]`, each with its
+    precomputed BM25 weight in `weights`. Scoring a query is then one
+    vectorized scatter-add per query term.
+
+    Attributes
+    ----------
+    ids : np.ndarray
+        Vector ID of each indexed document, shape (n_docs,).
+    vocab : dict[str, int]
+        Term to row in the postings arrays.
+    indptr : np.ndarray
+        Start offset of each term's postings, shape (n_terms + 1,).
+    doc_idx : np.ndarray
+        Position in `ids` of each posting's document.
+    weights : np.ndarray
+        BM25 weight of each posting.
+    k1 : float
+        Term frequency saturation.
+    b : float
+        Document length normalization.
+
+    Parameters
+    ----------
+    documents : dict[int, str]
+        Document text keyed by vector ID, e.g. `DocsRetriever.documents`.
+    k1 : float, optional (default=1.5)
+        Term frequency saturation.
+    b : float, optional (default=0.75)
+        Document length normalization.
+    """
+    def __init__(
+        self,
+        documents: dict[int, str],
+        k1: float = 1.5,
+        b: float = 0.75
+    ):
+        self.k1 = k1
+        self.b = b
+        self.ids = np.fromiter(documents.keys(), dtype=np.int64, count=len(documents))
+        self.vocab = {}
+
+        terms, docs, freqs = [], [], []
+        doc_len = np.zeros(len(documents), dtype=np.float32)
+        for n, text in enumerate(documents.values()):
+            counts = Counter(tokenize(text))
+            doc_len[n] = sum(counts.values())
+            for term, freq in counts.items():
+                terms.append(self.vocab.setdefault(term, len(self.vocab)))
+                docs.append(n)
+                freqs.append(freq)
+
+        terms = np.asarray(terms, dtype=np.int32)
+        order = np.argsort(terms, kind="stable")
+        self.doc_idx = np.asarray(docs, dtype=np.int32)[order]
+        tf = np.asarray(freqs, dtype=np.float32)[order]
+
+        df = np.bincount(terms, minlength=len(self.vocab))
+        self.indptr = np.zeros(len(self.vocab) + 1, dtype=np.int64)
+        np.cumsum(df, out=self.indptr[1:])
+
+        n_docs = len(documents)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5)).astype(np.float32)
+        avg_len = doc_len.mean() if n_docs else 1.0
+        norm = k1 * (1 - b + b * doc_len[self.doc_idx] / max(avg_len, 1e-9))
+        self.weights = np.repeat(idf, df) * tf * (k1 + 1) / (tf + norm)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def scores(self, query: str) -> np.ndarray:
+        """Returns the BM25 score of every document for a query, shape (n_docs,)."""
+        scores = np.zeros(len(self.ids), dtype=np.float32)
+        for term, count in Counter(tokenize(query)).items():
+            row = self.vocab.get(term)
+            if row is None:
+                continue
+            start, end = self.indptr[row], self.indptr[row + 1]
+            scores[self.doc_idx[start:end]] += count * self.weights[start:end]
+        return scores
+
+    def search(
+        self,
+        query: str,
+        k: int = 10
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the documents with the highest BM25 score.
+        Documents sharing no term with the query are never returned.
+
+        Parameters
+        ----------
+        query : str
+            Query text.
+        k : int, optional (default=10)
+            Maximum number of documents to return.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            Vector IDs and scores, best match first.
+        """
+        scores = self.scores(query)
+        matched = np.flatnonzero(scores > 0)
+        if len(matched) > k:
+            matched = matched[np.argpartition(-scores[matched], k - 1)[:k]]
+        matched = matched[np.argsort(-scores[matched], kind="stable")]
+        return self.ids[matched], scores[matched]
+
+def reciprocal_rank_fusion(
+    rankings: list[list[int]],
+    rrf_k: int = 60,
+    weights: list[float] | None = None
+) -> list[tuple[int, float]]:
+    """
+    Fuses ranked lists with reciprocal rank fusion: every list adds
+    `weight / (rrf_k + rank)` to the score of each of its IDs.
+
+    Parameters
+    ----------
+    rankings : list[list[int]]
+        Ranked ID lists, best first.
+    rrf_k : int, optional (default=60)
+        Rank offset; higher values flatten the contribution of top ranks.
+    weights : list[float] or None, optional (default=None)
+        Weight of each list. If None, all lists count equally.
+
+    Returns
+    -------
+    list[tuple[int, float]]
+        IDs and fused scores, best first.
+    """
+    weights = weights or [1.0] * len(rankings)
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, i in enumerate(ranking, 1):
+            fused[i] = fused.get(i, 0.0) + weight / (rrf_k + rank)
+    return sorted(fused.items(), key=lambda item: -item[1])
+
+def weighted_fusion(
+    results: list[tuple[list[int], list[float]]],
+    weights: list[float] | None = None
+) -> list[tuple[int, float]]:
+    """
+    Fuses scored lists by a weighted sum of their min-max normalized scores.
+    An ID missing from a list gets 0 from it.
+
+    Parameters
+    ----------
+    results : list[tuple[list[int], list[float]]]
+        Pairs of (IDs, scores) where higher scores are better.
+    weights : list[float] or None, optional (default=None)
+        Weight of each list. If None, all lists count equally.
+
+    Returns
+    -------
+    list[tuple[int, float]]
+        IDs and fused scores, best first.
+    """
+    weights = weights or [1.0] * len(results)
+    fused = {}
+    for (ids, scores), weight in zip(results, weights):
+        if len(ids) == 0:
+            continue
+        scores = np.asarray(scores, dtype=np.float32)
+        span = scores.max() - scores.min()
+        normed = (scores - scores.min()) / span if span > 0 else np.ones_like(scores)
+        for i, score in zip(ids, normed):
+            fused[int(i)] = fused.get(int(i), 0.0) + weight * float(score)
+    return sorted(fused.items(), key=lambda item: -item[1])
\ No newline at end of file
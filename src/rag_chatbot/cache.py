@@ -0,0 +1,358 @@
+from collections import OrderedDict
+from typing import Any, Hashable
+import re
+import threading
+import time
+import unicodedata
+import numpy as np
+
+_WHITESPACE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = re.compile(r"^[\W_]+|[\W_]+$")
+
+def normalize_query(text: str) -> str:
+    """
+    Normalizes a query so trivially different spellings share a cache entry.
+    Applies Unicode NFKC normalization, case folding, whitespace collapsing
+    and strips punctuation from both ends.
+
+    Parameters
+    ----------
+    text : str
+        Query text.
+
+    Returns
+    -------
+    str
+        Normalized query text.
+    """
+    text = unicodedata.normalize("NFKC", text).casefold()
+    text = _WHITESPACE.sub(" ", text).strip()
+    return _EDGE_PUNCTUATION.sub("", text)
+
+class LRUCache:
+    """
+    A thread-safe, bounded least-recently-used cache with optional expiry.
+
+    Attributes
+    ----------
+    max_size : int
+        Maximum number of entries.
+    ttl : float or None
+        Seconds an entry stays valid. If None, entries never expire.
+    hits : int
+        Number of lookups that found a valid entry.
+    misses : int
+        Number of lookups that found no valid entry.
+    evictions : int
+        Number of entries dropped because the cache was full.
+    expirations : int
+        Number of entries dropped because they were older than `ttl`.
+
+    Parameters
+    ----------
+    max_size : int, optional (default=1024)
+        Maximum number of entries.
+    ttl : float or None, optional (default=None)
+        Seconds an entry stays valid. If None, entries never expire.
+    """
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float | None = None
+    ):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the cached value for `key`, or `default` if missing or expired."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._data[key]
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any):
+        """Stores `value` under `key`, evicting the least recently used entry if full."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic())
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drops every entry. Counters are kept."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict[str, int | float]:
+        """Returns the size, hit/miss/eviction/expiration counters and hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+class QueryCache:
+    """
+    Caches query embeddings and top-k result IDs in front of `DocsRetriever`.
+
+    Both caches are keyed on the normalized query text (see `normalize_query`).
+    Result IDs are also keyed on k and the retriever's index version, and
+    are dropped as soon as the index changes. Lookups from an older index
+    version than the cached one miss instead of clearing the cache.
+
+    Attributes
+    ----------
+    embeddings : LRUCache
+        Query embeddings keyed by normalized query text.
+    results : LRUCache
+        Top-k vector IDs keyed by (normalized query text, k).
+    version : int or None
+        Index version the cached results belong to.
+
+    Parameters
+    ----------
+    max_size : int, optional (default=1024)
+        Maximum number of entries in each cache.
+    ttl : float or None, optional (default=None)
+        Seconds an entry stays valid. If None, entries never expire.
+    """
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float | None = None
+    ):
+        self.embeddings = LRUCache(max_size, ttl)
+        self.results = LRUCache(max_size, ttl)
+        self.version = None
+        self._lock = threading.Lock()
+
+    def get_results(self, query: str, k: int, version: int) -> list[int] | None:
+        """Returns the cached top-k IDs of a query, or None."""
+        with self._lock:
+            if self.version is None or version > self.version:
+                self.results.clear()
+                self.version = version
+            if version != self.version:
+                return None
+            return self.results.get((normalize_query(query), k))
+
+    def put_results(self, query: str, k: int, version: int, ids: list[int]):
+        """Caches the top-k IDs of a query for the given index version."""
+        with self._lock:
+            if version == self.version:
+                self.results.put((normalize_query(query), k), ids)
+
+    def get_embedding(self, query: str) -> np.ndarray | None:
+        """Returns the cached embedding of a query, or None."""
+        return self.embeddings.get(normalize_query(query))
+
+    def put_embedding(self, query: str, embedding: np.ndarray):
+        """Caches the embedding of a query."""
+        self.embeddings.put(normalize_query(query), embedding)
+
+    def stats(self) -> dict[str, dict]:
+        """Returns the counters of both caches."""
+        return {"embeddings": self.embeddings.stats(), "results": self.results.stats()}
+
+class SemanticCache:
+    """
+    Caches chat replies and serves them for semantically equivalent questions.
+
+    A cached reply is returned when a new question's embedding has a cosine
+    similarity of at least `threshold` with a cached question and the
+    retriever returned exactly the same documents for both, so the reply
+    was generated from the same context.
+
+    Attributes
+    ----------
+    threshold : float
+        Minimum cosine similarity between questions for a cache hit.
+    max_size : int
+        Maximum number of cached replies; the least recently used is evicted.
+    ttl : float or None
+        Seconds a reply stays valid. If None, replies never expire.
+    ignore_history : bool
+        If False, the cache is bypassed whenever the conversation has history,
+        because the reply may depend on earlier turns.
+    hits : int
+        Number of lookups answered from the cache.
+    misses : int
+        Number of lookups that found no similar question.
+    evictions : int
+        Number of replies dropped because the cache was full.
+    bypasses : int
+        Number of questions that skipped the cache because of history.
+
+    Parameters
+    ----------
+    threshold : float, optional (default=0.95)
+        Minimum cosine similarity between questions for a cache hit.
+    max_size : int, optional (default=512)
+        Maximum number of cached replies.
+    ttl : float or None, optional (default=None)
+        Seconds a reply stays valid. If None, replies never expire.
+    ignore_history : bool, optional (default=False)
+        If True, the cache is also used for questions asked mid-conversation.
+    """
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_size: int = 512,
+        ttl: float | None = None,
+        ignore_history: bool = False
+    ):
+        self.threshold = threshold
+        self.max_size = max_size
+        self.ttl = ttl
+        self.ignore_history = ignore_history
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bypasses = 0
+
+        self._entries = OrderedDict()
+        self._by_context = {}
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    def lookup(
+        self,
+        embedding: np.ndarray,
+        doc_ids: list[int]
+    ) -> str | None:
+        """
+        Returns the cached reply of the most similar question asked with
+        the same retrieved documents, or None if none is similar enough.
+
+        Parameters
+        ----------
+        embedding : np.ndarray
+            Embedding of the new question.
+        doc_ids : list[int]
+            Vector IDs retrieved for the new question.
+
+        Returns
+        -------
+        str or None
+            Cached reply, or None on a miss.
+        """
+        context = tuple(doc_ids)
+        with self._lock:
+            self._expire()
+            keys = self._by_context.get(context)
+            if not keys:
+                self.misses += 1
+                return None
+
+            keys = list(keys)
+            cached = np.stack([self._entries[key][0] for key in keys])
+            scores = cached @ _unit(embedding)
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(keys[best])
+            self.hits += 1
+            return self._entries[keys[best]][2]
+
+    def store(
+        self,
+        embedding: np.ndarray,
+        doc_ids: list[int],
+        reply: str
+    ):
+        """
+        Caches a reply.
+
+        Parameters
+        ----------
+        embedding : np.ndarray
+            Embedding of the question.
+        doc_ids : list[int]
+            Vector IDs retrieved for the question.
+        reply : str
+            Reply generated for the question.
+        """
+        if self.max_size <= 0:
+            return
+        context = tuple(doc_ids)
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = (_unit(embedding), context, reply, time.monotonic())
+            self._by_context.setdefault(context, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def bypass(self):
+        """Records a question that skipped the cache."""
+        with self._lock:
+            self.bypasses += 1
+
+    def clear(self):
+        """Drops every cached reply. Counters are kept."""
+        with self._lock:
+            self._entries.clear()
+            self._by_context.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        """Returns the size, hit/miss/eviction/bypass counters and hit rate."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "bypasses": self.bypasses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def _remove(self, key: int):
+        """Removes one entry from both lookup tables."""
+        _, context, _, _ = self._entries.pop(key)
+        keys = self._by_context[context]
+        keys.discard(key)
+        if not keys:
+            del self._by_context[context]
+
+    def _expire(self):
+        """Removes entries older than `ttl`."""
+        if self.ttl is None:
+            return
+        now = time.monotonic()
+        for key in [k for k, entry in self._entries.items() if now - entry[3] > self.ttl]:
+            self._remove(key)
+
+def _unit(vector: np.ndarray) -> np.ndarray:
+    """Scales a vector to unit length."""
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
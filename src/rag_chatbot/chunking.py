@@ -0,0 +1,237 @@
+from typing import Callable, NamedTuple
+import re
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+PARAGRAPH_END = re.compile(r"\n\s*\n")
+DEFAULT_CHUNKING = {"strategy": "fixed", "chunk_size": 80}
+
+class Chunk(NamedTuple):
+    """A chunk of text and its character offsets in the source text."""
+    text: str
+    start: int
+    end: int
+
+def chunk_fixed(
+    text: str,
+    chunk_size: int = 80,
+    overlap: int = 0
+) -> list[Chunk]:
+    """
+    Slices the text every `chunk_size` characters.
+
+    Parameters
+    ----------
+    text : str
+        Text that will be chunked.
+    chunk_size : int, optional (default=80)
+        Number of characters per chunk.
+    overlap : int, optional (default=0)
+        Number of characters shared by consecutive chunks.
+
+    Returns
+    -------
+    list[Chunk]
+        Chunks and their offsets.
+    """
+    step = _step(chunk_size, overlap)
+    return [
+        Chunk(text[i:i + chunk_size], i, min(i + chunk_size, len(text)))
+        for i in range(0, max(len(text) - overlap, 1) if text else 0, step)
+    ]
+
+def chunk_sentences(
+    text: str,
+    chunk_size: int = 500,
+    overlap: int = 0
+) -> list[Chunk]:
+    """
+    Packs whole sentences into chunks of at most `chunk_size` characters.
+    Sentences longer than `chunk_size` are split with `chunk_fixed`.
+
+    Parameters
+    ----------
+    text : str
+        Text that will be chunked.
+    chunk_size : int, optional (default=500)
+        Maximum number of characters per chunk.
+    overlap : int, optional (default=0)
+        Number of trailing sentences repeated at the start of the next chunk.
+
+    Returns
+    -------
+    list[Chunk]
+        Chunks and their offsets.
+    """
+    return _pack(text, _spans(text, SENTENCE_END), chunk_size, overlap)
+
+def chunk_paragraphs(
+    text: str,
+    chunk_size: int = 1000,
+    overlap: int = 0
+) -> list[Chunk]:
+    """
+    Packs whole paragraphs (separated by blank lines) into chunks of at most
+    `chunk_size` characters. Paragraphs longer than `chunk_size` are packed
+    sentence by sentence instead.
+
+    Parameters
+    ----------
+    text : str
+        Text that will be chunked.
+    chunk_size : int, optional (default=1000)
+        Maximum number of characters per chunk.
+    overlap : int, optional (default=0)
+        Number of trailing paragraphs repeated at the start of the next chunk.
+
+    Returns
+    -------
+    list[Chunk]
+        Chunks and their offsets.
+    """
+    spans = []
+    for start, end in _spans(text, PARAGRAPH_END):
+        if end - start <= chunk_size:
+            spans.append((start, end))
+        else:
+            spans.extend(
+                (start + s, start + e) for s, e in _spans(text[start:end], SENTENCE_END)
+            )
+    return _pack(text, spans, chunk_size, overlap)
+
+def chunk_tokens(
+    text: str,
+    tokenizer,
+    chunk_size: int = 128,
+    overlap: int = 16
+) -> list[Chunk]:
+    """
+    Slides a window of `chunk_size` tokenizer tokens over the text.
+    Chunk boundaries always fall between tokens, so words are never cut in half.
+
+    Parameters
+    ----------
+    text : str
+        Text that will be chunked.
+    tokenizer : PreTrainedTokenizerBase
+        Fast tokenizer that supports `return_offsets_mapping`.
+    chunk_size : int, optional (default=128)
+        Number of tokens per chunk.
+    overlap : int, optional (default=16)
+        Number of tokens shared by consecutive chunks.
+
+    Returns
+    -------
+    list[Chunk]
+        Chunks and their offsets.
+    """
+    offsets = tokenizer(
+        text, add_special_tokens=False, return_offsets_mapping=True
+    )["offset_mapping"]
+    step = _step(chunk_size, overlap)
+
+    chunks = []
+    for i in range(0, max(len(offsets) - overlap, 1) if offsets else 0, step):
+        window = offsets[i:i + chunk_size]
+        start, end = window[0][0], window[-1][1]
+        chunks.append(Chunk(text[start:end], start, end))
+    return chunks
+
+STRATEGIES = {
+    "fixed": chunk_fixed,
+    "sentence": chunk_sentences,
+    "paragraph": chunk_paragraphs,
+    "tokens": chunk_tokens,
+}
+
+def get_chunker(
+    strategy: str = "fixed",
+    tokenizer=None,
+    **params
+) -> Callable[[str], list[Chunk]]:
+    """
+    Returns a chunking function with its parameters bound.
+
+    Parameters
+    ----------
+    strategy : str, optional (default="fixed")
+        One of `"fixed"`, `"sentence"`, `"paragraph"` or `"tokens"`.
+    tokenizer : PreTrainedTokenizerBase, str or None, optional (default=None)
+        Tokenizer (or the name of one) used by the `"tokens"` strategy.
+    **params
+        Keyword arguments of the chunking function, e.g. `chunk_size` and `overlap`.
+
+    Returns
+    -------
+    Callable[[str], list[Chunk]]
+        Function mapping a text to its chunks.
+
+    Raises
+    ------
+    ValueError
+        If the strategy is unknown, or `"tokens"` is used without a tokenizer.
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown chunking strategy {strategy!r}; expected one of {tuple(STRATEGIES)}.")
+
+    if strategy == "tokens":
+        if tokenizer is None:
+            raise ValueError("The 'tokens' chunking strategy needs a tokenizer.")
+        if isinstance(tokenizer, str):
+            from transformers import AutoTokenizer
+            tokenizer = AutoTokenizer.from_pretrained(tokenizer)
+        return lambda text: chunk_tokens(text, tokenizer, **params)
+
+    chunker = STRATEGIES[strategy]
+    return lambda text: chunker(text, **params)
+
+def _step(chunk_size: int, overlap: int) -> int:
+    """Distance between the starts of consecutive windows."""
+    if not 0 <= overlap < chunk_size:
+        raise ValueError(f"overlap must be in [0, chunk_size), got {overlap} for chunk_size={chunk_size}.")
+    return chunk_size - overlap
+
+def _spans(text: str, separator: re.Pattern) -> list[tuple[int, int]]:
+    """Offsets of the non-empty pieces of `text` between separator matches."""
+    spans = []
+    start = 0
+    for match in separator.finditer(text):
+        if match.start() > start:
+            spans.append((start, match.start()))
+        start = match.end()
+    if start < len(text):
+        spans.append((start, len(text)))
+    return spans
+
+def _pack(
+    text: str,
+    spans: list[tuple[int, int]],
+    chunk_size: int,
+    overlap: int
+) -> list[Chunk]:
+    """
+    Greedily packs consecutive spans into chunks of at most `chunk_size`
+    characters in a single pass. Only offsets are tracked while packing;
+    each chunk's text is sliced from `text` once.
+    """
+    units = []
+    for start, end in spans:
+        if end - start <= chunk_size:
+            units.append((start, end))
+        else:
+            units.extend(
+                (start + c.start, start + c.end)
+                for c in chunk_fixed(text[start:end], chunk_size)
+            )
+
+    chunks = []
+    i = 0
+    while i < len(units):
+        j = i + 1
+        while j < len(units) and units[j][1] - units[i][0] <= chunk_size:
+            j += 1
+        start, end = units[i][0], units[j - 1][1]
+        chunks.append(Chunk(text[start:end], start, end))
+        if j == len(units):
+            break
+        i = max(j - overlap, i + 1)
+    return chunks
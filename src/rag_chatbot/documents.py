@@ -1,30 +1,78 @@
 from pathlib import Path
+from typing import Callable, Iterable, Iterator, TypeVar
+from itertools import islice
+import hashlib
 from utils import iter_jsonl
+from rag_chatbot.chunking import DEFAULT_CHUNKING, Chunk, chunk_fixed, get_chunker
 
-def iter_jsonl_directory(directory: str) -> list[str]:
+def iter_jsonl_directory(directory: str, chunking: dict | None = None) -> list[str]:
     """
     Reads all jsonl files in a directory and processes them
     to be used for retrieval-augmented generation (RAG).
+    Files are read in sorted order so the output is deterministic.
 
     Parameters
     ----------
     path : str
         Path to directory where jsonl files are contained.
+    chunking : dict or None, optional (default=None)
+        Chunking strategy and its parameters (see `rag_chatbot.chunking.get_chunker`).
+        If None, the text is sliced every 80 characters.
 
     Returns
     -------
     list[str]
         Post-processed text read from jsonl files.
     """
-    directory = Path(directory)
-    
-    all_text = []
-    for file_path in directory.glob("*.jsonl"):
-        all_text.append(process_documents(file_path))
-    
-    return [text for subtext in all_text for text in subtext]
+    return list(iter_chunks(directory, chunking))
 
-def process_documents(path: str) -> list[str]:
+def iter_chunks(directory: str, chunking: dict | None = None) -> Iterator[str]:
+    """
+    Lazily reads all jsonl files in a directory and yields their chunks
+    one at a time, so the corpus never has to be held in memory.
+
+    Parameters
+    ----------
+    directory : str
+        Path to directory where jsonl files are contained.
+    chunking : dict or None, optional (default=None)
+        Chunking strategy and its parameters (see `rag_chatbot.chunking.get_chunker`).
+        If None, the text is sliced every 80 characters.
+
+    Yields
+    ------
+    str
+        Post-processed text read from jsonl files.
+    """
+    chunker = get_chunker(**(chunking or DEFAULT_CHUNKING))
+    for file_path in sorted(Path(directory).glob("*.jsonl")):
+        for doc in iter_jsonl(file_path):
+            for chunk in chunker(doc["text"]):
+                yield chunk.text
+
+T = TypeVar("T")
+
+def iter_batches(items: Iterable[T], batch_size: int) -> Iterator[list[T]]:
+    """
+    Groups an iterable into lists of at most `batch_size` items.
+
+    Parameters
+    ----------
+    items : Iterable
+        Items that will be grouped.
+    batch_size : int
+        Maximum number of items per batch.
+
+    Yields
+    ------
+    list
+        Consecutive batches of items; only the last one may be shorter.
+    """
+    items = iter(items)
+    while batch := list(islice(items, batch_size)):
+        yield batch
+
+def process_documents(path: str, chunking: dict | None = None) -> list[str]:
     """
     Iterates through the different jsonl files and breaks the text into chunks.
 
@@ -32,17 +80,56 @@ def process_documents(path: str) -> list[str]:
     ----------
     path : str
         Path to directory where jsonl files are contained.
+    chunking : dict or None, optional (default=None)
+        Chunking strategy and its parameters (see `rag_chatbot.chunking.get_chunker`).
+        If None, the text is sliced every 80 characters.
 
     Returns
     -------
     list[str]
         Post-processed text.
     """
+    chunker = get_chunker(**(chunking or DEFAULT_CHUNKING))
     DOCUMENTS = []
     for doc in iter_jsonl(path):
-        DOCUMENTS.extend(chunk_text(doc["text"]))
+        DOCUMENTS.extend(chunk.text for chunk in chunker(doc["text"]))
     return DOCUMENTS
 
+def iter_jsonl_records(
+    path: str, 
+    chunker: Callable[[str], list[Chunk]]
+) -> Iterator[tuple[str, str, list[Chunk]]]:
+    """
+    Iterates through a jsonl file and yields every record with its chunks
+    and a fingerprint of its content, used for incremental re-indexing.
+
+    Records are keyed by their `"id"` field. Records without an id, or whose
+    id was already seen in the file, are keyed by file name and line number.
+
+    Parameters
+    ----------
+    path : str
+        Path to jsonl file.
+    chunker : Callable[[str], list[Chunk]]
+        Chunking function (see `rag_chatbot.chunking.get_chunker`).
+
+    Yields
+    ------
+    tuple[str, str, list[Chunk]]
+        Record key, content fingerprint and chunks with their offsets in the record text.
+    """
+    seen = set()
+    for line_no, doc in enumerate(iter_jsonl(path)):
+        key = str(doc["id"]) if "id" in doc else None
+        if key is None or key in seen:
+            key = f"{Path(path).name}:{line_no}"
+        seen.add(key)
+        yield key, record_fingerprint(doc["text"]), chunker(doc["text"])
+
+def record_fingerprint(text: str) -> str:
+    """Returns the SHA-256 hash of a record's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
 def chunk_text(text: str, chunk_size: int = 80) -> list[str]:
     """
     Takes the input string, breaks it up by the `chunk_size`, 
@@ -58,4 +145,4 @@ def chunk_text(text: str, chunk_size: int = 80) -> list[str]:
     list[str]
         Text that has been split into chunks.
     """
-    return [text[i:i+chunk_size] for i in range(0, len(text), chunk_size)]
\ No newline at end of file
+    return [chunk.text for chunk in chunk_fixed(text, chunk_size)]
\ No newline at end of file
@@ -0,0 +1,46 @@
+import torch as tc
+from torch.ao.quantization import quantize_dynamic
+from sentence_transformers import SentenceTransformer
+
+ENCODER_PRECISIONS = ("fp32", "bf16", "int8")
+
+def load_encoder(
+    model: str,
+    precision: str = "fp32"
+) -> SentenceTransformer:
+    """
+    Loads a SentenceTransformer in reduced precision.
+
+    Parameters
+    ----------
+    model : str
+        Name of the embedding model.
+    precision : str, optional (default="fp32")
+        `"fp32"`, `"bf16"` (bfloat16 weights and activations, CPU only) or
+        `"int8"` (dynamic int8 quantization of the linear layers, CPU only).
+        Embeddings are always returned as float32. With `"int8"`, activations
+        are quantized per batch, so an embedding can shift slightly with the
+        other texts in its batch.
+
+    Returns
+    -------
+    SentenceTransformer
+        The loaded encoder.
+
+    Raises
+    ------
+    ValueError
+        If `precision` is not supported.
+    """
+    if precision not in ENCODER_PRECISIONS:
+        raise ValueError(
+            f"Unknown encoder precision {precision!r}; expected one of {ENCODER_PRECISIONS}."
+        )
+    if precision == "fp32":
+        return SentenceTransformer(model)
+
+    encoder = SentenceTransformer(model, device="cpu")
+    encoder.eval()
+    if precision == "bf16":
+        return encoder.to(tc.bfloat16)
+    return quantize_dynamic(encoder, {tc.nn.Linear}, dtype=tc.qint8)
@@ -0,0 +1,215 @@
+from pathlib import Path
+from typing import Callable
+import json
+import time
+import faiss
+import numpy as np
+
+def load_queries(path: str) -> list[dict]:
+    """
+    Loads a labelled query set from a JSONL file.
+
+    Each line holds a `"query"` and the `"relevant"` record IDs
+    (the `"id"` fields of the corpus records) that answer it.
+
+    Parameters
+    ----------
+    path : str
+        Path to the JSONL file.
+
+    Returns
+    -------
+    list[dict]
+        One dict per query with keys `"query"` and `"relevant"`.
+    """
+    with Path(path).open("r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def to_record_ids(
+    chunk_ids: list[int],
+    sources: dict[int, tuple[str, str, int, int]]
+) -> list[str]:
+    """
+    Maps ranked chunk vector IDs to the record IDs they came from,
+    keeping the first occurrence of each record.
+
+    Parameters
+    ----------
+    chunk_ids : list[int]
+        Ranked vector IDs.
+    sources : dict[int, tuple[str, str, int, int]]
+        Output of `DocsRetriever.chunk_sources`.
+
+    Returns
+    -------
+    list[str]
+        Ranked record IDs without duplicates.
+    """
+    records = []
+    for i in chunk_ids:
+        key = sources[i][1] if i in sources else None
+        if key is not None and key not in records:
+            records.append(key)
+    return records
+
+def recall_at_k(
+    ranked: list[str],
+    relevant: list[str],
+    k: int
+) -> float:
+    """Fraction of the relevant records found in the top k of a ranking."""
+    if not relevant:
+        return 0.0
+    return len(set(ranked[:k]) & set(relevant)) / len(relevant)
+
+def reciprocal_rank(
+    ranked: list[str],
+    relevant: list[str]
+) -> float:
+    """Inverse rank of the first relevant record in a ranking, or 0 if none is found."""
+    relevant = set(relevant)
+    for rank, record in enumerate(ranked, start=1):
+        if record in relevant:
+            return 1.0 / rank
+    return 0.0
+
+def ndcg_at_k(
+    ranked: list[str],
+    relevant: list[str],
+    k: int
+) -> float:
+    """Normalized discounted cumulative gain of the top k of a ranking, with binary relevance."""
+    relevant = set(relevant)
+    dcg = sum(
+        1.0 / np.log2(rank + 1)
+        for rank, record in enumerate(ranked[:k], start=1) if record in relevant
+    )
+    ideal = sum(1.0 / np.log2(rank + 1) for rank in range(1, min(len(relevant), k) + 1))
+    return dcg / ideal if ideal else 0.0
+
+def latency_percentiles(latencies: list[float]) -> dict[str, float]:
+    """Mean, p50, p95 and p99 of latencies given in milliseconds."""
+    return {
+        "mean_ms": float(np.mean(latencies)),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
+
+def index_memory(retriever) -> dict[str, int]:
+    """
+    Memory held by a retriever's index.
+
+    Parameters
+    ----------
+    retriever : DocsRetriever
+        Retriever to measure.
+
+    Returns
+    -------
+    dict[str, int]
+        Serialized FAISS index size, size of the float32 vectors kept for
+        rescoring (0 if rescoring is disabled) and number of chunks.
+    """
+    vectors = retriever.vectors
+    return {
+        "index_bytes": int(faiss.serialize_index(retriever.index).nbytes),
+        "vector_bytes": vectors.nbytes if vectors is not None else 0,
+        "n_chunks": int(retriever.index.ntotal),
+    }
+
+def evaluate_retriever(
+    retrieve_ids_batch: Callable[[list[str], int], list[list[int]]],
+    queries: list[dict],
+    sources: dict[int, tuple[str, str, int, int]],
+    ks: tuple[int, ...] = (1, 3, 5),
+    n_chunks: int = 20,
+    warmup: int = 5
+) -> dict[str, float]:
+    """
+    Computes record-level ranking quality and query latency of a retriever
+    over a labelled query set.
+
+    Queries are sent one at a time, as in a chat, so the latencies are
+    per query. The first `warmup` queries are run once beforehand and
+    are not timed.
+
+    Parameters
+    ----------
+    retrieve_ids_batch : Callable[[list[str], int], list[list[int]]]
+        Retrieval function, e.g. `DocsRetriever.retrieve_ids_batch`.
+    queries : list[dict]
+        Output of `load_queries`.
+    sources : dict[int, tuple[str, str, int, int]]
+        Output of `DocsRetriever.chunk_sources`.
+    ks : tuple[int, ...], optional (default=(1, 3, 5))
+        Cut-offs, in records.
+    n_chunks : int, optional (default=20)
+        Number of chunks retrieved per query before mapping them to records.
+    warmup : int, optional (default=5)
+        Number of queries run before timing.
+
+    Returns
+    -------
+    dict[str, float]
+        Mean `"recall@k"` and `"ndcg@k"` for every k, `"mrr"`,
+        and the latency percentiles of `latency_percentiles`.
+    """
+    for query in queries[:warmup]:
+        retrieve_ids_batch([query["query"]], n_chunks)
+
+    ranked = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        ids = retrieve_ids_batch([query["query"]], n_chunks)[0]
+        latencies.append((time.perf_counter() - start) * 1e3)
+        ranked.append(to_record_ids(ids, sources))
+
+    results = {}
+    for k in ks:
+        results[f"recall@{k}"] = float(np.mean([
+            recall_at_k(r, q["relevant"], k) for r, q in zip(ranked, queries)
+        ]))
+        results[f"ndcg@{k}"] = float(np.mean([
+            ndcg_at_k(r, q["relevant"], k) for r, q in zip(ranked, queries)
+        ]))
+    results["mrr"] = float(np.mean([
+        reciprocal_rank(r, q["relevant"]) for r, q in zip(ranked, queries)
+    ]))
+    results.update(latency_percentiles(latencies))
+    return results
+
+def pareto_front(
+    rows: list[dict],
+    quality: str,
+    costs: tuple[str, ...] = ("p95_ms", "memory_bytes")
+) -> list[bool]:
+    """
+    Marks the rows that no other row beats on quality and every cost.
+
+    A row is dominated if another row has at least its `quality` and at
+    most each of its `costs`, and is strictly better on one of them.
+
+    Parameters
+    ----------
+    rows : list[dict]
+        One dict per configuration holding `quality` and `costs`.
+    quality : str
+        Key to maximize, e.g. `"ndcg@5"`.
+    costs : tuple[str, ...], optional (default=("p95_ms", "memory_bytes"))
+        Keys to minimize.
+
+    Returns
+    -------
+    list[bool]
+        True for the rows on the Pareto front, in input order.
+    """
+    points = [(-row[quality], *(row[cost] for cost in costs)) for row in rows]
+    return [
+        not any(
+            all(o <= p for o, p in zip(other, point)) and other != point
+            for other in points
+        )
+        for point in points
+    ]
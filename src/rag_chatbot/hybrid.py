@@ -0,0 +1,249 @@
+import threading
+import time
+import numpy as np
+from rag_chatbot.bm25 import BM25Index, reciprocal_rank_fusion, weighted_fusion
+
+FUSIONS = ("rrf", "weighted")
+
+class HybridRetriever:
+    """
+    Combines the dense results of a `DocsRetriever` with BM25 keyword
+    search over the same chunks, so exact identifiers and rare terms are
+    found without raising k.
+
+    Both retrievers return `candidates` results, which are fused with
+    reciprocal rank fusion or a weighted sum of normalized scores. The BM25
+    index is rebuilt from a snapshot of `retriever.documents` at the end of
+    `refresh`, or on a background thread when a query finds that the dense
+    index changed otherwise. Queries keep using the previous BM25 index
+    until the new one is ready.
+
+    Attributes
+    ----------
+    retriever : DocsRetriever
+        Dense retriever whose chunks are also indexed for BM25.
+    fusion : str
+        `"rrf"` or `"weighted"`.
+    candidates : int
+        Number of results taken from each retriever before fusion.
+    rrf_k : int
+        Rank offset of reciprocal rank fusion.
+    weights : tuple[float, float]
+        Weights of the dense and BM25 results.
+    bm25 : BM25Index
+        Keyword index over `retriever.documents`.
+    timings : dict[str, float]
+        Milliseconds spent in the dense, BM25 and fusion stages by the last call.
+
+    Parameters
+    ----------
+    retriever : DocsRetriever
+        Dense retriever whose chunks are also indexed for BM25.
+    fusion : str, optional (default="rrf")
+        `"rrf"` (reciprocal rank fusion) or `"weighted"` (weighted sum of
+        min-max normalized scores).
+    candidates : int, optional (default=20)
+        Number of results taken from each retriever before fusion.
+    rrf_k : int, optional (default=60)
+        Rank offset of reciprocal rank fusion.
+    weights : tuple[float, float], optional (default=(1.0, 1.0))
+        Weights of the dense and BM25 results.
+    k1 : float, optional (default=1.5)
+        BM25 term frequency saturation.
+    b : float, optional (default=0.75)
+        BM25 document length normalization.
+
+    Raises
+    ------
+    ValueError
+        If `fusion` is not supported.
+    """
+    def __init__(
+        self,
+        retriever,
+        fusion: str = "rrf",
+        candidates: int = 20,
+        rrf_k: int = 60,
+        weights: tuple[float, float] = (1.0, 1.0),
+        k1: float = 1.5,
+        b: float = 0.75
+    ):
+        if fusion not in FUSIONS:
+            raise ValueError(f"Unknown fusion {fusion!r}; expected one of {FUSIONS}.")
+
+        self.retriever = retriever
+        self.fusion = fusion
+        self.candidates = candidates
+        self.rrf_k = rrf_k
+        self.weights = tuple(weights)
+        self.k1 = k1
+        self.b = b
+        self.timings = {}
+
+        self.bm25 = None
+        self._bm25_version = None
+        self._lock = threading.Lock()
+        self._rebuilding = False
+        self._refreshing = False
+        self._rebuild()
+
+    @property
+    def version(self) -> int:
+        """Version of the underlying dense index."""
+        return self.retriever.version
+
+    def _sync(self) -> BM25Index:
+        """
+        Returns the current BM25 index, starting a background rebuild if the
+        dense index changed since it was built (unless `refresh` is running,
+        which rebuilds it once at the end).
+        """
+        with self._lock:
+            start = (
+                self.retriever.version != self._bm25_version
+                and not self._rebuilding and not self._refreshing
+            )
+            if start:
+                self._rebuilding = True
+            bm25 = self.bm25
+        if start:
+            threading.Thread(target=self._rebuild_in_background, name="bm25", daemon=True).start()
+        return bm25
+
+    def _rebuild(self):
+        """Builds a BM25 index over a snapshot of the dense retriever's documents."""
+        with self.retriever._lock:
+            version = self.retriever.version
+            documents = dict(self.retriever.documents)
+        bm25 = BM25Index(documents, self.k1, self.b)
+        with self._lock:
+            if self._bm25_version is None or version >= self._bm25_version:
+                self.bm25 = bm25
+                self._bm25_version = version
+
+    def _rebuild_in_background(self):
+        try:
+            self._rebuild()
+        finally:
+            with self._lock:
+                self._rebuilding = False
+
+    def retrieve(
+        self,
+        query: str,
+        k: int = 1
+    ) -> list[str]:
+        """Same as `DocsRetriever.retrieve`, with hybrid ranking."""
+        return self.get_documents(self.retrieve_ids(query, k))
+
+    def retrieve_batch(
+        self,
+        queries: list[str],
+        k: int = 1
+    ) -> list[list[str]]:
+        """Same as `DocsRetriever.retrieve_batch`, with hybrid ranking."""
+        return [self.get_documents(ids) for ids in self.retrieve_ids_batch(queries, k)]
+
+    def retrieve_ids(
+        self,
+        query: str,
+        k: int = 1,
+        query_emb: np.ndarray | None = None
+    ) -> list[int]:
+        """Same as `DocsRetriever.retrieve_ids`, with hybrid ranking."""
+        query_embs = None if query_emb is None else query_emb[None, :]
+        return self.retrieve_ids_batch([query], k, query_embs)[0]
+
+    def retrieve_ids_batch(
+        self,
+        queries: list[str],
+        k: int = 1,
+        query_embs: np.ndarray | None = None
+    ) -> list[list[int]]:
+        """
+        Retrieves the top k chunks for several queries by fusing dense and
+        BM25 results. Per-stage latencies are stored in `timings`.
+
+        Parameters
+        ----------
+        queries : list[str]
+            Natural language queries.
+        k : int, optional (default=1)
+            Number of chunks to return per query. Must be >= 1.
+        query_embs : np.ndarray or None, optional (default=None)
+            Embeddings of `queries` from `embed_queries`.
+            If None, the dense retriever encodes the queries.
+
+        Returns
+        -------
+        list[list[int]]
+            Vector IDs for each query, in input order, best match first.
+        """
+        if not queries:
+            return []
+        bm25 = self._sync()
+        n_candidates = max(k, self.candidates)
+
+        start = time.perf_counter()
+        if self.fusion == "rrf":
+            dense = [
+                (ids, None)
+                for ids in self.retriever.retrieve_ids_batch(queries, n_candidates, query_embs)
+            ]
+        else:
+            distances, idcs = self.retriever.search(queries, n_candidates, query_embs)
+            dense = [
+                (row[row != -1].tolist(), (-dist[row != -1]).tolist())
+                for dist, row in zip(distances, idcs)
+            ]
+        dense_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sparse = [bm25.search(query, n_candidates) for query in queries]
+        sparse_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        results = []
+        for (dense_ids, dense_scores), (sparse_ids, sparse_scores) in zip(dense, sparse):
+            if self.fusion == "rrf":
+                fused = reciprocal_rank_fusion(
+                    [dense_ids, sparse_ids.tolist()], self.rrf_k, self.weights
+                )
+            else:
+                fused = weighted_fusion(
+                    [(dense_ids, dense_scores), (sparse_ids, sparse_scores)], self.weights
+                )
+            results.append([int(i) for i, _ in fused[:k]])
+        fusion_s = time.perf_counter() - start
+
+        self.timings = {
+            "dense_ms": dense_s * 1e3,
+            "bm25_ms": sparse_s * 1e3,
+            "fusion_ms": fusion_s * 1e3,
+        }
+        return results
+
+    def get_documents(self, ids: list[int]) -> list[str]:
+        """Returns the text of the given vector IDs."""
+        return self.retriever.get_documents(ids)
+
+    def embed_queries(self, queries: list[str]) -> np.ndarray:
+        """Encodes queries with the dense retriever's model."""
+        return self.retriever.embed_queries(queries)
+
+    def chunk_sources(self) -> dict[int, tuple[str, str, int, int]]:
+        """Maps every vector ID to where its chunk came from."""
+        return self.retriever.chunk_sources()
+
+    def refresh(self) -> bool:
+        """Refreshes the dense index, then rebuilds the BM25 index once if it changed."""
+        with self._lock:
+            self._refreshing = True
+        try:
+            changed = self.retriever.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+        if self.retriever.version != self._bm25_version:
+            self._rebuild()
+        return changed
\ No newline at end of file
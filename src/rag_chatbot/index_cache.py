@@ -0,0 +1,146 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+import faiss
+from rag_chatbot.vector_store import VectorStore
+
+MANIFEST_FNAME = "manifest.json"
+INDEX_FNAME = "index.faiss"
+DOCUMENTS_FNAME = "documents.json"
+
+def file_hash(path: str, block_size: int = 1 << 20) -> str:
+    """
+    Computes the SHA-256 hash of a file's contents.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file that will be hashed.
+    block_size : int, optional (default=1 << 20)
+        Number of bytes read at a time.
+
+    Returns
+    -------
+    str
+        Hexadecimal digest of the file contents.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def directory_hashes(directory: str) -> dict[str, str]:
+    """
+    Hashes every jsonl file in a directory.
+
+    Parameters
+    ----------
+    directory : str
+        Path to directory where jsonl files are contained.
+
+    Returns
+    -------
+    dict[str, str]
+        Mapping from file name to the SHA-256 hash of its contents.
+    """
+    directory = Path(directory)
+    return {
+        file_path.name: file_hash(file_path)
+        for file_path in sorted(directory.glob("*.jsonl"))
+    }
+
+def load_cache(
+    cache_dir: str,
+    settings: dict,
+    mmap: bool = True
+) -> tuple[faiss.Index, dict[int, str], dict] | None:
+    """
+    Loads a cached index, its documents and its manifest if the cache was
+    built with the same settings (embedding model, chunking and index parameters).
+    The per-file state in the manifest is returned as is so the caller can
+    work out which files changed since the cache was saved.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory where the index cache is saved.
+    settings : dict
+        Everything the vectors depend on; stored under `"settings"` in the manifest.
+    mmap : bool, optional (default=True)
+        If True, memory-maps the index instead of reading it into memory.
+
+    Returns
+    -------
+    tuple[faiss.Index, dict[int, str], dict] or None
+        The cached index, the chunk texts keyed by vector ID and the manifest,
+        or None if the cache is missing or was built with other settings.
+    """
+    cache_dir = Path(cache_dir)
+    manifest_path = cache_dir / MANIFEST_FNAME
+    index_path = cache_dir / INDEX_FNAME
+    documents_path = cache_dir / DOCUMENTS_FNAME
+
+    if not (manifest_path.exists() and index_path.exists() and documents_path.exists()):
+        return None
+
+    with manifest_path.open("r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("settings") != settings:
+        return None
+
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+    index = faiss.read_index(str(index_path), flags)
+
+    with documents_path.open("r", encoding="utf-8") as f:
+        documents = {int(i): text for i, text in json.load(f).items()}
+    return index, documents, manifest
+
+def save_cache(
+    cache_dir: str,
+    manifest: dict,
+    index: faiss.Index,
+    documents: dict[int, str],
+    vectors: VectorStore | None = None
+):
+    """
+    Saves the index, the chunk texts and the manifest to the cache directory.
+    Each file is written to a temporary path first and then moved into place,
+    with the manifest written last so a partial save is never treated as valid.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Directory where the index cache is saved.
+    manifest : dict
+        Build settings and per-file state of the corpus.
+    index : faiss.Index
+        Index that will be saved.
+    documents : dict[int, str]
+        Chunk texts keyed by vector ID.
+    vectors : VectorStore or None, optional (default=None)
+        Full-precision embeddings kept for rescoring, if any.
+    """
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+
+    manifest_path = cache_dir / MANIFEST_FNAME
+    if manifest_path.exists():
+        manifest_path.unlink()
+
+    tmp_index = cache_dir / (INDEX_FNAME + ".tmp")
+    faiss.write_index(index, str(tmp_index))
+    os.replace(tmp_index, cache_dir / INDEX_FNAME)
+    if vectors is not None:
+        vectors.save(cache_dir)
+
+    _write_json(cache_dir / DOCUMENTS_FNAME, documents)
+    _write_json(manifest_path, manifest)
+
+def _write_json(path: Path, data):
+    """Atomically writes `data` as JSON to `path`."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with tmp_path.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
@@ -0,0 +1,272 @@
+import time
+import faiss
+import numpy as np
+from rag_chatbot.vector_store import VectorStore
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw", "sq")
+SEARCH_PARAMS = ("nprobe", "ef_search")
+
+def factory_string(
+    index_type: str = "flat",
+    nlist: int = 1024,
+    pq_m: int = 16,
+    pq_nbits: int = 8,
+    hnsw_m: int = 32,
+    sq_type: str = "8",
+    **kwargs
+) -> str:
+    """
+    Translates index parameters into a FAISS index factory string.
+
+    Parameters
+    ----------
+    index_type : str, optional (default="flat")
+        One of `"flat"` (exact), `"ivf_flat"`, `"ivf_pq"`, `"hnsw"`
+        or `"sq"` (scalar-quantized).
+    nlist : int, optional (default=1024)
+        Number of inverted lists (coarse centroids) for IVF indexes.
+    pq_m : int, optional (default=16)
+        Number of product-quantizer sub-vectors. Must divide the embedding dimension.
+    pq_nbits : int, optional (default=8)
+        Number of bits per sub-vector code.
+    hnsw_m : int, optional (default=32)
+        Number of neighbours per node in the HNSW graph.
+    sq_type : str, optional (default="8")
+        Scalar quantizer type: `"8"`, `"6"`, `"4"` bits per dimension or `"fp16"`.
+    **kwargs
+        Search and training parameters, ignored here.
+
+    Returns
+    -------
+    str
+        Factory string understood by `faiss.index_factory`.
+
+    Raises
+    ------
+    ValueError
+        If `index_type` is not supported.
+    """
+    if index_type == "flat":
+        return "Flat"
+    if index_type == "ivf_flat":
+        return f"IVF{nlist},Flat"
+    if index_type == "ivf_pq":
+        return f"IVF{nlist},PQ{pq_m}x{pq_nbits}"
+    if index_type == "hnsw":
+        return f"HNSW{hnsw_m}"
+    if index_type == "sq":
+        return f"SQ{sq_type}"
+    raise ValueError(f"Unknown index_type {index_type!r}; expected one of {INDEX_TYPES}.")
+
+def build_index(
+    dim: int,
+    index_type: str = "flat",
+    ef_construction: int = 200,
+    **params
+) -> faiss.Index:
+    """
+    Creates an empty index using squared L2 distance that stores vector IDs.
+
+    IVF indexes keep the IDs in their inverted lists themselves. The other
+    types are wrapped in `faiss.IndexIDMap`. Wrapping an IVF index would
+    break `remove_ids`, because the inner index keeps its old sequential
+    labels while the ID map is compacted.
+
+    Parameters
+    ----------
+    dim : int
+        Embedding dimension.
+    index_type : str, optional (default="flat")
+        Index type, see `factory_string`.
+    ef_construction : int, optional (default=200)
+        Size of the candidate list used when building an HNSW graph.
+    **params
+        Remaining index parameters, see `factory_string` and `set_search_params`.
+
+    Returns
+    -------
+    faiss.Index
+        Empty IVF index, or `faiss.IndexIDMap` wrapping any other index type.
+        IVF and PQ indexes still have to be trained (see `train_index`).
+    """
+    index = faiss.index_factory(dim, factory_string(index_type, **params))
+    if index_type == "hnsw":
+        index.hnsw.efConstruction = ef_construction
+    if faiss.try_extract_index_ivf(index) is None:
+        index = faiss.IndexIDMap(index)
+    set_search_params(index, **params)
+    return index
+
+def train_index(
+    index: faiss.Index,
+    embeddings: np.ndarray,
+    train_size: int = 50_000,
+    seed: int = 42,
+    **kwargs
+):
+    """
+    Trains an index on a random sample of the embeddings.
+    Does nothing if the index does not need training.
+
+    Parameters
+    ----------
+    index : faiss.Index
+        Index that will be trained.
+    embeddings : np.ndarray
+        Embeddings the training sample is drawn from.
+    train_size : int, optional (default=50_000)
+        Maximum number of embeddings used for training.
+    seed : int, optional (default=42)
+        Seed for drawing the training sample.
+    **kwargs
+        Build and search parameters, ignored here.
+
+    Raises
+    ------
+    ValueError
+        If there are fewer embeddings than IVF centroids.
+    """
+    if index.is_trained:
+        return
+
+    ivf = faiss.try_extract_index_ivf(faiss.downcast_index(_inner(index)))
+    if ivf is not None and len(embeddings) < ivf.nlist:
+        raise ValueError(
+            f"Training an index with nlist={ivf.nlist} needs at least {ivf.nlist} "
+            f"embeddings, got {len(embeddings)}. Lower nlist or use index_type='flat'."
+        )
+
+    if len(embeddings) > train_size:
+        rng = np.random.default_rng(seed)
+        embeddings = embeddings[rng.choice(len(embeddings), train_size, replace=False)]
+    index.train(np.ascontiguousarray(embeddings, dtype=np.float32))
+
+def set_search_params(
+    index: faiss.Index,
+    nprobe: int | None = None,
+    ef_search: int | None = None,
+    **kwargs
+):
+    """
+    Sets the search-time accuracy/speed knobs of an index.
+
+    Parameters
+    ----------
+    index : faiss.Index
+        Index whose search parameters are set. May be wrapped in `faiss.IndexIDMap`.
+    nprobe : int or None, optional (default=None)
+        Number of inverted lists visited per query by IVF indexes.
+        Higher -> better recall, slower search.
+    ef_search : int or None, optional (default=None)
+        Size of the candidate list explored per query by HNSW indexes.
+        Higher -> better recall, slower search.
+    **kwargs
+        Build and training parameters, ignored here.
+    """
+    inner = faiss.downcast_index(_inner(index))
+    ivf = faiss.try_extract_index_ivf(inner)
+    if ivf is not None and nprobe is not None:
+        ivf.nprobe = nprobe
+    if hasattr(inner, "hnsw") and ef_search is not None:
+        inner.hnsw.efSearch = ef_search
+
+def supports_removal(index: faiss.Index) -> bool:
+    """Returns False for index types that cannot remove vectors (HNSW)."""
+    return not hasattr(faiss.downcast_index(_inner(index)), "hnsw")
+
+def wraps_ivf(index: faiss.Index) -> bool:
+    """
+    Returns True for an IVF index wrapped in `faiss.IndexIDMap`, as saved by
+    earlier versions. Removing vectors from one corrupts its ID map.
+    """
+    if not isinstance(index, faiss.IndexIDMap):
+        return False
+    return faiss.try_extract_index_ivf(faiss.downcast_index(index.index)) is not None
+
+def _inner(index: faiss.Index) -> faiss.Index:
+    """Unwraps a `faiss.IndexIDMap`."""
+    return index.index if isinstance(index, faiss.IndexIDMap) else index
+
+def recall_report(
+    embeddings: np.ndarray,
+    queries: np.ndarray,
+    configs: list[dict],
+    k: int = 10
+) -> list[dict]:
+    """
+    Compares approximate index configurations against the exact flat index.
+
+    Recall@k is the fraction of the exact top-k neighbours that each
+    configuration also returns, averaged over the queries. Configurations
+    with `"rescore": r` re-rank `r * k` candidates by exact distance, as
+    `DocsRetriever` does.
+
+    Parameters
+    ----------
+    embeddings : np.ndarray
+        Corpus embeddings of shape (n, dim).
+    queries : np.ndarray
+        Query embeddings of shape (n_queries, dim).
+    configs : list[dict]
+        Index parameters passed to `build_index`, `train_index` and `set_search_params`.
+    k : int, optional (default=10)
+        Number of neighbours compared.
+
+    Returns
+    -------
+    list[dict]
+        One row per configuration (flat baseline first) with its factory string,
+        recall@k, mean and p95 query latency in milliseconds, build time in
+        seconds, serialized index size in bytes and index bytes per vector.
+        The float32 vectors kept for rescoring are not counted, since they
+        are memory-mapped from disk.
+    """
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    queries = np.ascontiguousarray(queries, dtype=np.float32)
+    ids = np.arange(len(embeddings), dtype=np.int64)
+
+    rows = []
+    truth = None
+    for params in [{"index_type": "flat"}, *configs]:
+        start = time.perf_counter()
+        index = build_index(embeddings.shape[1], **params)
+        train_index(index, embeddings, **params)
+        index.add_with_ids(embeddings, ids)
+        build_s = time.perf_counter() - start
+
+        rescore = params.get("rescore")
+        if rescore:
+            store = VectorStore(embeddings.shape[1])
+            store.add(ids, embeddings)
+
+        latencies = []
+        found = []
+        for query in queries:
+            start = time.perf_counter()
+            if rescore:
+                _, idcs = index.search(query[None, :], int(rescore * k))
+                _, idcs = store.rescore(query[None, :], idcs, k)
+            else:
+                _, idcs = index.search(query[None, :], k)
+            latencies.append((time.perf_counter() - start) * 1e3)
+            found.append(idcs[0])
+        found = np.stack(found)
+
+        if truth is None:
+            truth = found
+        recall = np.mean([
+            len(set(f) & set(t)) / k for f, t in zip(found, truth)
+        ])
+
+        index_bytes = int(faiss.serialize_index(index).nbytes)
+        rows.append({
+            **params,
+            "factory": factory_string(**params),
+            "recall_at_k": float(recall),
+            "mean_ms": float(np.mean(latencies)),
+            "p95_ms": float(np.percentile(latencies, 95)),
+            "build_s": build_s,
+            "index_bytes": index_bytes,
+            "bytes_per_vector": index_bytes / len(embeddings),
+        })
+    return rows
@@ -0,0 +1,107 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable, Iterator
+import multiprocessing as mp
+import os
+import numpy as np
+
+_worker_model = None
+
+def _init_worker(model: str, threads_per_worker: int, precision: str):
+    """Loads one SentenceTransformer per worker process."""
+    global _worker_model
+    import torch as tc
+    from rag_chatbot.encoder import load_encoder
+
+    tc.set_num_threads(threads_per_worker)
+    _worker_model = load_encoder(model, precision)
+
+def _encode(texts: list[str]) -> np.ndarray:
+    """Encodes one batch of text inside a worker process."""
+    return _worker_model.encode(texts, convert_to_numpy=True)
+
+class ParallelEncoder:
+    """
+    Encodes batches of text on a pool of worker processes, each holding its
+    own copy of the embedding model.
+
+    Batches are handed out round-robin and their embeddings are yielded back
+    in submission order, so an index built from them gets the same vectors
+    under the same IDs as a serial build. At most `max_pending` batches are
+    in flight at a time to keep memory bounded.
+
+    Attributes
+    ----------
+    n_workers : int
+        Number of worker processes.
+    max_pending : int
+        Maximum number of batches submitted but not yet yielded.
+
+    Parameters
+    ----------
+    model : str
+        Name of the embedding model loaded by each worker.
+    n_workers : int or None, optional (default=None)
+        Number of worker processes. If None, uses every available core.
+    threads_per_worker : int, optional (default=1)
+        Number of PyTorch threads per worker.
+    max_pending : int or None, optional (default=None)
+        Maximum number of batches in flight. If None, twice the number of workers.
+    precision : str, optional (default="fp32")
+        Precision of the workers' encoders (see `rag_chatbot.encoder`).
+    """
+    def __init__(
+        self,
+        model: str,
+        n_workers: int | None = None,
+        threads_per_worker: int = 1,
+        max_pending: int | None = None,
+        precision: str = "fp32"
+    ):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or 2 * self.n_workers
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model, threads_per_worker, precision),
+        )
+
+    def encode_batches(
+        self,
+        batches: Iterable[tuple[Any, list[str]]]
+    ) -> Iterator[tuple[Any, np.ndarray]]:
+        """
+        Encodes batches of text in parallel.
+
+        Parameters
+        ----------
+        batches : Iterable[tuple[Any, list[str]]]
+            Pairs of (payload, texts). The payload (e.g. the vector IDs of
+            the texts) is passed through untouched.
+
+        Yields
+        ------
+        tuple[Any, np.ndarray]
+            Each payload together with the embeddings of its texts, in input order.
+        """
+        pending = deque()
+        for payload, texts in batches:
+            pending.append((payload, self._pool.submit(_encode, texts)))
+            if len(pending) >= self.max_pending:
+                payload, future = pending.popleft()
+                yield payload, future.result()
+
+        while pending:
+            payload, future = pending.popleft()
+            yield payload, future.result()
+
+    def close(self):
+        """Shuts down the worker processes."""
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,3 +1,5 @@
+from rag_chatbot.cache import LRUCache
+
 SYSTEM_PROMPT = "You are a helpful assistant."
 
 def build_prompt(retrieved_docs, user_question):
@@ -16,21 +18,122 @@ def build_prompt_with_history(
     retrieved_docs, 
     user_message: str
 )-> str:
-    """Builds the output prompt template for the chatbot with previous history."""
+    """
+    Builds the output prompt template for the chatbot with previous history.
+    The history comes before the retrieved context, so consecutive turns of
+    a conversation share a prompt prefix (see `LocalLM.prefix_cache`).
+    """
     history_text = "\n".join(history_turns)
     context = "\n".join(retrieved_docs)
     if history_text.strip():
         return (
             f"System prompt: {SYSTEM_PROMPT}\n\n"
+            f"{history_text}\n\n"
             f"Use ONLY the information below to answer.\n"
             f"Context:\n{context}\n\n"
-            f"{history_text}\n"
             f"User: {user_message}\n"
             f"Assistant:"
         )
     else:
         return build_prompt(retrieved_docs, user_message)
 
+class TokenCounter:
+    """
+    Counts the tokens of a text with a tokenizer, caching the count of every
+    text it has seen so history turns and document chunks are tokenized once.
+
+    Attributes
+    ----------
+    tokenizer : PreTrainedTokenizerBase or None
+        Tokenizer used for counting. If None, tokens are estimated from the
+        number of characters.
+    chars_per_token : float
+        Characters per token assumed when there is no tokenizer.
+    cache : LRUCache
+        Token counts keyed by text.
+
+    Parameters
+    ----------
+    tokenizer : PreTrainedTokenizerBase or None, optional (default=None)
+        Tokenizer used for counting.
+    max_size : int, optional (default=8192)
+        Maximum number of cached counts.
+    chars_per_token : float, optional (default=4.0)
+        Characters per token assumed when there is no tokenizer.
+    """
+    def __init__(
+        self,
+        tokenizer=None,
+        max_size: int = 8192,
+        chars_per_token: float = 4.0
+    ):
+        self.tokenizer = tokenizer
+        self.chars_per_token = chars_per_token
+        self.cache = LRUCache(max_size)
+
+    def __call__(self, text: str) -> int:
+        """Returns the number of tokens in `text`."""
+        n_tokens = self.cache.get(text)
+        if n_tokens is None:
+            if self.tokenizer is not None:
+                n_tokens = len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+            else:
+                n_tokens = -(-len(text) // self.chars_per_token)
+            n_tokens = int(n_tokens)
+            self.cache.put(text, n_tokens)
+        return n_tokens
+
+def build_budgeted_prompt(
+    history_turns: list[str],
+    retrieved_docs: list[str],
+    user_message: str,
+    count_tokens: TokenCounter,
+    max_tokens: int
+) -> str:
+    """
+    Builds the same prompt as `build_prompt_with_history`, keeping it within
+    `max_tokens` tokens. Parts are added in priority order: the system prompt
+    and question are always kept, then documents in retrieval rank order
+    (skipping any that no longer fit), then history turns from the most
+    recent backwards until the next one does not fit.
+
+    Parameters
+    ----------
+    history_turns : list[str]
+        Previous turns, oldest first.
+    retrieved_docs : list[str]
+        Retrieved documents, best match first.
+    user_message : str
+        The question asked by the user.
+    count_tokens : TokenCounter
+        Counts the tokens of a text.
+    max_tokens : int
+        Token budget of the prompt.
+
+    Returns
+    -------
+    str
+        Prompt text.
+    """
+    used = count_tokens(build_prompt([], user_message))
+
+    docs = []
+    for doc in retrieved_docs:
+        n_tokens = count_tokens(doc) + 1
+        if used + n_tokens <= max_tokens:
+            docs.append(doc)
+            used += n_tokens
+
+    turns = []
+    for turn in reversed(history_turns):
+        n_tokens = count_tokens(turn) + (1 if turns else 2)
+        if used + n_tokens > max_tokens:
+            break
+        turns.append(turn)
+        used += n_tokens
+
+    return build_prompt_with_history(turns[::-1], docs, user_message)
+
 def extract_assistant_reply(text: str) -> str:
     """Extracts the chatbot's reply."""
     if "Assistant" in text:
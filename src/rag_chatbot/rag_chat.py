@@ -1,11 +1,25 @@
-from basic_chatbot.model_local import LocalLM
-from basic_chatbot.model_openai import OpenAIChat
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Iterator
+import asyncio
+import contextvars
+import re
+import threading
+import time
+import weakref
+import numpy as np
 from basic_chatbot.memory import ChatMemory
-from basic_chatbot.gradio_ui import chat_interface
-from basic_chatbot.logging import log_output
-from rag_chatbot.prompt_utils import build_prompt_with_history, extract_assistant_reply
-from rag_chatbot.documents import iter_jsonl_directory
-from rag_chatbot.retriever import DocsRetriever
+from basic_chatbot.store import open_store
+from basic_chatbot.logging import LogWriter, log_output
+from basic_chatbot.metrics import METRICS
+from basic_chatbot.scheduler import GenerationScheduler
+from basic_chatbot.streaming import StreamStats
+from rag_chatbot.prompt_utils import (
+    TokenCounter, build_budgeted_prompt, 
+    build_prompt_with_history, extract_assistant_reply
+)
+from rag_chatbot.cache import QueryCache, SemanticCache
 
 def MyAssistant(
     model: str, 
@@ -14,6 +28,28 @@ def MyAssistant(
     state_dir: str, 
     log_dir: str, 
     api_key: str | None = None,
+    api_client: dict | None = None,
+    cache_dir: str | None = None,
+    chunking: dict | None = None,
+    index_params: dict | None = None,
+    query_cache: dict | None = None,
+    query_batching: dict | None = None,
+    semantic_cache: dict | None = None,
+    max_concurrency: int = 8,
+    generation_batching: dict | None = None,
+    prefix_cache_mb: float | None = None,
+    prompt_budget: int | None = None,
+    hybrid: dict | None = None,
+    rerank: dict | None = None,
+    top_k: int = 1,
+    precision: str = "fp32",
+    num_threads: int | None = None,
+    encoder_precision: str = "fp32",
+    background_load: bool = True,
+    state_store: dict | None = None,
+    log_writer: dict | None = None,
+    metrics: dict | None = None,
+    embedding_model: str = "all-MiniLM-L6-v2",
     share: bool = False, 
     inline: bool = False
 ):
@@ -35,34 +71,151 @@ def MyAssistant(
         Directory where the conversation log is saved.
     api_key : str or None, optional (default=None)
         API key for OpenAI model.
+    api_client : dict or None, optional (default=None)
+        Timeout, retry, concurrency and hedging arguments of
+        `basic_chatbot.model_openai.OpenAIChat`, e.g. `{"timeout": 20, "hedge_after": 2}`.
+    cache_dir : str or None, optional (default=None)
+        Directory where the document index cache is saved.
+        If None, the index is rebuilt on every start.
+    chunking : dict or None, optional (default=None)
+        Chunking strategy and its parameters (see `rag_chatbot.chunking`).
+        If None, documents are sliced every 80 characters.
+    index_params : dict or None, optional (default=None)
+        Index type plus build, training and search parameters
+        (see `rag_chatbot.index_factory`). If None, an exact flat index is used.
+    query_cache : dict or None, optional (default=None)
+        Arguments of `rag_chatbot.cache.QueryCache`, e.g. `{"max_size": 1024, "ttl": 3600}`.
+        If None, query embeddings and results are not cached.
+    query_batching : dict or None, optional (default=None)
+        Arguments of `rag_chatbot.batching.QueryBatcher`, e.g. `{"max_batch_size": 32, "max_wait_ms": 2}`.
+        If None, each question is retrieved on its own.
+    semantic_cache : dict or None, optional (default=None)
+        Arguments of `rag_chatbot.cache.SemanticCache`, e.g. `{"threshold": 0.95}`.
+        If None, replies are not cached.
+    max_concurrency : int, optional (default=8)
+        Maximum number of requests handled at the same time.
+    generation_batching : dict or None, optional (default=None)
+        Arguments of `basic_chatbot.scheduler.GenerationScheduler`,
+        e.g. `{"max_batch_size": 8, "max_wait_ms": 10}`. Only used by local models.
+        Streamed replies are not batched, so with a local model the UI then
+        answers through `arespond` without streaming.
+        If None, each prompt is generated on its own.
+    prefix_cache_mb : float or None, optional (default=None)
+        Memory budget in MiB for reusing the key/values of each conversation's
+        prompt prefix across turns (local models only).
+    prompt_budget : int or None, optional (default=None)
+        Maximum number of prompt tokens. If None, local models use their
+        context window minus the reply length and API models are not budgeted.
+    hybrid : dict or None, optional (default=None)
+        Arguments of `rag_chatbot.hybrid.HybridRetriever`, e.g. `{"fusion": "rrf"}`.
+        If None, retrieval is dense-only.
+    rerank : dict or None, optional (default=None)
+        Arguments of `rag_chatbot.reranker.Reranker`, e.g. `{"candidates": 20, "budget_ms": 100}`.
+        If None, retrieved chunks are not reranked.
+    top_k : int, optional (default=1)
+        Number of chunks put into the prompt.
+    precision : str, optional (default="fp32")
+        Precision of a local model: `"fp32"`, `"bf16"` or `"int8"`.
+    num_threads : int or None, optional (default=None)
+        Number of threads PyTorch uses for CPU inference. If None, PyTorch's default is kept.
+    encoder_precision : str, optional (default="fp32")
+        Precision of the embedding model: `"fp32"`, `"bf16"` or `"int8"`.
+    background_load : bool, optional (default=True)
+        If True, the UI comes up at once while the models and the document
+        index load in the background; requests wait until they are ready.
+    state_store : dict or None, optional (default=None)
+        Backend and arguments of the append-only conversation store,
+        e.g. `{"backend": "sqlite"}`. If None, JSON files are rewritten on every turn.
+    log_writer : dict or None, optional (default=None)
+        Arguments of `basic_chatbot.logging.LogWriter`, e.g. `{"flush_interval": 1.0}`.
+        If None, each log record is written before the reply is returned.
+    metrics : dict or None, optional (default=None)
+        Arguments of `basic_chatbot.metrics.Metrics.configure`, e.g. `{"port": 9100}`.
+        If None, latencies are only kept in memory.
+    embedding_model : str, optional (default="all-MiniLM-L6-v2")
+        Name or path of the sentence-transformers model encoding documents and queries.
     share : bool, optional (default=False)
         Creates a shareable link if set to True.
     inline : bool, optional (default=False)
         Opens Gradio UI inline if set to True.
         Otherwise, opens a new window for UI.
     """
-    bot = RAGChat(model, n_turns, docs_dir, state_dir, log_dir, api_key=api_key)
-    demo = chat_interface(bot)
+    bot = RAGChat(
+        model, n_turns, docs_dir, state_dir, log_dir, 
+        api_key=api_key, api_client=api_client, cache_dir=cache_dir, 
+        chunking=chunking, index_params=index_params, 
+        query_cache=query_cache, query_batching=query_batching, semantic_cache=semantic_cache,
+        max_concurrency=max_concurrency, generation_batching=generation_batching,
+        prefix_cache_mb=prefix_cache_mb, prompt_budget=prompt_budget,
+        hybrid=hybrid, rerank=rerank, top_k=top_k,
+        precision=precision, num_threads=num_threads,
+        encoder_precision=encoder_precision, background_load=background_load,
+        state_store=state_store, log_writer=log_writer, metrics=metrics,
+        embedding_model=embedding_model
+    )
+    from basic_chatbot.gradio_ui import chat_interface
+
+    demo = chat_interface(bot, stream=not (generation_batching and bot.is_local))
+    demo.queue(default_concurrency_limit=max_concurrency)
     demo.launch(share=share, inline=inline)
 
 class RAGChat():
     """
     Generates an assistant that employs RAG using either a local model or an API model.
+
+    The model backend (torch/transformers or openai) and the retrieval stack
+    (faiss/sentence_transformers) are only imported when they are loaded.
+    With `background_load`, loading and a warm-up pass run on a background
+    thread; `health` reports progress and requests wait in `wait_ready`.
     
     Attributes
     ----------
-    lm : LocalLM | OpenAIChat
-        Model that will be used for the chatbot.
-    retriever : Callable
+    lm : LocalLM | OpenAIChat or None
+        Model that will be used for the chatbot. None until loaded.
+    is_local : bool
+        True if `lm` is a local model.
+    retriever : DocsRetriever, HybridRetriever, Reranker or None
         Used to retrieve similar information from documents as the user input.
+        None until loaded.
+    query_batcher : QueryBatcher or None
+        Serves the retrievals of concurrent requests with shared batches.
+    top_k : int
+        Number of chunks put into the prompt.
+    semantic_cache : SemanticCache or None
+        Cache of replies served for semantically equivalent questions.
+    scheduler : GenerationScheduler or None
+        Batches concurrent prompts into shared `generate` calls.
+    token_counter : TokenCounter
+        Counts prompt tokens with the model's tokenizer, caching the count
+        of every history turn and document.
+    prompt_budget : int or None
+        Maximum number of prompt tokens. If None, prompts are not budgeted.
     memory : ChatMemory
-        A class used to keep track of the chatbot's memory.
+        A class used to keep track of the chatbot's memory
+        when no session ID is given.
+    sessions : dict[str, ChatMemory]
+        Memory of each conversation, keyed by session ID.
+    store : JSONLStore or SQLiteStore or None
+        Append-only store of every conversation's turns. If None, each
+        conversation is saved to its own JSON file.
+    max_concurrency : int
+        Maximum number of `achat` calls handled at the same time;
+        further calls wait in a first-in, first-out queue.
     n_turns : int
         Number of chat instances saved for context.
     state_path : str
         Path to directory where the conversation state is saved.
     log_path : str
         Path to directory where the log state is saved.
+    log_writer : LogWriter or None
+        Background writer of the chat log. If None, records are written
+        synchronously.
+    last_stream_stats : dict or None
+        Time to first token, total time, number of tokens and tokens/s
+        of the last streamed reply, and whether it came from the semantic cache.
+        Logs and spans use the statistics of their own reply.
+    load_seconds : dict[str, float]
+        Seconds spent loading the model and the retriever and warming them up.
 
     Parameters
     ----------
@@ -82,6 +235,93 @@ class RAGChat():
         Name of conversation log JSON file.
     api_key : str or None, optional (default=None)
         API key for OpenAI model.
+    api_client : dict or None, optional (default=None)
+        Timeout, retry, concurrency and hedging arguments of
+        `basic_chatbot.model_openai.OpenAIChat`. API models generate
+        asynchronously in `achat` instead of on `generation_workers`.
+    cache_dir : str or None, optional (default=None)
+        Directory where the document index cache is saved.
+        If None, the index is rebuilt on every start.
+    chunking : dict or None, optional (default=None)
+        Chunking strategy and its parameters (see `rag_chatbot.chunking`).
+        If None, documents are sliced every 80 characters.
+    index_params : dict or None, optional (default=None)
+        Index type plus build, training and search parameters
+        (see `rag_chatbot.index_factory`). If None, an exact flat index is used.
+    query_cache : dict or None, optional (default=None)
+        Arguments of `rag_chatbot.cache.QueryCache`, e.g. `{"max_size": 1024, "ttl": 3600}`.
+        If None, query embeddings and results are not cached.
+    query_batching : dict or None, optional (default=None)
+        Arguments of `rag_chatbot.batching.QueryBatcher`, e.g. `{"max_batch_size": 32, "max_wait_ms": 2}`.
+        If None, each question is retrieved on its own.
+    semantic_cache : dict or None, optional (default=None)
+        Arguments of `rag_chatbot.cache.SemanticCache`, e.g. `{"threshold": 0.95}`.
+        If None, replies are not cached.
+    max_concurrency : int, optional (default=8)
+        Maximum number of `achat` calls handled at the same time.
+    retrieval_workers : int, optional (default=4)
+        Number of threads running retrieval for `achat`. With `query_batching`,
+        this is also the largest batch `achat` calls can share.
+    generation_workers : int, optional (default=2)
+        Number of threads running text generation for `achat`.
+    generation_batching : dict or None, optional (default=None)
+        Arguments of `basic_chatbot.scheduler.GenerationScheduler`,
+        e.g. `{"max_batch_size": 8, "max_wait_ms": 10}`. Only used by local models.
+        If None, each prompt is generated on its own.
+    prefix_cache_mb : float or None, optional (default=None)
+        Memory budget in MiB for reusing the key/values of each conversation's
+        prompt prefix across turns (local models only). If None, every prompt
+        is run from scratch. With `generation_batching`, batching takes
+        priority: only prompts generated alone reuse their prefix.
+        The history is only a shared prefix while it grows: once more than
+        `n_turns` turns have passed, or old turns are trimmed to fit
+        `prompt_budget`, only the system prompt is reused
+        (see `benchmarks/prefix_cache.py`).
+    prompt_budget : int or None, optional (default=None)
+        Maximum number of prompt tokens; documents and history that do not
+        fit are left out (see `rag_chatbot.prompt_utils.build_budgeted_prompt`).
+        If None, local models use their context window minus `max_new_tokens`
+        and API models are not budgeted.
+    max_new_tokens : int, optional (default=100)
+        Number of tokens reserved for the reply when `prompt_budget` is None.
+    hybrid : dict or None, optional (default=None)
+        Arguments of `rag_chatbot.hybrid.HybridRetriever`, e.g. `{"fusion": "rrf"}`.
+        If None, retrieval is dense-only.
+    rerank : dict or None, optional (default=None)
+        Arguments of `rag_chatbot.reranker.Reranker`, e.g. `{"candidates": 20, "budget_ms": 100}`.
+        If None, retrieved chunks are not reranked.
+    top_k : int, optional (default=1)
+        Number of chunks put into the prompt.
+    precision : str, optional (default="fp32")
+        Precision of a local model: `"fp32"`, `"bf16"` or `"int8"`
+        (see `basic_chatbot.model_local.LocalLM`).
+    num_threads : int or None, optional (default=None)
+        Number of threads PyTorch uses for CPU inference. If None, PyTorch's default is kept.
+    encoder_precision : str, optional (default="fp32")
+        Precision of the embedding model: `"fp32"`, `"bf16"` or `"int8"`
+        (see `rag_chatbot.encoder.load_encoder`).
+    background_load : bool, optional (default=False)
+        If True, returns at once and loads the model and the retriever on a
+        background thread. Otherwise they are loaded before returning and
+        loading errors are raised.
+    state_store : dict or None, optional (default=None)
+        Backend (`"jsonl"` or `"sqlite"`) and arguments of the append-only
+        conversation store (see `basic_chatbot.store.open_store`), e.g.
+        `{"backend": "sqlite", "max_turns": 1000}`. It is saved next to
+        `state_fname`. If None, each conversation's JSON file is rewritten
+        on every turn.
+    log_writer : dict or None, optional (default=None)
+        Arguments of `basic_chatbot.logging.LogWriter`, e.g.
+        `{"flush_interval": 1.0, "max_bytes": 10485760, "compress": True}`.
+        If None, each log record is written before the reply is returned.
+    metrics : dict or None, optional (default=None)
+        Arguments of `basic_chatbot.metrics.Metrics.configure`, e.g.
+        `{"enabled": True, "span_writer": {"flush_interval": 1.0}, "port": 9100}`.
+        Request spans are written to `spans.jsonl` in `log_dir` unless
+        `spans_path` is given. If None, stage latencies are only kept in
+        memory and exported by `metrics`.
+    embedding_model : str, optional (default="all-MiniLM-L6-v2")
+        Name or path of the sentence-transformers model encoding documents and queries.
     """
     def __init__(
         self, 
@@ -92,60 +332,562 @@ class RAGChat():
         log_dir: str,
         state_fname: str = "conversation_state.json",
         log_fname: str = "chat_logs.jsonl",
-        api_key: str | None = None
+        api_key: str | None = None,
+        api_client: dict | None = None,
+        cache_dir: str | None = None,
+        chunking: dict | None = None,
+        index_params: dict | None = None,
+        query_cache: dict | None = None,
+        query_batching: dict | None = None,
+        semantic_cache: dict | None = None,
+        max_concurrency: int = 8,
+        retrieval_workers: int = 4,
+        generation_workers: int = 2,
+        generation_batching: dict | None = None,
+        prefix_cache_mb: float | None = None,
+        prompt_budget: int | None = None,
+        max_new_tokens: int = 100,
+        hybrid: dict | None = None,
+        rerank: dict | None = None,
+        top_k: int = 1,
+        precision: str = "fp32",
+        num_threads: int | None = None,
+        encoder_precision: str = "fp32",
+        background_load: bool = False,
+        state_store: dict | None = None,
+        log_writer: dict | None = None,
+        metrics: dict | None = None,
+        embedding_model: str = "all-MiniLM-L6-v2"
     ):
-        if api_key:
-            self.lm = OpenAIChat(model_name, api_key=api_key)
-        else:
-            self.lm = LocalLM(model_name)
-
         state_path = state_dir + state_fname
         log_path = log_dir + log_fname
 
-        self.memory = ChatMemory()
+        self.store = open_store(state_path, **state_store) if state_store else None
+        self._max_turns = state_store.get("max_turns", 1000) if state_store else None
+        self.memory = ChatMemory(self._max_turns, self.store)
         self.memory.load(state_path)
 
-        DOCUMENTS = iter_jsonl_directory(docs_dir)
-        self.retriever = DocsRetriever(DOCUMENTS)
+        self.lm = None
+        self.is_local = not api_key
+        self.retriever = None
+        self.query_batcher = None
+        self.top_k = top_k
+        self.semantic_cache = SemanticCache(**semantic_cache) if semantic_cache else None
+        self.scheduler = None
+        self.token_counter = TokenCounter()
+        self.prompt_budget = prompt_budget
+        self.load_seconds = {}
+        self._ready = threading.Event()
+        self._load_error = None
         
         self.n_turns = n_turns
         self.state_path = state_path
         self.log_path = log_path
+        self.log_writer = LogWriter(log_path, **log_writer) if log_writer else None
+        self.last_stream_stats = None
+        if metrics:
+            METRICS.configure(**{"spans_path": log_dir + "spans.jsonl", **metrics})
+
+        self.sessions = {}
+        self.max_concurrency = max_concurrency
+        self._sessions_lock = threading.Lock()
+        self._loops = {}
+        self._retrieval_pool = ThreadPoolExecutor(retrieval_workers, thread_name_prefix="retrieval")
+        self._generation_pool = ThreadPoolExecutor(generation_workers, thread_name_prefix="generation")
+
+        loaders = {
+            "model": partial(
+                self._load_model, model_name, api_key, api_client, prefix_cache_mb, precision,
+                num_threads, generation_batching, max_new_tokens
+            ),
+            "retriever": partial(
+                self._load_retriever, docs_dir, embedding_model, cache_dir, chunking,
+                index_params, query_cache, query_batching, encoder_precision, hybrid, rerank
+            ),
+        }
+        if background_load:
+            threading.Thread(target=self._load, args=(loaders,), name="load", daemon=True).start()
+        else:
+            self._load(loaders)
+            self.wait_ready()
+
+    def _load_model(
+        self,
+        model_name: str,
+        api_key: str | None,
+        api_client: dict | None,
+        prefix_cache_mb: float | None,
+        precision: str,
+        num_threads: int | None,
+        generation_batching: dict | None,
+        max_new_tokens: int
+    ):
+        """Imports the model backend, loads the model and sets up token counting and batching."""
+        if not self.is_local:
+            from basic_chatbot.model_openai import OpenAIChat
+
+            self.lm = OpenAIChat(model_name, api_key=api_key, **(api_client or {}))
+            return
+
+        from basic_chatbot.model_local import LocalLM
+
+        lm = LocalLM(
+            model_name, prefix_cache_mb=prefix_cache_mb, 
+            precision=precision, num_threads=num_threads
+        )
+        self.token_counter = TokenCounter(lm.tokenizer)
+        if self.prompt_budget is None:
+            self.prompt_budget = lm.context_length - max_new_tokens
+        if generation_batching:
+            self.scheduler = GenerationScheduler(lm, **generation_batching)
+        lm.generate_text("Hello", max_new_tokens=1, do_sample=False)
+        self.lm = lm
+
+    def _load_retriever(
+        self,
+        docs_dir: str,
+        embedding_model: str,
+        cache_dir: str | None,
+        chunking: dict | None,
+        index_params: dict | None,
+        query_cache: dict | None,
+        query_batching: dict | None,
+        encoder_precision: str,
+        hybrid: dict | None,
+        rerank: dict | None
+    ):
+        """Imports the retrieval stack, loads or builds the index and encodes a first query."""
+        from rag_chatbot.retriever import DocsRetriever
+
+        retriever = DocsRetriever.from_directory(
+            docs_dir, model=embedding_model, cache_dir=cache_dir, 
+            chunking=chunking, index_params=index_params,
+            query_cache=QueryCache(**query_cache) if query_cache else None,
+            encoder_precision=encoder_precision
+        )
+        if hybrid:
+            from rag_chatbot.hybrid import HybridRetriever
+
+            retriever = HybridRetriever(retriever, **hybrid)
+        if rerank:
+            from rag_chatbot.reranker import Reranker
+
+            retriever = Reranker(retriever, **rerank)
+        retriever.embed_queries(["warm-up"])
+        if query_batching:
+            from rag_chatbot.batching import QueryBatcher
+
+            self.query_batcher = QueryBatcher(retriever, **query_batching)
+        self.retriever = retriever
 
-    def chat(self, question: str) -> str:
+    def _load(self, loaders: dict):
+        """
+        Runs the loaders one after the other (model loading is not thread-safe
+        in transformers), records how long each took and marks the chatbot
+        ready, or keeps the error that stopped it.
+        """
+        try:
+            for name, loader in loaders.items():
+                start = time.perf_counter()
+                loader()
+                self.load_seconds[name] = time.perf_counter() - start
+        except Exception as e:
+            self._load_error = e
+        finally:
+            self._ready.set()
+
+    def wait_ready(self, timeout: float | None = None):
+        """
+        Blocks until the model and the retriever are loaded.
+
+        Parameters
+        ----------
+        timeout : float or None, optional (default=None)
+            Seconds to wait. If None, waits until loading finishes.
+
+        Raises
+        ------
+        TimeoutError
+            If loading did not finish within `timeout`.
+        RuntimeError
+            If loading failed.
+        """
+        if not self._ready.wait(timeout):
+            raise TimeoutError("The chatbot is still loading.")
+        if self._load_error is not None:
+            raise RuntimeError("The chatbot failed to load.") from self._load_error
+
+    def health(self) -> dict:
+        """
+        Reports whether the chatbot can serve requests.
+
+        Returns
+        -------
+        dict
+            `"status"` (`"loading"`, `"ready"` or `"error"`), whether the
+            `"model"` and `"retriever"` are loaded, the `"load_seconds"`
+            of each and the loading `"error"`, if any.
+        """
+        if not self._ready.is_set():
+            status = "loading"
+        elif self._load_error is not None:
+            status = "error"
+        else:
+            status = "ready"
+        return {
+            "status": status,
+            "model": self.lm is not None,
+            "retriever": self.retriever is not None,
+            "load_seconds": dict(self.load_seconds),
+            "error": None if self._load_error is None else repr(self._load_error),
+        }
+
+    def metrics(self) -> str:
+        """
+        Returns the per-stage latency histograms, token counts and
+        tokens/s of the process in the Prometheus text format
+        (see `basic_chatbot.metrics.Metrics`).
+        """
+        return METRICS.prometheus()
+
+    def chat(
+        self, 
+        question: str, 
+        session_id: str | None = None
+    ) -> str:
         """
         Generates an output from the language model using previous `n_turns`.
         The user question and model response is then passed into the memory class.
+        If a semantic cache is set, a cached reply to an equivalent question
+        with the same retrieved documents is returned without generating.
 
         Parameters
         ----------
         question : str
             The question asked by the user.
+        session_id : str or None, optional (default=None)
+            Conversation the question belongs to. If None, uses `memory`.
 
         Returns
         -------
         reply : str
             Model output.
         """
-        docs = self.retriever.retrieve(question)
-        
-        prompt = build_prompt_with_history(
-            self.memory.last_n_turns(self.n_turns), 
-            docs,
-            question
+        self.wait_ready()
+        with METRICS.span("chat", session_id=session_id):
+            memory = self.get_memory(session_id)
+            history = memory.last_n_turns(self.n_turns)
+            with METRICS.timer("rag_chat", "retrieve"):
+                doc_ids, embedding, reply = self._retrieve(question, history)
+
+            if reply is None:
+                with METRICS.timer("rag_chat", "prompt"):
+                    prompt = self._build_prompt(
+                        history, 
+                        self.retriever.get_documents(doc_ids),
+                        question
+                    )
+
+                with METRICS.timer("rag_chat", "generate"):
+                    text = self._generate(prompt, session_id)
+                reply = extract_assistant_reply(text)
+                if embedding is not None:
+                    self.semantic_cache.store(embedding, doc_ids, reply)
+            else:
+                METRICS.set_span(cached=True)
+
+            memory.add_user(question)
+            memory.add_assistant(reply)
+            return reply
+
+    async def achat(
+        self, 
+        question: str, 
+        session_id: str | None = None
+    ) -> str:
+        """
+        Asynchronous version of `chat`.
+        Retrieval and generation run on bounded thread pools (or the generation
+        scheduler, if set, or the async client of API models) so the event
+        loop stays free. At most `max_concurrency`
+        calls are handled at once and calls for the same session are handled
+        one at a time, in order.
+
+        Parameters
+        ----------
+        question : str
+            The question asked by the user.
+        session_id : str or None, optional (default=None)
+            Conversation the question belongs to. If None, uses `memory`.
+
+        Returns
+        -------
+        reply : str
+            Model output.
+        """
+        loop = asyncio.get_running_loop()
+        if not self._ready.is_set():
+            await loop.run_in_executor(None, self._ready.wait)
+        self.wait_ready()
+        semaphore, session_locks = self._async_limits()
+        lock = session_locks.setdefault(session_id, asyncio.Lock())
+
+        async with lock, semaphore:
+            with METRICS.span("achat", session_id=session_id):
+                memory = self.get_memory(session_id)
+                history = memory.last_n_turns(self.n_turns)
+                with METRICS.timer("rag_chat", "retrieve"):
+                    doc_ids, embedding, reply = await self._run_in(
+                        self._retrieval_pool, self._retrieve, question, history
+                    )
+
+                if reply is None:
+                    with METRICS.timer("rag_chat", "prompt"):
+                        docs = await self._run_in(
+                            self._retrieval_pool, self.retriever.get_documents, doc_ids
+                        )
+                        prompt = self._build_prompt(history, docs, question)
+
+                    with METRICS.timer("rag_chat", "generate"):
+                        if self.scheduler is not None:
+                            text = await asyncio.wrap_future(self.scheduler.submit(prompt, session_id))
+                        elif not self.is_local:
+                            text = await self.lm.agenerate_text(prompt)
+                        else:
+                            text = await self._run_in(
+                                self._generation_pool, self._generate, prompt, session_id
+                            )
+                    reply = extract_assistant_reply(text)
+                    if embedding is not None:
+                        self.semantic_cache.store(embedding, doc_ids, reply)
+                else:
+                    METRICS.set_span(cached=True)
+
+                memory.add_user(question)
+                memory.add_assistant(reply)
+                return reply
+
+    def _async_limits(self) -> tuple[asyncio.Semaphore, weakref.WeakValueDictionary]:
+        """
+        Returns the concurrency limit and per-session locks of the running event
+        loop, creating them on first use (both are bound to the loop they run on).
+        A session's lock is dropped once no call holds or waits on it.
+        """
+        loop = asyncio.get_running_loop()
+        with self._sessions_lock:
+            entry = self._loops.get(loop)
+            if entry is None:
+                entry = (asyncio.Semaphore(self.max_concurrency), weakref.WeakValueDictionary())
+                self._loops = {
+                    other: value for other, value in self._loops.items() if not other.is_closed()
+                }
+                self._loops[loop] = entry
+            return entry
+
+    def _run_in(
+        self,
+        pool: ThreadPoolExecutor,
+        fn,
+        *args
+    ) -> asyncio.Future:
+        """Runs `fn` on a thread pool with the caller's context, so its stages join the current span."""
+        return asyncio.get_running_loop().run_in_executor(
+            pool, contextvars.copy_context().run, fn, *args
         )
 
-        text = self.lm.generate_text(prompt)
-        reply = extract_assistant_reply(text)
+    def chat_stream(
+        self, 
+        question: str, 
+        session_id: str | None = None
+    ) -> Iterator[str]:
+        """
+        Streaming version of `chat`.
+        Yields the reply generated so far each time new text arrives.
+        A reply served from the semantic cache is yielded at once.
+
+        Parameters
+        ----------
+        question : str
+            The question asked by the user.
+        session_id : str or None, optional (default=None)
+            Conversation the question belongs to. If None, uses `memory`.
+
+        Yields
+        ------
+        str
+            Reply generated so far.
+        """
+        self.wait_ready()
+        span = METRICS.start_span("chat_stream", session_id=session_id)
+        stats = {}
+        try:
+            yield from self._chat_stream(question, session_id, span, stats)
+        finally:
+            METRICS.end_span(span)
+        self.last_stream_stats = stats
+
+    def _chat_stream(
+        self,
+        question: str,
+        session_id: str | None,
+        span,
+        stats: dict
+    ) -> Iterator[str]:
+        """
+        Body of `chat_stream`. The span is passed explicitly because the
+        generator may be resumed on other threads, and the statistics of
+        this reply are put into `stats` because several replies may be
+        streamed at once.
+        """
+        memory = self.get_memory(session_id)
+        history = memory.last_n_turns(self.n_turns)
+        with METRICS.timer("rag_chat", "retrieve", span):
+            doc_ids, embedding, reply = self._retrieve(question, history)
+
+        if reply is not None:
+            timing = StreamStats()
+            timing.add(0)
+            timing.finish()
+            stats.update(timing.as_dict(), cached=True)
+            yield reply
+        else:
+            with METRICS.timer("rag_chat", "prompt", span):
+                prompt = self._build_prompt(
+                    history, 
+                    self.retriever.get_documents(doc_ids),
+                    question
+                )
+
+            text = ""
+            reply = ""
+            timing = StreamStats()
+            stream = (
+                self.lm.stream_text(prompt, session_id=session_id, stats=timing, span=span)
+                if self.is_local else self.lm.stream_text(prompt, stats=timing)
+            )
+            for delta in stream:
+                text += delta
+                reply = extract_assistant_reply(text)
+                yield reply
+            stats.update(timing.as_dict(), cached=False)
+            METRICS.observe(
+                "chatbot_stage_seconds", stats["total_s"],
+                component="rag_chat", stage="generate"
+            )
+            if span is not None:
+                span.add("rag_chat.generate", stats["total_s"])
+
+            if embedding is not None:
+                self.semantic_cache.store(embedding, doc_ids, reply)
+
+        memory.add_user(question)
+        memory.add_assistant(reply)
 
-        self.memory.add_user(question)
-        self.memory.add_assistant(reply)
-        return reply
+    def _build_prompt(
+        self, 
+        history: list[str], 
+        docs: list[str], 
+        question: str
+    ) -> str:
+        """Builds the prompt, keeping it within `prompt_budget` tokens if set."""
+        if self.prompt_budget is None:
+            return build_prompt_with_history(history, docs, question)
+        return build_budgeted_prompt(
+            history, docs, question, self.token_counter, self.prompt_budget
+        )
+
+    def _generate(
+        self, 
+        prompt: str, 
+        session_id: str | None = None
+    ) -> str:
+        """
+        Generates text through the scheduler if set, otherwise with the model,
+        reusing the session's cached prompt prefix for local models (with the
+        scheduler, only when the prompt is not batched with others).
+        """
+        if self.scheduler is not None:
+            return self.scheduler.generate_text(prompt, session_id)
+        if self.is_local:
+            return self.lm.generate_text(prompt, session_id=session_id)
+        return self.lm.generate_text(prompt)
+
+    def _retrieve(
+        self, 
+        question: str,
+        history: list[str]
+    ) -> tuple[list[int], np.ndarray | None, str | None]:
+        """
+        Retrieves the documents for a question, through `query_batcher` if set,
+        and looks it up in the semantic cache. The question is encoded once for both.
+
+        Returns
+        -------
+        tuple[list[int], np.ndarray or None, str or None]
+            Retrieved vector IDs, question embedding (None if the cache is
+            not used for this question) and cached reply (None on a miss).
+        """
+        retrieve_ids = (
+            self.retriever.retrieve_ids if self.query_batcher is None
+            else self.query_batcher.retrieve_ids
+        )
+        cache = self.semantic_cache
+        if cache is None or (history and not cache.ignore_history):
+            if cache is not None:
+                cache.bypass()
+            return retrieve_ids(question, self.top_k), None, None
+
+        embedding = self.retriever.embed_queries([question])[0]
+        doc_ids = retrieve_ids(question, self.top_k, embedding)
+        return doc_ids, embedding, cache.lookup(embedding, doc_ids)
+
+    def get_memory(self, session_id: str | None = None) -> ChatMemory:
+        """
+        Returns the memory of a conversation, loading its saved state
+        the first time the session is seen.
+
+        Parameters
+        ----------
+        session_id : str or None, optional (default=None)
+            Conversation ID. If None, returns `memory`.
+
+        Returns
+        -------
+        ChatMemory
+            Memory of the conversation.
+        """
+        if session_id is None:
+            return self.memory
+
+        with self._sessions_lock:
+            memory = self.sessions.get(session_id)
+            if memory is None:
+                memory = ChatMemory(self._max_turns, self.store, session_id)
+                memory.load(self.session_state_path(session_id))
+                self.sessions[session_id] = memory
+            return memory
+
+    def session_state_path(self, session_id: str | None = None) -> str:
+        """
+        Returns the path where a conversation's state is saved:
+        `state_path` with the sanitized session ID appended to the file name.
+        """
+        if session_id is None:
+            return self.state_path
+        path = Path(self.state_path)
+        session = re.sub(r"[^\w-]", "_", session_id)
+        return str(path.with_name(f"{path.stem}_{session}{path.suffix}"))
+
+    def end_session(self, session_id: str):
+        """Drops a conversation's memory from the process. Its saved state is kept."""
+        with self._sessions_lock:
+            self.sessions.pop(session_id, None)
     
     def respond(
         self,
         user_question: str, 
-        chat_history: list | None
+        chat_history: list | None,
+        session_id: str | None = None
     ) -> tuple[list, str]:
         """
         Wrapper for `chat` method.
@@ -158,6 +900,8 @@ class RAGChat():
             Question from the user.
         chat_history : list or None
             History of chat.
+        session_id : str or None, optional (default=None)
+            Conversation the question belongs to. If None, uses `memory`.
 
         Returns
         -------
@@ -169,18 +913,170 @@ class RAGChat():
 
         chat_history.append({"role": "user", "content": user_question})
 
-        try:
-            reply = str(self.chat(user_question))
-        except Exception as e:
-            reply = f"[ERROR] {type(e).__name__}: {e}"
+        with METRICS.span("respond", session_id=session_id):
+            try:
+                reply = str(self.chat(user_question, session_id))
+            except Exception as e:
+                reply = f"[ERROR] {type(e).__name__}: {e}"
+                METRICS.set_span(error=type(e).__name__)
 
-        log_output(self.log_path, user_question, reply)
-        self.memory.save(self.state_path)
+            self._persist(user_question, reply, session_id)
+        chat_history.append({"role": "assistant", "content": reply})
+        return chat_history
+
+    async def arespond(
+        self,
+        user_question: str, 
+        chat_history: list | None,
+        session_id: str | None = None
+    ) -> list:
+        """
+        Asynchronous version of `respond`.
+        Logging and saving the conversation state also run off the event loop.
+
+        Parameters
+        ----------
+        user_question : str
+            Question from the user.
+        chat_history : list or None
+            History of chat.
+        session_id : str or None, optional (default=None)
+            Conversation the question belongs to. If None, uses `memory`.
+
+        Returns
+        -------
+        list
+            Chat history.
+        """
+        if chat_history is None:
+            chat_history = []
+
+        chat_history.append({"role": "user", "content": user_question})
+
+        with METRICS.span("arespond", session_id=session_id):
+            try:
+                reply = str(await self.achat(user_question, session_id))
+            except Exception as e:
+                reply = f"[ERROR] {type(e).__name__}: {e}"
+                METRICS.set_span(error=type(e).__name__)
+
+            await self._run_in(self._retrieval_pool, self._persist, user_question, reply, session_id)
         chat_history.append({"role": "assistant", "content": reply})
         return chat_history
     
-    def clear_chat(self) -> list:
-        """Clears chat memory and returns empty list."""
-        self.memory.clear_memory(self.state_path)
-        log_output(self.log_path, "Memory cleared", "")
-        return []
\ No newline at end of file
+    def respond_stream(
+        self,
+        user_question: str, 
+        chat_history: list | None,
+        session_id: str | None = None
+    ) -> Iterator[list]:
+        """
+        Streaming version of `respond`.
+        Yields the chat history with the partial reply as the last message,
+        so a UI can render tokens as they arrive. The log entry includes the
+        time to first token and tokens/s of the reply. Streams are generated
+        on their own, not through the generation scheduler.
+
+        Parameters
+        ----------
+        user_question : str
+            Question from the user.
+        chat_history : list or None
+            History of chat.
+        session_id : str or None, optional (default=None)
+            Conversation the question belongs to. If None, uses `memory`.
+
+        Yields
+        ------
+        list
+            Chat history.
+        """
+        if chat_history is None:
+            chat_history = []
+
+        chat_history.append({"role": "user", "content": user_question})
+        message = {"role": "assistant", "content": ""}
+        chat_history.append(message)
+
+        stats = {}
+        span = METRICS.start_span("respond_stream", session_id=session_id)
+        try:
+            self.wait_ready()
+            for reply in self._chat_stream(user_question, session_id, span, stats):
+                message["content"] = reply
+                yield chat_history
+        except Exception as e:
+            message["content"] = f"[ERROR] {type(e).__name__}: {e}"
+            if span is not None:
+                span.set(error=type(e).__name__)
+
+        stats = stats or None
+        self.last_stream_stats = stats
+        if span is not None and stats is not None:
+            span.set(**stats)
+        self._persist(user_question, message["content"], session_id, stats, span)
+        METRICS.end_span(span)
+        yield chat_history
+
+    def _persist(
+        self,
+        user_question: str,
+        reply: str,
+        session_id: str | None,
+        stats: dict | None = None,
+        span=None
+    ):
+        """Logs the exchange and saves the conversation state, timing both."""
+        with METRICS.timer("rag_chat", "log", span):
+            self._log(user_question, reply, stats)
+        with METRICS.timer("rag_chat", "state", span):
+            self.get_memory(session_id).save(self.session_state_path(session_id))
+    
+    def refresh_documents(self) -> bool:
+        """
+        Picks up added, changed or deleted documents in `docs_dir`
+        without restarting the chatbot.
+
+        Returns
+        -------
+        bool
+            True if the document index changed.
+        """
+        self.wait_ready()
+        return self.retriever.refresh()
+
+    def clear_chat(self, session_id: str | None = None) -> list:
+        """Clears chat memory of a conversation and returns empty list."""
+        self.get_memory(session_id).clear_memory(self.session_state_path(session_id))
+        self._log("Memory cleared", "")
+        return []
+
+    def _log(
+        self,
+        user_text: str,
+        assistant_text: str,
+        stats: dict | None = None
+    ):
+        """Logs a record through `log_writer`, or directly if there is none."""
+        if self.log_writer is not None:
+            self.log_writer.log(user_text, assistant_text, stats)
+        else:
+            log_output(self.log_path, user_text, assistant_text, stats)
+
+    def close(self):
+        """
+        Shuts down the retrieval and generation thread pools, the query batcher and the scheduler,
+        closes the store and flushes the log and the request spans.
+        """
+        self._retrieval_pool.shutdown()
+        self._generation_pool.shutdown()
+        if self.query_batcher is not None:
+            self.query_batcher.close()
+        if self.scheduler is not None:
+            self.scheduler.close()
+        if self.store is not None:
+            self.store.close()
+        if self.log_writer is not None:
+            self.log_writer.close()
+        if METRICS.span_writer is not None:
+            METRICS.span_writer.flush()
\ No newline at end of file
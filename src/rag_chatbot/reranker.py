@@ -0,0 +1,274 @@
+import threading
+import time
+import numpy as np
+from sentence_transformers import CrossEncoder
+from rag_chatbot.cache import LRUCache, normalize_query
+
+class Reranker:
+    """
+    Re-orders the candidates of a retriever with a cross-encoder.
+
+    For each query, `candidates` chunks are fetched from the wrapped retriever,
+    scored together with the query in one batch and the top k are kept.
+    Scores are cached per (normalized query, vector ID). Reranking is kept
+    within a latency budget. An estimate of the cost per pair limits how many
+    uncached candidates are scored, and the others keep their retrieval order
+    after the scored ones. When `max_concurrent` rerank calls are already
+    running, the call is skipped and the retriever's order is returned.
+
+    Attributes
+    ----------
+    retriever : DocsRetriever or HybridRetriever
+        Retriever whose candidates are reranked.
+    model_name : str
+        Name of the cross-encoder model.
+    model : CrossEncoder
+        Cross-encoder scoring (query, chunk) pairs.
+    candidates : int
+        Number of chunks fetched per query before reranking.
+    budget_ms : float or None
+        Time allowed for scoring per call. If None, every candidate is scored.
+    max_concurrent : int
+        Number of rerank calls allowed at once before calls are skipped.
+    cache : LRUCache
+        Cross-encoder scores keyed by (normalized query, vector ID).
+    ms_per_pair : float or None
+        Moving average of the scoring time per pair.
+    reranked : int
+        Number of queries fully reranked.
+    truncated : int
+        Number of queries for which only part of the candidates were scored.
+    skipped : int
+        Number of queries returned in retrieval order because of load.
+    timings : dict[str, float]
+        Milliseconds spent retrieving and reranking by the last call.
+
+    Parameters
+    ----------
+    retriever : DocsRetriever or HybridRetriever
+        Retriever whose candidates are reranked.
+    model : str, optional (default="cross-encoder/ms-marco-MiniLM-L-6-v2")
+        Name of the cross-encoder model.
+    candidates : int, optional (default=20)
+        Number of chunks fetched per query before reranking.
+    budget_ms : float or None, optional (default=100.0)
+        Time allowed for scoring per call. If None, every candidate is scored.
+    max_concurrent : int, optional (default=2)
+        Number of rerank calls allowed at once before calls are skipped.
+    batch_size : int, optional (default=32)
+        Number of pairs per cross-encoder forward pass.
+    max_length : int, optional (default=256)
+        Maximum number of tokens per (query, chunk) pair.
+    cache_size : int, optional (default=4096)
+        Maximum number of cached scores.
+    """
+    def __init__(
+        self,
+        retriever,
+        model: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        candidates: int = 20,
+        budget_ms: float | None = 100.0,
+        max_concurrent: int = 2,
+        batch_size: int = 32,
+        max_length: int = 256,
+        cache_size: int = 4096
+    ):
+        self.retriever = retriever
+        self.model_name = model
+        self.model = CrossEncoder(model, max_length=max_length)
+        self.candidates = candidates
+        self.budget_ms = budget_ms
+        self.max_concurrent = max_concurrent
+        self.batch_size = batch_size
+        self.cache = LRUCache(cache_size)
+        self.ms_per_pair = None
+
+        self.reranked = 0
+        self.truncated = 0
+        self.skipped = 0
+        self.timings = {}
+
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        """Version of the underlying index."""
+        return self.retriever.version
+
+    def retrieve(
+        self,
+        query: str,
+        k: int = 1
+    ) -> list[str]:
+        """Same as `DocsRetriever.retrieve`, with reranked results."""
+        return self.get_documents(self.retrieve_ids(query, k))
+
+    def retrieve_batch(
+        self,
+        queries: list[str],
+        k: int = 1
+    ) -> list[list[str]]:
+        """Same as `DocsRetriever.retrieve_batch`, with reranked results."""
+        return [self.get_documents(ids) for ids in self.retrieve_ids_batch(queries, k)]
+
+    def retrieve_ids(
+        self,
+        query: str,
+        k: int = 1,
+        query_emb: np.ndarray | None = None
+    ) -> list[int]:
+        """Same as `DocsRetriever.retrieve_ids`, with reranked results."""
+        query_embs = None if query_emb is None else query_emb[None, :]
+        return self.retrieve_ids_batch([query], k, query_embs)[0]
+
+    def retrieve_ids_batch(
+        self,
+        queries: list[str],
+        k: int = 1,
+        query_embs: np.ndarray | None = None
+    ) -> list[list[int]]:
+        """
+        Retrieves `candidates` chunks per query and keeps the top k
+        by cross-encoder score, within the latency budget.
+
+        Parameters
+        ----------
+        queries : list[str]
+            Natural language queries.
+        k : int, optional (default=1)
+            Number of chunks to return per query. Must be >= 1.
+        query_embs : np.ndarray or None, optional (default=None)
+            Embeddings of `queries` from `embed_queries`.
+            If None, the dense retriever encodes the queries.
+
+        Returns
+        -------
+        list[list[int]]
+            Vector IDs for each query, in input order, best match first.
+        """
+        if not queries:
+            return []
+
+        start = time.perf_counter()
+        candidates = self.retriever.retrieve_ids_batch(
+            queries, max(k, self.candidates), query_embs
+        )
+        retrieve_ms = (time.perf_counter() - start) * 1e3
+
+        with self._lock:
+            busy = self._active >= self.max_concurrent
+            if busy:
+                self.skipped += len(queries)
+            else:
+                self._active += 1
+        if busy:
+            self.timings = {"retrieve_ms": retrieve_ms, "rerank_ms": 0.0}
+            return [ids[:k] for ids in candidates]
+
+        try:
+            start = time.perf_counter()
+            results = self._rerank(queries, candidates, k)
+            rerank_ms = (time.perf_counter() - start) * 1e3
+        finally:
+            with self._lock:
+                self._active -= 1
+
+        self.timings = {"retrieve_ms": retrieve_ms, "rerank_ms": rerank_ms}
+        return results
+
+    def _rerank(
+        self,
+        queries: list[str],
+        candidates: list[list[int]],
+        k: int
+    ) -> list[list[int]]:
+        """Scores as many uncached pairs as the budget allows and re-orders the candidates."""
+        keys = [normalize_query(query) for query in queries]
+        scores = [
+            {i: self.cache.get((key, i)) for i in ids}
+            for key, ids in zip(keys, candidates)
+        ]
+        todo = [
+            (n, i) for n, ids in enumerate(candidates)
+            for i in ids if scores[n][i] is None
+        ]
+
+        limit = len(todo)
+        if self.budget_ms is not None and self.ms_per_pair:
+            limit = min(limit, int(self.budget_ms / self.ms_per_pair))
+        if todo:
+            self._score(queries, keys, scores, todo[:limit])
+
+        results = []
+        for n, ids in enumerate(candidates):
+            scored = sorted(
+                (i for i in ids if scores[n][i] is not None),
+                key=lambda i: -scores[n][i]
+            )
+            unscored = [i for i in ids if scores[n][i] is None]
+            results.append((scored + unscored)[:k])
+
+            with self._lock:
+                if unscored:
+                    self.truncated += 1
+                else:
+                    self.reranked += 1
+        return results
+
+    def _score(
+        self,
+        queries: list[str],
+        keys: list[str],
+        scores: list[dict],
+        pairs: list[tuple[int, int]]
+    ):
+        """Scores (query index, vector ID) pairs in one batch and caches the scores."""
+        if not pairs:
+            return
+        docs = self.retriever.get_documents([i for _, i in pairs])
+
+        start = time.perf_counter()
+        predicted = self.model.predict(
+            [(queries[n], doc) for (n, _), doc in zip(pairs, docs)],
+            batch_size=self.batch_size,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        ms_per_pair = (time.perf_counter() - start) * 1e3 / len(pairs)
+
+        with self._lock:
+            if self.ms_per_pair is None:
+                self.ms_per_pair = ms_per_pair
+            else:
+                self.ms_per_pair = 0.8 * self.ms_per_pair + 0.2 * ms_per_pair
+
+        for (n, i), score in zip(pairs, np.asarray(predicted, dtype=np.float32)):
+            scores[n][i] = float(score)
+            self.cache.put((keys[n], i), float(score))
+
+    def stats(self) -> dict[str, int | float | None]:
+        """Returns the rerank counters, score cache hit rate and cost per pair."""
+        return {
+            "reranked": self.reranked,
+            "truncated": self.truncated,
+            "skipped": self.skipped,
+            "cache_hit_rate": self.cache.stats()["hit_rate"],
+            "ms_per_pair": self.ms_per_pair,
+        }
+
+    def get_documents(self, ids: list[int]) -> list[str]:
+        """Returns the text of the given vector IDs."""
+        return self.retriever.get_documents(ids)
+
+    def embed_queries(self, queries: list[str]) -> np.ndarray:
+        """Encodes queries with the wrapped retriever's model."""
+        return self.retriever.embed_queries(queries)
+
+    def chunk_sources(self) -> dict[int, tuple[str, str, int, int]]:
+        """Maps every vector ID to where its chunk came from."""
+        return self.retriever.chunk_sources()
+
+    def refresh(self) -> bool:
+        """Refreshes the wrapped retriever."""
+        return self.retriever.refresh()
\ No newline at end of file
@@ -1,41 +1,583 @@
+from pathlib import Path
+from itertools import chain
+from typing import Any, Iterable, Iterator
+import threading
+import time
 import faiss
-from sentence_transformers import SentenceTransformer
+import numpy as np
+from basic_chatbot.metrics import METRICS
+from rag_chatbot.cache import QueryCache
+from rag_chatbot.chunking import DEFAULT_CHUNKING, get_chunker
+from rag_chatbot.documents import iter_batches, iter_jsonl_records
+from rag_chatbot.encoder import load_encoder
+from rag_chatbot.index_cache import INDEX_FNAME, directory_hashes, load_cache, save_cache
+from rag_chatbot.parallel import ParallelEncoder
+from rag_chatbot.vector_store import VectorStore
+from rag_chatbot.index_factory import (
+    SEARCH_PARAMS, build_index, train_index, set_search_params, supports_removal, wraps_ivf
+)
 
 class DocsRetriever:
     """
     A class used to retrieve information from documents similar to a query.
-    
+
+    Every chunk is stored under an integer vector ID in an ID-mapped FAISS index,
+    so chunks can be added and removed without rebuilding the index.
+
     Attributes
     ----------
-    documents : list[str]
-        List of text that will be encoded and retrieved.
-    model : str, optional (default="all-MiniLM-L6-v2")
-        Name of model that will be loaded.
+    documents : dict[int, str]
+        Text that will be encoded and retrieved, keyed by vector ID.
+    model : SentenceTransformer
+        Model used to encode the documents and queries.
+    model_name : str
+        Name of the embedding model.
+    encoder_precision : str
+        Precision the embedding model runs in (see `rag_chatbot.encoder`).
     index : faiss.Index
-        Constructs an exact FAISS index using squared L2 distance.
+        ID-mapped FAISS index using squared L2 distance.
+    index_params : dict
+        Index type plus build, training and search parameters (see `index_factory`).
+    vectors : VectorStore or None
+        Full-precision embeddings used to rescore the index's candidates.
+        Only kept if `index_params` sets `"rescore"`.
+    files : dict[str, dict]
+        Per-file content hash and per-record fingerprints and vector IDs.
+        Only populated for retrievers built with `from_directory`.
+    docs_dir : str or None
+        Directory where the documents are saved.
+    chunking : dict
+        Chunking strategy and its parameters (see `rag_chatbot.chunking`).
+    cache_dir : str or None
+        Directory where the index cache is saved.
+    batch_size : int
+        Number of chunks encoded and added to the index at a time.
+    n_workers : int
+        Number of processes used to encode documents.
+    verbose : bool
+        If True, prints progress and throughput while indexing.
+    build_stats : dict
+        Number of chunks, seconds and chunks per second of the last indexing run.
+    version : int
+        Incremented every time the index changes.
+    query_cache : QueryCache or None
+        Cache of query embeddings and top-k result IDs.
 
     Parameters
     ----------
-    documents : list[str]
-        List of text that will be encoded and retrieved.
+    documents : list[str] or dict[int, str]
+        List of text that will be encoded and retrieved,
+        or text keyed by vector ID if `index` is given.
     model : str, optional (default="all-MiniLM-L6-v2")
         Name of model that will be loaded.
+    index : faiss.Index or None, optional (default=None)
+        Prebuilt ID-mapped index over `documents`.
+        If None, the documents are encoded and a new index is built.
+    index_params : dict or None, optional (default=None)
+        Index type plus build, training and search parameters,
+        e.g. `{"index_type": "ivf_flat", "nlist": 1024, "nprobe": 16}`.
+        If None, an exact flat index is used. With `"rescore": r`, a float32
+        copy of the embeddings is kept next to a compressed index (e.g.
+        `{"index_type": "sq", "sq_type": "8"}`), `r * k` candidates are taken
+        from the index and re-ranked by exact distance. Rescoring is not
+        available for a prebuilt `index`.
+    batch_size : int, optional (default=1024)
+        Number of chunks encoded and added to the index at a time.
+        Peak memory while indexing is bounded by this batch size
+        (and by `train_size` for indexes that need training).
+    n_workers : int, optional (default=1)
+        Number of processes used to encode documents. If > 1, batches are
+        sharded across a process pool that each hold their own encoder and
+        merged back in order, so the vector IDs match a serial build.
+        Each worker loads its own model, so this only pays off for large corpora.
+    verbose : bool, optional (default=False)
+        If True, prints progress and throughput while indexing.
+    query_cache : QueryCache or None, optional (default=None)
+        Cache of query embeddings and top-k result IDs.
+        If None, every query is encoded and searched.
+    encoder_precision : str, optional (default="fp32")
+        `"fp32"`, `"bf16"` or `"int8"`. Reduced precisions run the embedding
+        model on CPU; documents and queries are encoded the same way.
     """
     def __init__(
-        self, 
-        documents: list[str], 
-        model: str = "all-MiniLM-L6-v2"
+        self,
+        documents: Iterable[str] | dict[int, str],
+        model: str = "all-MiniLM-L6-v2",
+        index: faiss.Index | None = None,
+        index_params: dict | None = None,
+        batch_size: int = 1024,
+        n_workers: int = 1,
+        verbose: bool = False,
+        query_cache: QueryCache | None = None,
+        encoder_precision: str = "fp32"
     ):
-        self.documents = documents
-        self.model = SentenceTransformer(model)
+        self.model_name = model
+        self.encoder_precision = encoder_precision
+        self.index_params = dict(index_params or {})
+        self.model = load_encoder(model, encoder_precision)
+        self.vectors = None
+        self.files = {}
+        self.docs_dir = None
+        self.chunking = dict(DEFAULT_CHUNKING)
+        self.cache_dir = None
+        self.batch_size = batch_size
+        self.n_workers = n_workers
+        self.verbose = verbose
+        self.build_stats = {"chunks": 0, "seconds": 0.0, "chunks_per_s": 0.0}
+        self.version = 0
+        self.query_cache = query_cache
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._mmapped = False
+
+        if index is None:
+            if self.index_params.get("rescore"):
+                self.vectors = VectorStore(self.model.get_sentence_embedding_dimension())
+            self.documents = {}
+            self.next_id = 0
+            self.index = self._new_index()
+            self.add_documents(documents)
+        else:
+            self.documents = dict(documents)
+            self.next_id = max(self.documents, default=-1) + 1
+            self.index = index
+            set_search_params(self.index, **self.index_params)
+
+    def _new_index(self) -> faiss.Index:
+        """Creates an empty ID-mapped index matching the embedding dimension."""
+        dim = self.model.get_sentence_embedding_dimension()
+        return build_index(dim, **self.index_params)
+
+    def _settings(self) -> dict:
+        """Returns everything the stored vectors depend on."""
+        return {
+            "model": self.model_name,
+            "encoder_precision": self.encoder_precision,
+            "chunking": self.chunking,
+            "index": {
+                key: value for key, value in self.index_params.items()
+                if key not in SEARCH_PARAMS
+            },
+        }
+
+    @classmethod
+    def from_directory(
+        cls,
+        docs_dir: str,
+        model: str = "all-MiniLM-L6-v2",
+        chunking: dict | None = None,
+        cache_dir: str | None = None,
+        index_params: dict | None = None,
+        batch_size: int = 1024,
+        n_workers: int = 1,
+        verbose: bool = False,
+        query_cache: QueryCache | None = None,
+        encoder_precision: str = "fp32"
+    ) -> "DocsRetriever":
+        """
+        Builds a retriever from a directory of jsonl files.
+
+        If `cache_dir` holds an index built with the same embedding model,
+        encoder precision, chunking and index parameters, it is memory-mapped and only the records that
+        changed since it was saved are re-embedded (see `refresh`).
+        Otherwise the index is built from scratch and saved to `cache_dir`.
+
+        Parameters
+        ----------
+        docs_dir : str
+            Directory where the documents are saved.
+        model : str, optional (default="all-MiniLM-L6-v2")
+            Name of model that will be loaded.
+        chunking : dict or None, optional (default=None)
+            Chunking strategy and its parameters, e.g.
+            `{"strategy": "sentence", "chunk_size": 400, "overlap": 1}`.
+            If None, the text is sliced every 80 characters.
+            The `"tokens"` strategy uses the embedding model's tokenizer
+            unless a `"tokenizer"` name is given.
+        cache_dir : str or None, optional (default=None)
+            Directory where the index cache is saved.
+            If None, no cache is used.
+        index_params : dict or None, optional (default=None)
+            Index type plus build, training and search parameters.
+            If None, an exact flat index is used.
+        batch_size : int, optional (default=1024)
+            Number of chunks encoded and added to the index at a time.
+        n_workers : int, optional (default=1)
+            Number of processes used to encode documents.
+        verbose : bool, optional (default=False)
+            If True, prints progress and throughput while indexing.
+        query_cache : QueryCache or None, optional (default=None)
+            Cache of query embeddings and top-k result IDs.
+        encoder_precision : str, optional (default="fp32")
+            `"fp32"`, `"bf16"` or `"int8"`.
+
+        Returns
+        -------
+        DocsRetriever
+            Retriever over the chunked documents in `docs_dir`.
+        """
+        retriever = cls(
+            [], model=model, index_params=index_params,
+            batch_size=batch_size, n_workers=n_workers, verbose=verbose,
+            query_cache=query_cache, encoder_precision=encoder_precision
+        )
+        retriever.docs_dir = docs_dir
+        retriever.chunking = dict(chunking or DEFAULT_CHUNKING)
+        retriever.cache_dir = cache_dir
+
+        cached = None
+        if cache_dir is not None:
+            cached = load_cache(cache_dir, retriever._settings())
+        if cached is not None and wraps_ivf(cached[0]):
+            cached = None
+        if cached is not None and retriever.vectors is not None:
+            vectors = VectorStore.load(cache_dir)
+            if vectors is None:
+                cached = None
+            else:
+                retriever.vectors = vectors
 
-        embeddings = self.model.encode(documents, convert_to_numpy=True)
-        self.index = faiss.IndexFlatL2(embeddings.shape[1])
-        self.index.add(embeddings)
+        if cached is not None:
+            index, documents, manifest = cached
+            set_search_params(index, **retriever.index_params)
+            retriever.index = index
+            retriever.documents = documents
+            retriever.files = manifest["files"]
+            retriever.next_id = manifest["next_id"]
+            retriever._mmapped = True
+
+        retriever.refresh()
+        return retriever
+
+    def add_documents(self, documents: Iterable[str]) -> list[int]:
+        """
+        Encodes documents and adds them to the index under new vector IDs.
+        Documents are consumed lazily in batches of `batch_size`.
+
+        Parameters
+        ----------
+        documents : Iterable[str]
+            Text that will be encoded and added.
+
+        Returns
+        -------
+        list[int]
+            Vector IDs assigned to the documents, in input order.
+        """
+        ids = []
+
+        def assign_ids():
+            for text in documents:
+                ids.append(self.next_id)
+                self.next_id += 1
+                yield ids[-1], text
+
+        with self._write_lock:
+            self._index_chunks(assign_ids())
+        return ids
+
+    def remove_documents(self, ids: list[int]):
+        """
+        Removes documents from the index.
+        Index types that cannot remove vectors (HNSW) are rebuilt
+        from the remaining vectors instead.
+
+        Parameters
+        ----------
+        ids : list[int]
+            Vector IDs of the documents that will be removed.
+        """
+        if not ids:
+            return
+
+        with self._write_lock:
+            if not supports_removal(self.index):
+                self._rebuild(set(ids))
+                return
+
+            with self._lock:
+                self._ensure_writable()
+                self.index.remove_ids(np.asarray(ids, dtype=np.int64))
+                for i in ids:
+                    self.documents.pop(i, None)
+                if self.vectors is not None:
+                    self.vectors.remove(ids)
+                self.version += 1
+
+    def _rebuild(self, removed: set[int]):
+        """
+        Builds a new index from every vector not in `removed`. The kept
+        vectors are taken from `vectors` or reconstructed from the current
+        index, so nothing is re-encoded.
+        """
+        with self._lock:
+            kept = {i: text for i, text in self.documents.items() if i not in removed}
+            ids = np.fromiter(kept, dtype=np.int64, count=len(kept))
+            embeddings = self._stored_embeddings(ids)
+
+        index = self._new_index()
+        if len(ids):
+            train_index(index, embeddings, **self.index_params)
+            index.add_with_ids(embeddings, ids)
+
+        with self._lock:
+            self.index = index
+            self.documents = kept
+            if self.vectors is not None:
+                self.vectors.remove(removed)
+            self._mmapped = False
+            self.version += 1
+
+    def _stored_embeddings(self, ids: np.ndarray) -> np.ndarray:
+        """Returns the indexed vectors of the given IDs without encoding their text."""
+        if self.vectors is not None:
+            return self.vectors.get(ids.tolist())
+        rows = {int(i): n for n, i in enumerate(faiss.vector_to_array(self.index.id_map))}
+        stored = self.index.index.reconstruct_n(0, self.index.ntotal)
+        return np.ascontiguousarray(stored[[rows[int(i)] for i in ids]], dtype=np.float32)
+
+    def _index_chunks(
+        self,
+        chunks: Iterable[tuple[int, str]],
+        index: faiss.Index | None = None
+    ):
+        """
+        Streams (vector ID, text) pairs through the encoder in batches of
+        `batch_size` and adds them to `index` (by default the live index).
+        Indexes that need training buffer up to `train_size` embeddings,
+        train on them and add them before streaming the rest.
+        """
+        live = index is None
+        train_size = self.index_params.get("train_size", 50_000)
+        untrained = []
+        n_chunks = 0
+        start = time.perf_counter()
+
+        batches = (
+            (batch, [text for _, text in batch])
+            for batch in iter_batches(chunks, self.batch_size)
+        )
+        for batch, embeddings in self._encode_batches(batches):
+            ids = np.fromiter((i for i, _ in batch), dtype=np.int64, count=len(batch))
+            texts = [text for _, text in batch]
+
+            if index is None:
+                with self._lock:
+                    self._ensure_writable()
+                index = self.index
+
+            if index.is_trained:
+                self._add(index, ids, texts, embeddings, live)
+            else:
+                untrained.append((ids, texts, embeddings))
+                if sum(len(b[0]) for b in untrained) >= train_size:
+                    self._train_and_add(index, untrained, live)
+                    untrained = []
+
+            n_chunks += len(batch)
+            self._report_progress(n_chunks, start)
+
+        if untrained:
+            self._train_and_add(index, untrained, live)
+
+        seconds = time.perf_counter() - start
+        self.build_stats = {
+            "chunks": n_chunks,
+            "seconds": seconds,
+            "chunks_per_s": n_chunks / seconds if seconds > 0 else 0.0,
+        }
+
+    def _encode_batches(
+        self,
+        batches: Iterator[tuple[Any, list[str]]]
+    ) -> Iterator[tuple[Any, np.ndarray]]:
+        """
+        Encodes (payload, texts) pairs in order, on a process pool if
+        `n_workers` > 1. The pool is only started once there is a batch to encode.
+        """
+        if self.n_workers <= 1:
+            for payload, texts in batches:
+                yield payload, self.model.encode(texts, convert_to_numpy=True)
+            return
+
+        first = next(batches, None)
+        if first is None:
+            return
+        with ParallelEncoder(
+            self.model_name, self.n_workers, precision=self.encoder_precision
+        ) as encoder:
+            yield from encoder.encode_batches(chain([first], batches))
+
+    def _add(
+        self,
+        index: faiss.Index,
+        ids: np.ndarray,
+        texts: list[str],
+        embeddings: np.ndarray,
+        live: bool
+    ):
+        """
+        Adds one encoded batch to `index`, under the search lock if it is live,
+        and keeps a full-precision copy if rescoring is enabled.
+        """
+        if self.vectors is not None:
+            self.vectors.add(ids, embeddings)
+        if live:
+            with self._lock:
+                index.add_with_ids(embeddings, ids)
+                self.documents.update(zip(ids.tolist(), texts))
+                self.version += 1
+        else:
+            index.add_with_ids(embeddings, ids)
+
+    def _train_and_add(self, index: faiss.Index, batches: list[tuple], live: bool):
+        """Trains `index` on the buffered batches and then adds them."""
+        train_index(index, np.concatenate([b[2] for b in batches]), **self.index_params)
+        for ids, texts, embeddings in batches:
+            self._add(index, ids, texts, embeddings, live)
+
+    def _report_progress(self, n_chunks: int, start: float):
+        """Prints the number of indexed chunks and the throughput so far."""
+        if self.verbose:
+            elapsed = time.perf_counter() - start
+            rate = n_chunks / elapsed if elapsed > 0 else 0.0
+            print(f"Indexed {n_chunks} chunks ({rate:.1f} chunks/s)", flush=True)
+
+    def _ensure_writable(self):
+        """Reads a memory-mapped index into memory before it is modified."""
+        if self._mmapped:
+            self.index = faiss.read_index(str(Path(self.cache_dir) / INDEX_FNAME))
+            set_search_params(self.index, **self.index_params)
+            self._mmapped = False
+
+    def refresh(self) -> bool:
+        """
+        Picks up changes to the jsonl files in `docs_dir` without a full rebuild.
+
+        Files whose content hash is unchanged are skipped. For changed files,
+        only records that are new or whose text changed are embedded, and the
+        vectors of changed or deleted records are removed from the index.
+
+        Returns
+        -------
+        bool
+            True if the index changed.
+
+        Raises
+        ------
+        RuntimeError
+            If the retriever was not built with `from_directory`.
+        """
+        if self.docs_dir is None:
+            raise RuntimeError("refresh() requires a retriever built with from_directory().")
+
+        with self._write_lock:
+            hashes = directory_hashes(self.docs_dir)
+            files = {}
+            stale_ids = []
+            added = []
+
+            self._index_chunks(self._scan_changes(hashes, files, stale_ids, added))
+
+            for name in self.files.keys() - hashes.keys():
+                for prev in self.files[name]["records"].values():
+                    stale_ids.extend(prev["ids"])
+            self.remove_documents(stale_ids)
+
+            changed = bool(stale_ids or added)
+            files_changed = files != self.files
+            self.files = files
+            if changed or files_changed:
+                self.save()
+            return changed
+
+    def _scan_changes(
+        self,
+        hashes: dict[str, str],
+        files: dict,
+        stale_ids: list[int],
+        added: list[str]
+    ) -> Iterator[tuple[int, str]]:
+        """
+        Walks the changed files and yields (vector ID, text) for every chunk
+        that has to be embedded. While doing so it fills in `files` with the
+        new per-file state, `stale_ids` with the vectors of changed or deleted
+        records and `added` with the keys of new or changed records.
+        """
+        chunker = self._chunker()
+        for name, file_hash in hashes.items():
+            old = self.files.get(name)
+            if old is not None and old["hash"] == file_hash:
+                files[name] = old
+                continue
+
+            old_records = old["records"] if old is not None else {}
+            records = {}
+            records_iter = iter_jsonl_records(Path(self.docs_dir) / name, chunker)
+            for key, fingerprint, chunks in records_iter:
+                prev = old_records.get(key)
+                if prev is not None and prev["fingerprint"] == fingerprint:
+                    records[key] = prev
+                    continue
+
+                ids = list(range(self.next_id, self.next_id + len(chunks)))
+                self.next_id += len(chunks)
+                records[key] = {
+                    "fingerprint": fingerprint,
+                    "ids": ids,
+                    "offsets": [[chunk.start, chunk.end] for chunk in chunks],
+                }
+                added.append(key)
+                yield from zip(ids, (chunk.text for chunk in chunks))
+
+            for key, prev in old_records.items():
+                if records.get(key) is not prev:
+                    stale_ids.extend(prev["ids"])
+            files[name] = {"hash": file_hash, "records": records}
+
+    update = refresh
+
+    def _chunker(self):
+        """Builds the chunking function, defaulting to the encoder's tokenizer for `"tokens"`."""
+        params = dict(self.chunking)
+        if params.get("strategy") == "tokens" and "tokenizer" not in params:
+            params["tokenizer"] = self.model.tokenizer
+        return get_chunker(**params)
+
+    def chunk_sources(self) -> dict[int, tuple[str, str, int, int]]:
+        """
+        Maps every vector ID to where its chunk came from.
+        Only available for retrievers built with `from_directory`.
+
+        Returns
+        -------
+        dict[int, tuple[str, str, int, int]]
+            File name, record key and start and end character offsets
+            of the chunk in the record text, keyed by vector ID.
+        """
+        sources = {}
+        for name, state in self.files.items():
+            for key, record in state["records"].items():
+                for i, (start, end) in zip(record["ids"], record["offsets"]):
+                    sources[i] = (name, key, start, end)
+        return sources
+
+    def save(self):
+        """Saves the index, documents and per-file state to `cache_dir`."""
+        if self.cache_dir is None:
+            return
+
+        manifest = {
+            "settings": self._settings(),
+            "next_id": self.next_id,
+            "files": self.files,
+        }
+        with self._lock:
+            save_cache(self.cache_dir, manifest, self.index, self.documents, self.vectors)
 
     def retrieve(
-        self, 
-        query: str, 
+        self,
+        query: str,
         k: int = 1
     ) -> list[str]:
         """
@@ -53,6 +595,164 @@ class DocsRetriever:
         list[str]
             List of retrieved documents ordered by increasing L2 distance         (i.e., most similar first).
         """
-        query_emb = self.model.encode([query], convert_to_numpy=True)
-        _, idcs = self.index.search(query_emb, k)
-        return [self.documents[i] for i in idcs[0]]
+        return self.retrieve_batch([query], k)[0]
+
+    def retrieve_batch(
+        self,
+        queries: list[str],
+        k: int = 1
+    ) -> list[list[str]]:
+        """
+        Retrieves the top k most similar documents for several queries at once.
+        All queries are encoded in one batched forward pass and searched
+        with a single FAISS call over the stacked query matrix.
+
+        Parameters
+        ----------
+        queries : list[str]
+            Natural language queries to embed and search against the index.
+        k : int, optional (default=1)
+            Number of nearest documents to return per query. Must be >= 1.
+
+        Returns
+        -------
+        list[list[str]]
+            Retrieved documents for each query, in input order, 
+            ordered by increasing L2 distance (i.e., most similar first).
+        """
+        return [self.get_documents(ids) for ids in self.retrieve_ids_batch(queries, k)]
+
+    def retrieve_ids(
+        self,
+        query: str,
+        k: int = 1,
+        query_emb: np.ndarray | None = None
+    ) -> list[int]:
+        """
+        Same as `retrieve`, but returns vector IDs instead of text.
+        A `query_emb` from `embed_queries` is searched without encoding the query again.
+        """
+        query_embs = None if query_emb is None else query_emb[None, :]
+        return self.retrieve_ids_batch([query], k, query_embs)[0]
+
+    def retrieve_ids_batch(
+        self,
+        queries: list[str],
+        k: int = 1,
+        query_embs: np.ndarray | None = None
+    ) -> list[list[int]]:
+        """
+        Same as `retrieve_batch`, but returns vector IDs instead of text.
+        Results are served from `query_cache` when possible.
+
+        Parameters
+        ----------
+        queries : list[str]
+            Natural language queries to embed and search against the index.
+        k : int, optional (default=1)
+            Number of nearest documents to return per query. Must be >= 1.
+        query_embs : np.ndarray or None, optional (default=None)
+            Embeddings of `queries` from `embed_queries`, shape (n_queries, dim).
+            If None, the queries are encoded.
+
+        Returns
+        -------
+        list[list[int]]
+            Vector IDs for each query, in input order, most similar first.
+        """
+        if not queries:
+            return []
+
+        cache = self.query_cache
+        results = [None] * len(queries)
+        if cache is not None:
+            version = self.version
+            results = [cache.get_results(query, k, version) for query in queries]
+
+        todo = [n for n, ids in enumerate(results) if ids is None]
+        METRICS.inc("chatbot_retriever_queries_total", len(queries))
+        METRICS.inc("chatbot_retriever_cache_hits_total", len(queries) - len(todo))
+        if todo:
+            if query_embs is None:
+                query_embs = self.embed_queries([queries[n] for n in todo])
+            else:
+                query_embs = np.asarray(query_embs, dtype=np.float32)[todo]
+            with self._lock:
+                version = self.version
+                _, idcs = self._search(query_embs, k)
+
+            for n, row in zip(todo, idcs):
+                results[n] = [int(i) for i in row if i != -1]
+                if cache is not None:
+                    cache.put_results(queries[n], k, version, results[n])
+
+        return results
+
+    def search(
+        self,
+        queries: list[str],
+        k: int = 1,
+        query_embs: np.ndarray | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Embeds queries and searches the index, bypassing the result cache.
+
+        Parameters
+        ----------
+        queries : list[str]
+            Natural language queries to embed and search against the index.
+        k : int, optional (default=1)
+            Number of nearest documents to return per query. Must be >= 1.
+        query_embs : np.ndarray or None, optional (default=None)
+            Embeddings of `queries` from `embed_queries`. If None, the queries are encoded.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            Squared L2 distances and vector IDs, both of shape (n_queries, k).
+            Missing neighbours have ID -1.
+        """
+        if query_embs is None:
+            query_embs = self.embed_queries(queries)
+        with self._lock:
+            return self._search(np.asarray(query_embs, dtype=np.float32), k)
+
+    def _search(
+        self,
+        query_embs: np.ndarray,
+        k: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Searches the index. If rescoring is enabled, `rescore * k` candidates
+        are re-ranked by their exact distance to the query.
+        """
+        rescore = self.index_params.get("rescore")
+        if not rescore or self.vectors is None:
+            with METRICS.timer("retriever", "search"):
+                return self.index.search(query_embs, k)
+        with METRICS.timer("retriever", "search"):
+            _, candidates = self.index.search(query_embs, int(rescore * k))
+        with METRICS.timer("retriever", "rescore"):
+            return self.vectors.rescore(query_embs, candidates, k)
+
+    def get_documents(self, ids: list[int]) -> list[str]:
+        """Returns the text of the given vector IDs, skipping removed ones."""
+        with self._lock:
+            return [self.documents[i] for i in ids if i in self.documents]
+
+    def embed_queries(self, queries: list[str]) -> np.ndarray:
+        """Encodes queries in one batch, reusing cached embeddings where possible."""
+        cache = self.query_cache
+        if cache is None:
+            with METRICS.timer("retriever", "encode"):
+                return self.model.encode(queries, convert_to_numpy=True)
+
+        embs = [cache.get_embedding(query) for query in queries]
+        missing = [n for n, emb in enumerate(embs) if emb is None]
+        if missing:
+            with METRICS.timer("retriever", "encode"):
+                encoded = self.model.encode([queries[n] for n in missing], convert_to_numpy=True)
+            for n, emb in zip(missing, encoded):
+                embs[n] = emb
+                cache.put_embedding(queries[n], emb)
+        return np.stack(embs)
\ No newline at end of file
@@ -0,0 +1,223 @@
+from pathlib import Path
+import os
+import threading
+import numpy as np
+
+VECTORS_FNAME = "vectors.npy"
+VECTOR_IDS_FNAME = "vector_ids.npy"
+
+class VectorStore:
+    """
+    Full-precision copies of the indexed embeddings, keyed by vector ID.
+
+    Used to rescore the candidates of a compressed (scalar- or
+    product-quantized) index with exact float32 distances. Loaded stores are
+    memory-mapped, so only the rows that are rescored are paged in.
+
+    Vectors are kept in blocks: the memory-mapped block loaded from disk and
+    one block per added batch. Removed and replaced rows stay in their block
+    until it holds no live rows, or until the dead rows of the in-memory
+    blocks exceed `compact_ratio` of their rows, at which point the live
+    rows are copied into a single block. The memory-mapped block is only
+    rewritten by `save`.
+
+    Attributes
+    ----------
+    dim : int
+        Embedding dimension.
+    compact_ratio : float
+        Fraction of dead in-memory rows that triggers a compaction.
+    compactions : int
+        Number of compactions so far.
+
+    Parameters
+    ----------
+    dim : int
+        Embedding dimension.
+    compact_ratio : float, optional (default=0.5)
+        Fraction of dead in-memory rows that triggers a compaction.
+    """
+    def __init__(
+        self,
+        dim: int,
+        compact_ratio: float = 0.5
+    ):
+        self.dim = dim
+        self.compact_ratio = compact_ratio
+        self.compactions = 0
+        self._blocks = {}
+        self._live = {}
+        self._next_block = 0
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, i: int) -> bool:
+        return i in self._rows
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Size of the vectors held, including removed and replaced rows that
+        have not been compacted yet and the memory-mapped block.
+        """
+        with self._lock:
+            return sum(block.nbytes for block in self._blocks.values())
+
+    def add(self, ids: np.ndarray, embeddings: np.ndarray):
+        """Stores one batch of embeddings, replacing any with the same IDs."""
+        block = np.ascontiguousarray(embeddings, dtype=np.float32)
+        with self._lock:
+            b = self._next_block
+            self._next_block += 1
+            self._blocks[b] = block
+            self._live[b] = 0
+            for r, i in enumerate(ids):
+                old = self._rows.get(int(i))
+                if old is not None:
+                    self._live[old[0]] -= 1
+                self._rows[int(i)] = (b, r)
+                self._live[b] += 1
+            self._reclaim()
+
+    def remove(self, ids):
+        """Forgets the given vector IDs."""
+        with self._lock:
+            for i in ids:
+                old = self._rows.pop(int(i), None)
+                if old is not None:
+                    self._live[old[0]] -= 1
+            self._reclaim()
+
+    def _reclaim(self):
+        """
+        Drops blocks without live rows and compacts the in-memory blocks
+        once their dead rows exceed `compact_ratio`. Called with the lock held.
+        """
+        for b in [b for b, n in self._live.items() if n == 0]:
+            del self._blocks[b], self._live[b]
+
+        in_memory = [b for b, block in self._blocks.items() if not isinstance(block, np.memmap)]
+        held = sum(len(self._blocks[b]) for b in in_memory)
+        dead = held - sum(self._live[b] for b in in_memory)
+        if dead <= self.compact_ratio * held:
+            return
+
+        rows = {b: [] for b in in_memory}
+        for i, (b, r) in self._rows.items():
+            if b in rows:
+                rows[b].append((i, r))
+        ids = []
+        parts = []
+        for b, block_rows in rows.items():
+            ids.extend(i for i, _ in block_rows)
+            parts.append(self._blocks.pop(b)[[r for _, r in block_rows]])
+            del self._live[b]
+
+        b = self._next_block
+        self._next_block += 1
+        self._blocks[b] = np.concatenate(parts) if parts else np.empty((0, self.dim), np.float32)
+        self._live[b] = len(ids)
+        self._rows.update((i, (b, r)) for r, i in enumerate(ids))
+        self.compactions += 1
+
+    def get(self, ids: list[int]) -> np.ndarray:
+        """Returns the vectors of the given IDs, shape (len(ids), dim)."""
+        with self._lock:
+            rows = [self._rows[i] for i in ids]
+            if not rows:
+                return np.empty((0, self.dim), dtype=np.float32)
+            return np.stack([self._blocks[b][r] for b, r in rows])
+
+    def rescore(
+        self,
+        queries: np.ndarray,
+        candidates: np.ndarray,
+        k: int
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Re-ranks candidate IDs by exact squared L2 distance to each query.
+
+        Parameters
+        ----------
+        queries : np.ndarray
+            Query embeddings, shape (n_queries, dim).
+        candidates : np.ndarray
+            Candidate vector IDs from the compressed index, shape
+            (n_queries, n_candidates). IDs of -1 and unknown IDs are skipped.
+        k : int
+            Number of results to keep per query.
+
+        Returns
+        -------
+        tuple[np.ndarray, np.ndarray]
+            Squared L2 distances and vector IDs, both of shape (n_queries, k).
+            Missing neighbours have ID -1, like `faiss.Index.search`.
+        """
+        distances = np.full((len(queries), k), np.inf, dtype=np.float32)
+        idcs = np.full((len(queries), k), -1, dtype=np.int64)
+        for n, (query, row) in enumerate(zip(queries, candidates)):
+            row = [i for i in row.tolist() if i in self._rows]
+            if not row:
+                continue
+            diff = self.get(row) - np.asarray(query, dtype=np.float32)
+            dist = np.einsum("ij,ij->i", diff, diff)
+            order = np.argsort(dist, kind="stable")[:k]
+            distances[n, :len(order)] = dist[order]
+            idcs[n, :len(order)] = np.asarray(row, dtype=np.int64)[order]
+        return distances, idcs
+
+    def save(self, directory: str):
+        """
+        Writes the live vectors and their IDs to `directory`.
+        Each file is written to a temporary path first and then moved into place.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            ids = np.fromiter(self._rows, dtype=np.int64, count=len(self._rows))
+            vectors = np.empty((len(ids), self.dim), dtype=np.float32)
+            for n, (b, r) in enumerate(self._rows.values()):
+                vectors[n] = self._blocks[b][r]
+
+        for fname, array in ((VECTORS_FNAME, vectors), (VECTOR_IDS_FNAME, ids)):
+            tmp_path = directory / (fname + ".tmp.npy")
+            np.save(tmp_path, array)
+            os.replace(tmp_path, directory / fname)
+
+    @classmethod
+    def load(
+        cls,
+        directory: str,
+        mmap: bool = True
+    ) -> "VectorStore | None":
+        """
+        Loads a store saved with `save`.
+
+        Parameters
+        ----------
+        directory : str
+            Directory the store was saved to.
+        mmap : bool, optional (default=True)
+            If True, memory-maps the vectors instead of reading them into memory.
+
+        Returns
+        -------
+        VectorStore or None
+            The loaded store, or None if it is missing.
+        """
+        directory = Path(directory)
+        vectors_path = directory / VECTORS_FNAME
+        ids_path = directory / VECTOR_IDS_FNAME
+        if not (vectors_path.exists() and ids_path.exists()):
+            return None
+
+        vectors = np.load(vectors_path, mmap_mode="r" if mmap else None)
+        store = cls(vectors.shape[1])
+        store._rows = {int(i): (0, r) for r, i in enumerate(np.load(ids_path))}
+        store._blocks[0] = vectors
+        store._live[0] = len(store._rows)
+        store._next_block = 1
+        return store
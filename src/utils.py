@@ -1,14 +1,16 @@
-import torch as tc
 import numpy as np
 import random
 import yaml
 import json
 from types import SimpleNamespace
-from typing import Any
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    import torch as tc
 
 def to_device(
     inputs: dict[str, Any], 
-    device: tc.device
+    device: "tc.device"
 ) -> dict[str, Any]:
     """
     Moves tensor values in dictionary to specified device.
@@ -26,6 +28,8 @@ def to_device(
     dict[str, Any]
         Returns dictionary with all tensors moved to specified device.
     """
+    import torch as tc
+
     return {k: (v.to(device) if tc.is_tensor(v) else v) for k, v in inputs.items()}
 
 def get_device(mps: bool=True):
@@ -50,6 +54,8 @@ def get_device(mps: bool=True):
     tc.device
         Best available device: `"mps"` if available, otherwise `"cpu"`.
     """
+    import torch as tc
+
     if mps:
         return tc.device("mps") if tc.backends.mps.is_available() else tc.device("cpu")
     else:
@@ -69,6 +75,8 @@ def set_seed(seed: int = 42) -> None:
     seed : int, optional (default=42)
         The seed value to set for all random number generators.
     """
+    import torch as tc
+
     tc.manual_seed(seed)
     np.random.seed(seed)
     random.seed(seed)